@@ -0,0 +1,160 @@
+"""Deterministic synthetic Sonarr/Radarr resources shaped like the v2 API responses"""
+import random
+
+_WORDS = ('the', 'last', 'night', 'city', 'house', 'blue', 'river', 'king', 'secret', 'road', 'star', 'winter')
+
+
+def _title(rng: random.Random) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(1, 4))).title()
+
+
+def _images(slug: str) -> list:
+    return [{'coverType': kind, 'url': f'/MediaCover/{slug}/{kind}.jpg'} for kind in ('fanart', 'banner', 'poster')]
+
+
+def make_series(series_id: int, seasons: int = 5) -> dict:
+    rng = random.Random(series_id)
+    title = f'{_title(rng)} {series_id}'
+    slug = title.lower().replace(' ', '-')
+    return {
+        'id': series_id,
+        'title': title,
+        'sortTitle': title.lower(),
+        'seasonCount': seasons,
+        'totalEpisodeCount': seasons * 10,
+        'episodeCount': seasons * 10,
+        'episodeFileCount': rng.randint(0, seasons * 10),
+        'sizeOnDisk': rng.randint(0, 10 ** 11),
+        'status': rng.choice(('continuing', 'ended')),
+        'overview': ' '.join(rng.choice(_WORDS) for _ in range(60)),
+        'network': rng.choice(('HBO', 'BBC', 'NBC', 'AMC')),
+        'airTime': '21:00',
+        'images': _images(slug),
+        'seasons': [{'seasonNumber': n, 'monitored': True,
+                     'statistics': {'episodeFileCount': 10, 'episodeCount': 10, 'totalEpisodeCount': 10,
+                                    'sizeOnDisk': rng.randint(0, 10 ** 10), 'percentOfEpisodes': 100.0}}
+                    for n in range(seasons + 1)],
+        'year': 1990 + series_id % 30,
+        'path': f'/tv/{title}',
+        'profileId': 1 + series_id % 4,
+        'qualityProfileId': 1 + series_id % 4,
+        'seasonFolder': True,
+        'monitored': series_id % 5 != 0,
+        'tvdbId': 70000 + series_id,
+        'tvRageId': 0,
+        'tvMazeId': 1000 + series_id,
+        'firstAired': '2008-01-20T08:00:00Z',
+        'lastInfoSync': '2020-01-27T10:00:00Z',
+        'seriesType': 'standard',
+        'cleanTitle': slug.replace('-', ''),
+        'imdbId': f'tt{1000000 + series_id}',
+        'titleSlug': slug,
+        'genres': ['Drama', 'Crime'],
+        'tags': [],
+        'added': '2019-05-04T12:00:00Z',
+        'ratings': {'votes': rng.randint(0, 5000), 'value': round(rng.uniform(1, 10), 1)},
+    }
+
+
+def make_episodes(series_id: int, count: int = 50) -> list:
+    rng = random.Random(series_id * 7919)
+    episodes = []
+    for n in range(count):
+        episode_id = series_id * 1000 + n
+        has_file = rng.random() < 0.8
+        episodes.append({
+            'id': episode_id,
+            'seriesId': series_id,
+            'episodeFileId': episode_id if has_file else 0,
+            'seasonNumber': 1 + n // 10,
+            'episodeNumber': 1 + n % 10,
+            'title': _title(rng),
+            'airDate': f'20{10 + n // 40:02d}-{1 + n % 12:02d}-{1 + n % 28:02d}',
+            'airDateUtc': f'20{10 + n // 40:02d}-{1 + n % 12:02d}-{1 + n % 28:02d}T02:00:00Z',
+            'overview': ' '.join(rng.choice(_WORDS) for _ in range(30)),
+            'hasFile': has_file,
+            'monitored': True,
+            'absoluteEpisodeNumber': n + 1,
+            'unverifiedSceneNumbering': False,
+        })
+    return episodes
+
+
+def make_episode_files(series_id: int, count: int = 50) -> list:
+    return [{
+        'id': e['episodeFileId'],
+        'seriesId': series_id,
+        'seasonNumber': e['seasonNumber'],
+        'relativePath': f"Season {e['seasonNumber']}/S{e['seasonNumber']:02d}E{e['episodeNumber']:02d}.mkv",
+        'path': f"/tv/{series_id}/Season {e['seasonNumber']}/S{e['seasonNumber']:02d}E{e['episodeNumber']:02d}.mkv",
+        'size': 1500000000 + e['id'] % 1000000,
+        'dateAdded': '2019-05-04T12:00:00Z',
+        'quality': {'quality': {'id': 7, 'name': 'Bluray-1080p'}, 'revision': {'version': 1, 'real': 0}},
+        'qualityCutoffNotMet': False,
+    } for e in make_episodes(series_id, count) if e['hasFile']]
+
+
+def make_movie(movie_id: int) -> dict:
+    rng = random.Random(movie_id * 104729)
+    title = f'{_title(rng)} {movie_id}'
+    slug = f"{title.lower().replace(' ', '-')}-{movie_id}"
+    has_file = rng.random() < 0.7
+    return {
+        'id': movie_id,
+        'title': title,
+        'sortTitle': title.lower(),
+        'sizeOnDisk': rng.randint(10 ** 9, 5 * 10 ** 10) if has_file else 0,
+        'status': 'released',
+        'overview': ' '.join(rng.choice(_WORDS) for _ in range(50)),
+        'inCinemas': '2015-04-01T00:00:00Z',
+        'physicalRelease': '2015-08-01T00:00:00Z',
+        'images': _images(slug),
+        'website': '',
+        'downloaded': has_file,
+        'year': 1980 + movie_id % 40,
+        'hasFile': has_file,
+        'studio': rng.choice(('Warner Bros.', 'Universal', 'A24')),
+        'path': f'/movies/{title} ({1980 + movie_id % 40})',
+        'profileId': 1 + movie_id % 4,
+        'qualityProfileId': 1 + movie_id % 4,
+        'monitored': movie_id % 7 != 0,
+        'minimumAvailability': 'released',
+        'isAvailable': True,
+        'runtime': rng.randint(80, 180),
+        'lastInfoSync': '2020-01-27T10:00:00Z',
+        'cleanTitle': slug.replace('-', ''),
+        'imdbId': f'tt{2000000 + movie_id}',
+        'tmdbId': 10000 + movie_id,
+        'titleSlug': slug,
+        'genres': ['Drama'],
+        'tags': [],
+        'added': '2019-05-04T12:00:00Z',
+        'ratings': {'votes': rng.randint(0, 5000), 'value': round(rng.uniform(1, 10), 1)},
+        'alternativeTitles': [],
+        'qualityProfileCutoff': 7,
+    }
+
+
+_EVENTS = ('grabbed', 'downloadFolderImported', 'downloadFailed', 'episodeFileDeleted')
+
+
+def make_history_record(record_id: int, series_count: int = 0, movie_count: int = 0) -> dict:
+    """A history record about an episode of one of series_count series, or about one of movie_count movies"""
+    rng = random.Random(record_id * 15485863)
+    record = {
+        'id': record_id,
+        'sourceTitle': f'{_title(rng)}.1080p.BluRay.x264-GROUP'.replace(' ', '.'),
+        'quality': {'quality': {'id': 7, 'name': 'Bluray-1080p'}, 'revision': {'version': 1, 'real': 0}},
+        'qualityCutoffNotMet': rng.random() < 0.1,
+        'date': f'20{10 + record_id % 10:02d}-{1 + record_id % 12:02d}-{1 + record_id % 28:02d}T12:00:00Z',
+        'downloadId': f'{rng.getrandbits(128):032X}',
+        'eventType': rng.choice(_EVENTS),
+        'data': {'indexer': 'Indexer', 'releaseGroup': 'GROUP', 'size': str(rng.randint(10 ** 9, 10 ** 10))},
+    }
+    if movie_count:
+        record['movieId'] = 1 + record_id % movie_count
+    else:
+        series_id = 1 + record_id % max(series_count, 1)
+        record['seriesId'] = series_id
+        record['episodeId'] = series_id * 1000 + record_id % 50
+    return record
@@ -0,0 +1,98 @@
+"""Micro-benchmark of the JSON codec against the previous encode/decode paths.
+
+    python -m benchmarks.bench_codec [--series 4000] [--movies 20000] [--repeat 5]
+"""
+import argparse
+import json
+import timeit
+
+import requests
+from requests.models import complexjson
+
+from benchmarks._payloads import make_movie, make_series
+from hm_wrapper import _codec, _utils
+
+
+def _legacy_request_body(body) -> bytes:
+    # Radarr.add_movie/run_command: json.dumps in the method, json.loads in request_post, then requests re-encodes
+    data = json.dumps(body)
+    data2 = json.loads(data)
+    return complexjson.dumps(data2, allow_nan=False).encode('utf-8')
+
+
+def _legacy_dict_to_json(args: dict) -> str:
+    json_body = "{"
+    for key, value in args.items():
+        if isinstance(value, list):
+            json_body += f'\"{key}\": ['
+            for i in value:
+                if isinstance(i, int):
+                    json_body += f'{i}, '
+                else:
+                    json_body += f'\"{i}\", '
+            json_body = json_body.rstrip(', ')
+            json_body += ']'
+        else:
+            json_body += f'\"{key}\":\"{value}\", '
+    json_body = json_body.rstrip(', ')
+    json_body += "}"
+    return json_body
+
+
+def _response(content: bytes) -> requests.Response:
+    res = requests.Response()
+    res._content = content
+    res._content_consumed = True
+    res.status_code = 200
+    res.headers['Content-Type'] = 'application/json'
+    return res
+
+
+def _requests_json(content: bytes):
+    # a fresh Response every time, like every API call; res.json() detects the encoding and decodes text first
+    return _response(content).json()
+
+
+def _codec_json(content: bytes):
+    return _codec.decode(_response(content))
+
+
+def _best(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--series', type=int, default=4000)
+    parser.add_argument('--movies', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    series = [make_series(i) for i in range(1, args.series + 1)]
+    movies = [make_movie(i) for i in range(1, args.movies + 1)]
+    series_bytes = _codec.dumps(series)
+    movies_bytes = _codec.dumps(movies)
+    command = {'name': 'MoviesSearch', 'movieIds': list(range(args.movies))}
+
+    cases = [
+        (f'decode series x{args.series} ({len(series_bytes) >> 20} MiB)',
+         lambda: _requests_json(series_bytes), lambda: _codec_json(series_bytes)),
+        (f'decode movie x{args.movies} ({len(movies_bytes) >> 20} MiB)',
+         lambda: _requests_json(movies_bytes), lambda: _codec_json(movies_bytes)),
+        (f'encode series x{args.series}',
+         lambda: _legacy_request_body(series), lambda: _codec.encode_body(series)),
+        (f'encode MoviesSearch command, {args.movies} ids',
+         lambda: _legacy_request_body(command), lambda: _codec.encode_body(command)),
+        (f'dict_to_json, {args.movies} ids',
+         lambda: _legacy_dict_to_json(command), lambda: _utils.dict_to_json(command)),
+    ]
+    print(f'codec backend: {_codec.BACKEND}')
+    print(f'{"case":<45} {"before":>10} {"after":>10} {"speedup":>8}')
+    for name, before, after in cases:
+        t_before = _best(before, args.repeat)
+        t_after = _best(after, args.repeat)
+        print(f'{name:<45} {t_before * 1000:>8.1f}ms {t_after * 1000:>8.1f}ms {t_before / t_after:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark of _utils.parse_date_input / parse_date_inputs against the previous strptime loop.
+
+    python -m benchmarks.bench_dates [--dates 20000] [--repeat 5]
+"""
+import argparse
+import datetime
+import random
+import timeit
+
+from hm_wrapper import _utils
+
+
+def _legacy_parse_date_input(date_object) -> str:
+    # the previous implementation, string branch only (its datetime/date branches raised TypeError)
+    input_datetime = None
+    for ordr in ('M|D|Y', 'D|M|Y', 'Y|M|D'):
+        if input_datetime is not None:
+            break
+        for sep in ('-', '/'):
+            try:
+                form = ordr.replace('|', sep).replace('M', '%m').replace('Y', '%y').replace('D', '%d')
+                result = datetime.datetime.strptime(date_object, form)
+            except ValueError:
+                try:
+                    form = ordr.replace('|', sep).replace('M', '%m').replace('Y', '%Y').replace('D', '%d')
+                    result = datetime.datetime.strptime(date_object, form)
+                except ValueError:
+                    result = None
+            if result is not None:
+                input_datetime = result
+                break
+    if input_datetime is None:
+        raise TypeError
+    return input_datetime.isoformat()
+
+
+def _dates(count: int) -> dict:
+    rng = random.Random(0)
+    days = [datetime.date(2000, 1, 1) + datetime.timedelta(days=rng.randint(0, 9000)) for _ in range(count)]
+    return {
+        'M/D/Y': [f'{d.month}/{d.day}/{d.year % 100:02d}' for d in days],
+        'D-M-Y': [f'{d.day:02d}-{d.month:02d}-{d.year}' for d in days],
+        'Y-M-D': [d.isoformat() for d in days],
+    }
+
+
+def _best(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dates', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    def uncached(dates):
+        # distinct dates every time: measures the parser rather than the memo
+        _utils._iso_date_string.cache_clear()
+        _utils._parse_date_string.cache_clear()
+        return [_utils.parse_date_input(d) for d in dates]
+
+    print(f'{"case":<32} {"before":>10} {"after":>10} {"speedup":>8}')
+    for name, dates in _dates(args.dates).items():
+        assert [_legacy_parse_date_input(d) for d in dates] == [_utils.parse_date_input(d) for d in dates]
+        cases = [
+            (f'{name} x{len(dates)}, uncached', lambda: uncached(dates)),
+            (f'{name} x{len(dates)}, memoized', lambda: [_utils.parse_date_input(d) for d in dates]),
+            (f'{name} x{len(dates)}, batch', lambda: _utils.parse_date_inputs(dates)),
+        ]
+        t_before = _best(lambda: [_legacy_parse_date_input(d) for d in dates], args.repeat)
+        for case, after in cases:
+            t_after = _best(after, args.repeat)
+            print(f'{case:<32} {t_before * 1000:>8.1f}ms {t_after * 1000:>8.1f}ms {t_before / t_after:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
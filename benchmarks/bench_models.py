@@ -0,0 +1,57 @@
+"""Memory benchmark of the typed records (hm_wrapper.models) against plain decoded dicts.
+
+    python -m benchmarks.bench_models [--series 4000] [--episodes 100000] [--movies 20000]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks._payloads import make_episodes, make_movie, make_series
+from hm_wrapper import _codec
+from hm_wrapper.models import Episode, Movie, Series
+
+
+def _retained(build) -> tuple:
+    """Returns (bytes still allocated by the result of build(), seconds build() took)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--series', type=int, default=4000)
+    parser.add_argument('--episodes', type=int, default=100000)
+    parser.add_argument('--movies', type=int, default=20000)
+    args = parser.parse_args()
+
+    per_series = 50
+    episodes = []
+    for series_id in range(1, args.episodes // per_series + 1):
+        episodes.extend(make_episodes(series_id, per_series))
+    payloads = [
+        ('series', _codec.dumps([make_series(i) for i in range(1, args.series + 1)]), Series),
+        ('episode', _codec.dumps(episodes), Episode),
+        ('movie', _codec.dumps([make_movie(i) for i in range(1, args.movies + 1)]), Movie),
+    ]
+    del episodes
+
+    print(f'{"resource":<10} {"count":>8} {"dicts":>10} {"records":>10} {"saved":>7} {"decode":>8} {"+convert":>9}')
+    for name, body, model in payloads:
+        dict_size, dict_time = _retained(lambda: _codec.loads(body))
+        record_size, record_time = _retained(lambda: model.from_list(_codec.loads(body)))
+        count = len(_codec.loads(body))
+        print(f'{name:<10} {count:>8} {dict_size / 2 ** 20:>8.1f}MB {record_size / 2 ** 20:>8.1f}MB '
+              f'{1 - record_size / dict_size:>6.0%} {dict_time * 1000:>6.0f}ms {record_time * 1000:>7.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
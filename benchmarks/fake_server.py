@@ -0,0 +1,271 @@
+"""Local stand-in for the Sonarr v2 and Radarr APIs the clients call, serving a synthetic library of configurable size
+with optional injected latency. Sonarr is served under /sonarr, Radarr under /radarr.
+
+    python -m benchmarks.fake_server [--series 10000] [--episodes 500000] [--movies 50000] [--history 100000]
+                                     [--latency 0.02] [--jitter 0.01] [--port 8989]
+
+Prints the base URL on the first line of stdout once it is listening.
+"""
+import argparse
+import functools
+import itertools
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlsplit
+
+from benchmarks._payloads import make_episode_files, make_episodes, make_history_record, make_movie, make_series
+from hm_wrapper import _codec
+
+_TVDB_OFFSET = 70000
+_TMDB_OFFSET = 10000
+
+
+class LibrarySize(NamedTuple):
+    series: int = 1000
+    episodes_per_series: int = 50
+    movies: int = 5000
+    # history records of each application
+    history: int = 20000
+
+
+def _page(query: dict, total: int, make_record) -> dict:
+    page = max(int(query.get('page', 1)), 1)
+    page_size = int(query.get('pageSize', 10))
+    first = (page - 1) * page_size
+    records = [make_record(i) for i in range(first + 1, min(first + page_size, total) + 1)]
+    return {'page': page, 'pageSize': page_size, 'sortKey': query.get('sortKey', 'date'),
+            'sortDirection': query.get('sortDir', 'descending'), 'totalRecords': total, 'records': records}
+
+
+@functools.lru_cache(maxsize=2048)
+def _encoded_episodes(series_id: int, count: int) -> bytes:
+    return _codec.dumps(make_episodes(series_id, count))
+
+
+@functools.lru_cache(maxsize=2048)
+def _encoded_episode_files(series_id: int, count: int) -> bytes:
+    return _codec.dumps(make_episode_files(series_id, count))
+
+
+def _without_id(record: dict) -> dict:
+    record = dict(record)
+    del record['id']
+    return record
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # send headers and body in one segment (flushed after every request), or delayed ACKs stall the client
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def _handle(self):
+        parts = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        status, data = self.server.respond(self.command, parts.path, dict(parse_qsl(parts.query)), body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeArrServer(ThreadingMixIn, HTTPServer):
+    """Threaded HTTP server answering the Sonarr (/sonarr/api/...) and Radarr (/radarr/api/...) endpoints from a
+    deterministic synthetic library. Records are generated on request; the full listings are encoded once and reused.
+    Every response is delayed by latency plus a random share of jitter seconds."""
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, size: LibrarySize = LibrarySize(), latency: float = 0.0, jitter: float = 0.0,
+                 host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.size = size
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._ids = itertools.count(max(size.series, size.movies) + 1)
+        self._encoded = dict()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._thread = None
+        self._routes = [(method, app, re.compile(pattern + '$'), handler) for method, app, pattern, handler in (
+            ('GET', 'sonarr', r'series', self._all_series),
+            ('GET', 'sonarr', r'series/lookup', self._lookup_series),
+            ('GET', 'sonarr', r'series/(\d+)', self._series),
+            ('POST', 'sonarr', r'series', self._add),
+            ('GET', 'sonarr', r'episode', self._episodes),
+            ('GET', 'sonarr', r'episodefile', self._episode_files),
+            ('GET', 'sonarr', r'history', self._sonarr_history),
+            ('GET', 'sonarr', r'wanted/(missing|cutoff)', self._wanted),
+            ('GET', 'radarr', r'movie', self._all_movies),
+            ('GET', 'radarr', r'movie/(\d+)', self._movie),
+            ('GET', 'radarr', r'movie/lookup/tmdb', self._lookup_movie),
+            ('POST', 'radarr', r'movie', self._add),
+            ('GET', 'radarr', r'history', self._radarr_history),
+            ('GET', None, r'queue', lambda query: []),
+            ('GET', None, r'calendar', lambda query: []),
+            ('GET', None, r'rootfolder', self._root_folders),
+            ('GET', None, r'profile', lambda query: [{'id': i, 'name': name} for i, name in
+                                                     enumerate(('Any', 'SD', 'HD-720p', 'HD-1080p'), 1)]),
+            ('GET', None, r'system/status', lambda query: {'version': '2.0.0.5344', 'appName': 'FakeArr'}),
+            ('POST', None, r'command', lambda query, body: {'id': next(self._ids), 'name': body.get('name'),
+                                                            'state': 'queued'}),
+        )]
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def sonarr_url(self) -> str:
+        return self.url + '/sonarr'
+
+    @property
+    def radarr_url(self) -> str:
+        return self.url + '/radarr'
+
+    def start(self):
+        """Serves on a background daemon thread and returns self"""
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.1,), daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+
+    def respond(self, method: str, path: str, query: dict, body: bytes) -> tuple:
+        """Returns the (status, body bytes) of a request"""
+        with self._lock:
+            self.requests += 1
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        match = re.match(r'/(sonarr|radarr)/api/(.+?)/?$', path)
+        if match is None:
+            return 404, b'{"message":"NotFound"}'
+        app, endpoint = match.groups()
+        for route_method, route_app, pattern, handler in self._routes:
+            found = pattern.match(endpoint)
+            if found is None or route_method != method or route_app not in (None, app):
+                continue
+            args = found.groups()
+            if method == 'POST':
+                args += (_codec.loads(body) if body else {},)
+            result = handler(query, *args)
+            if result is None:
+                return 404, b'{"message":"NotFound"}'
+            status = 201 if method == 'POST' else 200
+            return status, result if isinstance(result, bytes) else _codec.dumps(result)
+        return 404, b'{"message":"NotFound"}'
+
+    def _once(self, key: str, build) -> bytes:
+        data = self._encoded.get(key)
+        if data is None:
+            with self._build_lock:
+                data = self._encoded.get(key)
+                if data is None:
+                    data = self._encoded[key] = _codec.dumps(build())
+        return data
+
+    # SONARR
+    def _all_series(self, query):
+        return self._once('series', lambda: [make_series(i) for i in range(1, self.size.series + 1)])
+
+    def _series(self, query, series_id):
+        series_id = int(series_id)
+        return make_series(series_id) if series_id <= self.size.series else None
+
+    def _lookup_series(self, query):
+        term = query.get('term', '')
+        if not term.startswith('tvdbId:'):
+            return [_without_id(make_series(i)) for i in range(1, 6)]
+        return [_without_id(make_series(int(term[len('tvdbId:'):]) - _TVDB_OFFSET))]
+
+    def _episodes(self, query):
+        series_id = int(query.get('seriesId', 0))
+        if not 0 < series_id <= self.size.series:
+            return b'[]'
+        return _encoded_episodes(series_id, self.size.episodes_per_series)
+
+    def _episode_files(self, query):
+        series_id = int(query.get('seriesId', 0))
+        if not 0 < series_id <= self.size.series:
+            return b'[]'
+        return _encoded_episode_files(series_id, self.size.episodes_per_series)
+
+    def _sonarr_history(self, query):
+        return _page(query, self.size.history, lambda i: make_history_record(i, series_count=self.size.series))
+
+    def _wanted(self, query, kind):
+        total = self.size.series * self.size.episodes_per_series // 5
+
+        def record(i):
+            series_id = 1 + i % self.size.series
+            episode = make_episodes(series_id, self.size.episodes_per_series)[i % self.size.episodes_per_series]
+            return dict(episode, hasFile=kind == 'cutoff', series=make_series(series_id))
+
+        return _page(query, total, record)
+
+    # RADARR
+    def _all_movies(self, query):
+        return self._once('movie', lambda: [make_movie(i) for i in range(1, self.size.movies + 1)])
+
+    def _movie(self, query, movie_id):
+        movie_id = int(movie_id)
+        return make_movie(movie_id) if movie_id <= self.size.movies else None
+
+    def _lookup_movie(self, query):
+        return _without_id(make_movie(int(query.get('tmdbId', _TMDB_OFFSET + 1)) - _TMDB_OFFSET))
+
+    def _radarr_history(self, query):
+        return _page(query, self.size.history, lambda i: make_history_record(i, movie_count=self.size.movies))
+
+    # SHARED
+    def _add(self, query, body):
+        return dict(body, id=next(self._ids))
+
+    def _root_folders(self, query):
+        return [{'id': 1, 'path': '/media/', 'freeSpace': 10 ** 13}]
+
+
+def main():
+    defaults = LibrarySize()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--series', type=int, default=defaults.series)
+    parser.add_argument('--episodes', type=int, default=defaults.series * defaults.episodes_per_series,
+                        help='total number of episodes, spread evenly over the series')
+    parser.add_argument('--movies', type=int, default=defaults.movies)
+    parser.add_argument('--history', type=int, default=defaults.history)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many seconds more, at random')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    args = parser.parse_args()
+
+    size = LibrarySize(args.series, max(args.episodes // max(args.series, 1), 1), args.movies, args.history)
+    server = FakeArrServer(size, latency=args.latency, jitter=args.jitter, host=args.host, port=args.port)
+    print(server.url, flush=True)
+    try:
+        server.serve_forever(0.1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
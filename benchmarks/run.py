@@ -0,0 +1,197 @@
+"""Benchmark suite of the main client workflows against a local fake Sonarr/Radarr server (benchmarks.fake_server).
+
+Reports, per workflow, the median wall time over --repeat runs, request and item throughput, request latency
+percentiles and the peak Python memory of a separate traced run. Save the results of one checkout with --save and
+compare another one against them with --compare.
+
+    python -m benchmarks.run [--series 10000] [--episodes 500000] [--movies 50000] [--latency 0.02]
+                             [--only full_listing,episode_fanout] [--save before.json] [--compare before.json]
+"""
+import argparse
+import gc
+import json
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import NamedTuple
+
+from benchmarks.fake_server import LibrarySize
+from hm_wrapper.metrics import Metrics, RequestSample
+from hm_wrapper.radarr import Radarr
+from hm_wrapper.sonarr import Sonarr
+
+
+class Workflow(NamedTuple):
+    name: str
+    description: str
+    # run(sonarr, radarr, args) -> number of items processed
+    run: object
+
+
+def _full_listing(sonarr, radarr, args) -> int:
+    return len(sonarr.get_series()) + len(radarr.get_movie())
+
+
+def _typed_listing(sonarr, radarr, args) -> int:
+    return len(sonarr.get_series(typed=True)) + len(radarr.get_movie(typed=True))
+
+
+def _streamed_listing(sonarr, radarr, args) -> int:
+    return sum(1 for _ in sonarr.stream_series(fields=['id', 'tvdbId'])) + \
+           sum(1 for _ in radarr.stream_movies(fields=['id', 'tmdbId']))
+
+
+def _episode_fanout(sonarr, radarr, args) -> int:
+    series = [{'id': i} for i in range(1, min(args.fanout, args.series) + 1)]
+    snapshots = sonarr.snapshot_episodes(series, include_files=True, max_workers=args.workers)
+    return sum(len(s.episodes or ()) for s in snapshots)
+
+
+def _bulk_add(sonarr, radarr, args) -> int:
+    # ids past the end of the library, so nothing is skipped
+    tvdb_ids = [70000 + args.series + i for i in range(1, args.adds + 1)]
+    tmdb_ids = [10000 + args.movies + i for i in range(1, args.adds + 1)]
+    results = sonarr.add_series_by_tvdbIds(tvdb_ids, 1, max_workers=args.workers)
+    results += radarr.add_movies_by_tmdb_ids(tmdb_ids, 1, max_workers=args.workers)
+    return sum(1 for r in results if r.ok)
+
+
+def _history_paging(sonarr, radarr, args) -> int:
+    count = 0
+    for page in range(1, args.pages + 1):
+        count += len(radarr.get_history(page=page, page_size=args.page_size)['records'])
+    return count
+
+
+def _history_parallel(sonarr, radarr, args) -> int:
+    return sum(1 for _ in radarr.iter_history(page_size=args.page_size, max_workers=args.workers))
+
+
+WORKFLOWS = [
+    Workflow('full_listing', 'get_series() + get_movie()', _full_listing),
+    Workflow('typed_listing', 'the same as typed records', _typed_listing),
+    Workflow('streamed_listing', 'stream_series() + stream_movies() of two fields', _streamed_listing),
+    Workflow('episode_fanout', 'snapshot_episodes() of --fanout series, with files', _episode_fanout),
+    Workflow('bulk_add', '--adds series and --adds movies added by id', _bulk_add),
+    Workflow('history_paging', '--pages pages of --page-size history records', _history_paging),
+    Workflow('history_parallel', 'iter_history() of the whole history, --page-size records a page', _history_parallel),
+]
+
+
+def _run_once(workflow: Workflow, url: str, args, traced: bool = False) -> dict:
+    metrics = Metrics()
+    latencies = []
+    metrics.add_hook(lambda sample: isinstance(sample, RequestSample) and latencies.append(sample.seconds))
+    sonarr = Sonarr(url + '/sonarr', 'key', pool_size=args.workers, metrics=metrics)
+    radarr = Radarr(url + '/radarr', 'key', pool_size=args.workers, metrics=metrics)
+    gc.collect()
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        items = workflow.run(sonarr, radarr, args)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if traced else None
+    finally:
+        if traced:
+            tracemalloc.stop()
+        sonarr.close()
+        radarr.close()
+    latencies.sort()
+    return {
+        'seconds': seconds,
+        'items': items,
+        'requests': len(latencies),
+        'bytes': sum(row['bytes'] for row in metrics.summary()),
+        'p50': latencies[len(latencies) // 2] if latencies else 0.0,
+        'p95': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        'peak': peak,
+    }
+
+
+def run(workflow: Workflow, url: str, args) -> dict:
+    """Runs workflow once traced for its peak memory (this also warms the server), then args.repeat times timed"""
+    peak = _run_once(workflow, url, args, traced=True)['peak']
+    runs = [_run_once(workflow, url, args) for _ in range(args.repeat)]
+    median = sorted(runs, key=lambda r: r['seconds'])[len(runs) // 2]
+    return dict(median, peak=peak, seconds=statistics.median(r['seconds'] for r in runs),
+                items_per_s=median['items'] / median['seconds'], requests_per_s=median['requests'] / median['seconds'])
+
+
+def _start_server(args) -> tuple:
+    command = [sys.executable, '-m', 'benchmarks.fake_server', '--series', str(args.series),
+               '--episodes', str(args.episodes), '--movies', str(args.movies), '--history', str(args.history),
+               '--latency', str(args.latency), '--jitter', str(args.jitter)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, universal_newlines=True)
+    url = process.stdout.readline().strip()
+    if not url:
+        process.kill()
+        raise RuntimeError('the fake server did not start')
+    return process, url
+
+
+def _print(results: dict, baseline: dict = None):
+    header = (f'{"workflow":<17} {"seconds":>8} {"items/s":>10} {"req/s":>8} {"requests":>8} {"p50 ms":>7} '
+              f'{"p95 ms":>7} {"MB recv":>8} {"peak MB":>8}')
+    if baseline:
+        header += f' {"time":>7} {"memory":>7}'
+    print(header)
+    for name, r in results.items():
+        line = (f'{name:<17} {r["seconds"]:>8.3f} {r["items_per_s"]:>10.0f} {r["requests_per_s"]:>8.0f} '
+                f'{r["requests"]:>8} {r["p50"] * 1000:>7.1f} {r["p95"] * 1000:>7.1f} {r["bytes"] / 2 ** 20:>8.1f} '
+                f'{r["peak"] / 2 ** 20:>8.1f}')
+        before = (baseline or {}).get(name)
+        if before:
+            line += (f' {(r["seconds"] / before["seconds"] - 1) * 100:>+6.0f}%'
+                     f' {(r["peak"] / max(before["peak"], 1) - 1) * 100:>+6.0f}%')
+        print(line)
+
+
+def main():
+    defaults = LibrarySize()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--series', type=int, default=defaults.series)
+    parser.add_argument('--episodes', type=int, default=defaults.series * defaults.episodes_per_series)
+    parser.add_argument('--movies', type=int, default=defaults.movies)
+    parser.add_argument('--history', type=int, default=defaults.history)
+    parser.add_argument('--latency', type=float, default=0.005, help='seconds the server adds to every response')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=8, help='max_workers / pool size of the clients')
+    parser.add_argument('--fanout', type=int, default=500, help='series of the episode_fanout workflow')
+    parser.add_argument('--adds', type=int, default=100, help='series and movies of the bulk_add workflow')
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=250)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', help='comma separated workflows to run: ' + ', '.join(w.name for w in WORKFLOWS))
+    parser.add_argument('--url', help='use a fake server already running at this URL instead of starting one')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='show the change against results saved with --save')
+    args = parser.parse_args()
+
+    workflows = WORKFLOWS
+    if args.only:
+        names = set(args.only.split(','))
+        workflows = [w for w in WORKFLOWS if w.name in names]
+    process, url = (None, args.url) if args.url else _start_server(args)
+    try:
+        results = {w.name: run(w, url, args) for w in workflows}
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print(f'{args.series} series, {args.episodes} episodes, {args.movies} movies, {args.latency * 1000:.0f}ms latency')
+    _print(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Startup time of the package and of the hm command, each measured in a fresh interpreter.
+
+Reports the median wall time of every scenario and how much of it is added on top of a bare interpreter. With
+--limit, exits with status 1 if importing hm_wrapper or printing hm --help adds more than that many milliseconds,
+which catches a module-level import sneaking back into the package.
+
+    python -m benchmarks.startup [--repeat 15] [--limit 50]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.fake_server import FakeArrServer, LibrarySize
+
+# scenarios guarded by --limit
+GUARDED = ('import hm_wrapper', 'hm --help')
+
+
+def _scenarios(sonarr_url: str) -> dict:
+    return {
+        'python': ['-c', 'pass'],
+        'import hm_wrapper': ['-c', 'import hm_wrapper'],
+        'hm --help': ['-m', 'hm_wrapper', '--help'],
+        'import hm_wrapper.sonarr': ['-c', 'import hm_wrapper.sonarr'],
+        'hm sonarr command rss-sync': ['-m', 'hm_wrapper', 'sonarr', '--url', sonarr_url, '--api-key', 'key',
+                                       '--compact', 'command', 'rss-sync'],
+    }
+
+
+def _time(arguments: list, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + arguments, stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--limit', type=float, help='maximum milliseconds added by ' + ' and '.join(GUARDED))
+    args = parser.parse_args()
+
+    # the package is run from this checkout, not from whatever is installed
+    os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, (os.getcwd(), os.environ.get('PYTHONPATH'))))
+    server = FakeArrServer(LibrarySize(series=1, episodes_per_series=1, movies=1, history=1))
+    server.start()
+    try:
+        results = {name: _time(arguments, args.repeat) for name, arguments in _scenarios(server.sonarr_url).items()}
+    finally:
+        server.close()
+
+    baseline = results['python']
+    print(f'{"scenario":<28} {"ms":>7} {"added ms":>9}')
+    for name, seconds in results.items():
+        print(f'{name:<28} {seconds * 1000:>7.1f} {(seconds - baseline) * 1000:>9.1f}')
+    if args.limit is not None:
+        over = [name for name in GUARDED if (results[name] - baseline) * 1000 > args.limit]
+        if over:
+            print(f'over the limit of {args.limit:.0f} ms: {", ".join(over)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
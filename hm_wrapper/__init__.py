@@ -1,2 +1,27 @@
-from . import radarr
-from . import sonarr
+"""Python wrapper for the Sonarr and Radarr APIs.
+
+Submodules are imported on first use (hm_wrapper.sonarr, hm_wrapper.radarr, ...), so importing the package alone
+does not pull in requests; this keeps short-lived processes like the hm command quick to start.
+"""
+import importlib
+import sys
+
+_SUBMODULES = frozenset((
+    'aio', 'cache', 'cli', 'columnar', 'commands', 'exceptions', 'federation', 'metrics', 'mirror', 'models', 'proxy',
+    'radarr', 'ratelimit', 'resilience', 'sonarr', 'watch', 'webhook',
+))
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES)
+
+
+if sys.version_info < (3, 7):  # pragma: no cover - no module __getattr__ (PEP 562) before 3.7
+    from . import radarr
+    from . import sonarr
@@ -0,0 +1,5 @@
+import sys
+
+from hm_wrapper.cli import main
+
+sys.exit(main())
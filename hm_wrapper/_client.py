@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from urllib.parse import urlencode
+
+from hm_wrapper import _codec
+from hm_wrapper._concurrent import paged
+
+
+class ClientMixin(object):
+    """Plumbing shared by the Sonarr and Radarr clients. Expects host_url, transport, cache, lookup_cache and
+    _change_listeners attributes and a request_get method."""
+
+    def _cached_get(self, endpoint: str):
+        """GETs an endpoint through the response cache, if one is configured"""
+        url = f'{self.host_url}/{endpoint}'
+        if self.cache is None:
+            return _codec.decode(self.request_get(url))
+        return self.cache.fetch(url, endpoint, lambda headers: self.transport.request('GET', url, headers=headers))
+
+    def add_change_listener(self, callback):
+        """Registers callback(endpoint: str, record_ids: tuple), called after every call of this client that modified
+        an endpoint; record_ids holds the ids of the touched records, or is empty if they are not known"""
+        self._change_listeners.append(callback)
+
+    def remove_change_listener(self, callback):
+        self._change_listeners.remove(callback)
+
+    def _invalidate(self, endpoint: str, *record_ids):
+        """Drops cached responses of an endpoint after a call that modified it and notifies the change listeners"""
+        if self.cache is not None:
+            self.cache.invalidate(f'{self.host_url}/{endpoint}')
+        record_ids = tuple(i for i in record_ids if i is not None)
+        for callback in list(self._change_listeners):
+            callback(endpoint, record_ids)
+
+    def _cached_lookup(self, kind: str, term, url: str):
+        """GETs a metadata lookup through the lookup cache, if one is configured"""
+        if self.lookup_cache is None:
+            return _codec.decode(self.request_get(url))
+        return self.lookup_cache.fetch(f'{self.host_url}|{kind}|{term}', lambda: self.request_get(url))
+
+    def _stream(self, url: str, key: str = None, fields=None):
+        """GETs url with a streamed body and yields the items of its JSON array one at a time (see _codec.iter_array)"""
+        res = self.transport.request('GET', url, stream=True)
+        try:
+            res.raise_for_status()
+            yield from _codec.iter_array(res.iter_content(_codec.STREAM_CHUNK_SIZE), key=key, fields=fields)
+        finally:
+            res.close()
+
+    def _iter_pages(self, path: str, query: dict, max_workers: int):
+        """Yields the records of every page of a paged endpoint, max_workers pages fetched at a time"""
+        def fetch_page(page):
+            res = self.request_get(f'{self.host_url}/{path}?{urlencode(dict(query, page=page))}')
+            res.raise_for_status()
+            return _codec.decode(res)
+        return paged(fetch_page, max_workers=max_workers)
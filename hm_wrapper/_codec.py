@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""JSON encoding/decoding of request and response bodies.
+
+Bodies are serialized exactly once, straight to bytes, with the fastest backend available: orjson, then ujson, then
+the standard library. Set HM_WRAPPER_JSON=json (or ujson) to force a backend.
+"""
+import codecs
+import json
+import os
+import time
+
+CONTENT_TYPE = 'application/json'
+
+
+def _stdlib_backend():
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def dumps(obj) -> bytes:
+        return encoder.encode(obj).encode('utf-8')
+
+    def loads(data):
+        # json.loads(bytes) sniffs the encoding and decodes with surrogatepass, a plain utf-8 decode is faster
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+    return 'json', dumps, loads
+
+
+def _orjson_backend():
+    import orjson
+    return 'orjson', orjson.dumps, orjson.loads
+
+
+def _ujson_backend():
+    import ujson
+
+    def dumps(obj) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+
+    return 'ujson', dumps, ujson.loads
+
+
+_BACKENDS = {'orjson': _orjson_backend, 'ujson': _ujson_backend, 'json': _stdlib_backend}
+
+
+def _select_backend(preferred: str = None):
+    names = [preferred] if preferred else ['orjson', 'ujson', 'json']
+    for name in names:
+        try:
+            return _BACKENDS[name]()
+        except (ImportError, KeyError):
+            continue
+    return _stdlib_backend()
+
+
+BACKEND, _dumps, _loads = _select_backend(os.environ.get('HM_WRAPPER_JSON'))
+
+
+def dumps(obj) -> bytes:
+    """Serializes obj to UTF-8 encoded JSON bytes"""
+    return _dumps(obj)
+
+
+def loads(data):
+    """Parses JSON from bytes or str"""
+    return _loads(data)
+
+
+def encode_body(body) -> bytes:
+    """Returns the bytes to send for a JSON request body; str/bytes are taken to be JSON already and sent as they are"""
+    if isinstance(body, bytes):
+        return body
+    if isinstance(body, str):
+        return body.encode('utf-8')
+    # typed records (hm_wrapper.models) are sent as the dicts they came from
+    if hasattr(body, 'to_dict'):
+        body = body.to_dict()
+    elif isinstance(body, list) and body and hasattr(body[0], 'to_dict'):
+        body = [item.to_dict() for item in body]
+    return _dumps(body)
+
+
+def decode(res):
+    """Parses the JSON body of a response; an empty body gives None. Transports with metrics attach observe_decode to
+    their responses, which is then given the time spent parsing."""
+    content = res.content
+    if not content:
+        return None
+    observe = getattr(res, 'observe_decode', None)
+    if observe is None:
+        return _loads(content)
+    start = time.perf_counter()
+    obj = _loads(content)
+    observe(time.perf_counter() - start, len(content))
+    return obj
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = ' \t\n\r'
+
+
+class _StreamReader(object):
+    """Text buffer over an iterable of byte chunks that only keeps the unparsed tail in memory"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Appends the next chunk, dropping what was already consumed; False at the end of the stream"""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self.buf = self.buf[self.pos:] + text
+                self.pos = 0
+                return True
+        self.buf = self.buf[self.pos:] + self._decoder.decode(b'', final=True)
+        self.pos = 0
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, '' at the end of the stream"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if char == '' or char not in chars:
+            raise ValueError(f'expected one of {chars!r} at stream offset {self.pos}, got {char!r}')
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Parses the next complete JSON value, reading more chunks until it is complete"""
+        self.peek()
+        while True:
+            try:
+                obj, end = self._json.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            # a number or literal ending exactly at the end of the buffer may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_array(chunks, key: str = None, fields=None):
+    """
+    Incrementally parses a JSON array from an iterable of byte chunks and yields its items one at a time, so only
+    one item is held in memory regardless of the size of the document.
+    :param chunks: iterable of bytes, e.g. response.iter_content(STREAM_CHUNK_SIZE)
+    :param key: stream the array stored under this key of a top-level object (e.g. 'records' of a paged response)
+    instead of a top-level array
+    :param fields: if given, only these keys are kept of each item
+    """
+    reader = _StreamReader(chunks)
+    if key is not None:
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            name = reader.value()
+            reader.expect(':')
+            if name == key:
+                break
+            reader.value()
+            if reader.expect(',}') == '}':
+                return
+    if fields is not None:
+        fields = tuple(fields)
+    reader.expect('[')
+    if reader.peek() == ']':
+        return
+    while True:
+        item = reader.value()
+        if fields is not None and isinstance(item, dict):
+            item = {f: item[f] for f in fields if f in item}
+        yield item
+        if reader.expect(',]') == ']':
+            return
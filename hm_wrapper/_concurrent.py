@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+import math
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import NamedTuple
+
+from hm_wrapper import _codec
+
+DEFAULT_WORKERS = 8
+DEFAULT_PAGE_SIZE = 250
+
+
+def bounded_map(fn, items, max_workers: int = DEFAULT_WORKERS):
+    """Calls fn(item) for every item on a pool of max_workers threads and yields (item, result, exception) tuples in
+    completion order. Only a couple of calls per worker are queued at a time, so items may be a lazy iterable and
+    results stream out while later items are still being submitted. Closing the generator cancels anything queued.
+    """
+    items = iter(items)
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    pending = dict()
+    try:
+        for item in islice(items, max_workers * 2):
+            pending[pool.submit(fn, item)] = item
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                for nxt in islice(items, 1):
+                    pending[pool.submit(fn, nxt)] = nxt
+                exception = future.exception()
+                if exception is not None:
+                    yield item, None, exception
+                else:
+                    yield item, future.result(), None
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def ordered_map(fn, items, max_workers: int = DEFAULT_WORKERS):
+    """Like bounded_map, but yields the (item, result, exception) tuples in the order of items. Later items keep being
+    fetched while an earlier one is still running; their results are held back until it is done."""
+    results = bounded_map(lambda pair: fn(pair[1]), enumerate(items), max_workers=max_workers)
+    held = dict()
+    following = 0
+    try:
+        for (index, item), result, exception in results:
+            held[index] = (item, result, exception)
+            while following in held:
+                yield held.pop(following)
+                following += 1
+    finally:
+        results.close()
+
+
+def page_records(page: int, payload) -> list:
+    """Returns the records of a page of a paged endpoint, raising ValueError if payload is not one"""
+    if not isinstance(payload, dict) or 'records' not in payload:
+        raise ValueError(f'unexpected response for page {page}: {payload!r:.80}')
+    return payload['records'] or []
+
+
+def paged(fetch_page, max_workers: int = DEFAULT_WORKERS):
+    """
+    Yields the records of a paged endpoint, i.e. one answering {'page', 'pageSize', 'totalRecords', 'records'}.
+    Page 1 is fetched alone to learn totalRecords, then the remaining pages are fetched max_workers at a time and
+    their records yielded in page order. Records whose id was already yielded are skipped, since a record added while
+    paging shifts the later pages by one. A failing page raises its exception.
+    :param fetch_page: callable(page: int) returning the decoded page, 1-indexed
+    """
+    first = fetch_page(1)
+    records = page_records(1, first)
+    seen = set()
+    for record in records:
+        seen.add(record.get('id'))
+        yield record
+    page_size = first.get('pageSize') or len(records)
+    if page_size <= 0:
+        return
+    pages = math.ceil((first.get('totalRecords') or 0) / page_size)
+    results = ordered_map(fetch_page, range(2, pages + 1), max_workers=max_workers)
+    try:
+        for page, payload, error in results:
+            if error is not None:
+                raise error
+            for record in page_records(page, payload):
+                if record.get('id') not in seen:
+                    seen.add(record.get('id'))
+                    yield record
+    finally:
+        results.close()
+
+
+class ItemResult(NamedTuple):
+    """Outcome of one item of a bulk operation"""
+    key: object
+    # 'ok', 'skipped' or 'failed'
+    status: str
+    value: object = None
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 'ok'
+
+
+def bulk_apply(fn, keys, max_workers: int = DEFAULT_WORKERS) -> list:
+    """Runs fn(key) for every key concurrently and returns an ItemResult per key, in the order of keys.
+    Exceptions raised by fn are captured in the failed item's result instead of being raised."""
+    keys = list(keys)
+    results = dict()
+    for index, value, error in bounded_map(lambda i: fn(keys[i]), range(len(keys)), max_workers=max_workers):
+        if error is not None:
+            results[index] = ItemResult(keys[index], 'failed', error=error)
+        else:
+            results[index] = ItemResult(keys[index], 'ok', value)
+    return [results[i] for i in range(len(keys))]
+
+
+DEFAULT_CHUNK_SIZE = 100
+# statuses of a server without the bulk endpoint (older versions)
+_UNSUPPORTED_STATUSES = frozenset((404, 405))
+
+
+def chunked(items: list, size: int) -> list:
+    """Splits items into lists of at most size items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _returned(res) -> dict:
+    """Returns the resources listed in the response of a bulk request by id"""
+    res.raise_for_status()
+    payload = _codec.decode(res)
+    if isinstance(payload, list):
+        return {r.get('id'): r for r in payload if isinstance(r, dict)}
+    return dict()
+
+
+def bulk_chunked(items, send_chunk, send_one, key=lambda item: item, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_workers: int = DEFAULT_WORKERS) -> list:
+    """
+    Applies a change to many items through a bulk endpoint, chunk_size items per request with up to max_workers
+    requests at once, falling back to one request per item if the server does not have the endpoint (404/405 on the
+    first chunk). Returns an ItemResult per item, keyed by key(item), in the order of items; a failed chunk fails all
+    of its items.
+    :param send_chunk: callable(chunk) that sends a chunk to the bulk endpoint and returns the response
+    :param send_one: callable(item) that applies the change to one item and returns its result, or raises
+    :param key: returns the key of an item, e.g. its id; the resources listed in the bulk responses are matched to
+    the items by their id and become the values of the results
+    """
+    items = list(items)
+    if len(items) == 0:
+        return []
+    chunks = chunked(items, chunk_size)
+
+    # the first chunk finds out whether the endpoint exists
+    try:
+        res = send_chunk(chunks[0])
+        if res.status_code in _UNSUPPORTED_STATUSES:
+            return [r._replace(key=key(item))
+                    for item, r in zip(items, bulk_apply(send_one, items, max_workers=max_workers))]
+        outcomes = [(chunks[0], _returned(res), None)]
+    except Exception as e:
+        outcomes = [(chunks[0], None, e)]
+    outcomes.extend(ordered_map(lambda chunk: _returned(send_chunk(chunk)), chunks[1:], max_workers=max_workers))
+
+    results = []
+    for chunk, returned, error in outcomes:
+        for item in chunk:
+            k = key(item)
+            if error is not None:
+                results.append(ItemResult(k, 'failed', error=error))
+            else:
+                results.append(ItemResult(k, 'ok', returned.get(k)))
+    return results
+
+
+def delete_queue_item(client, queue_id: int, blacklist: bool):
+    """Removes one queue item of a Sonarr or Radarr client, raising on failure; the send_one of bulk queue deletes"""
+    res = client.request_del(f'{client.host_url}/queue/{queue_id}?blacklist={str(blacklist).lower()}', None)
+    res.raise_for_status()
+
+
+def bulk_update(items, changes: dict, fetch_all, send_chunk, send_one, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                max_workers: int = DEFAULT_WORKERS) -> list:
+    """
+    bulk_chunked for saving records: items are records or ids of records, ids are resolved with one fetch_all() call
+    and changes is applied to a copy of every record before it is sent. Returns an ItemResult per record id, in the
+    order of items; an id that fetch_all() does not return is failed with a LookupError.
+    """
+    library = None
+    records = []
+    keys = []
+    results = dict()
+    for item in items:
+        if isinstance(item, int):
+            if library is None:
+                library = {r.get('id'): r for r in fetch_all()}
+            if item not in library:
+                keys.append(item)
+                results[item] = ItemResult(item, 'failed', error=LookupError(f'no record with id {item}'))
+                continue
+            item = library[item]
+        record = dict(item, **(changes or {}))
+        keys.append(record.get('id'))
+        records.append(record)
+    for result in bulk_chunked(records, send_chunk, send_one, key=lambda r: r.get('id'), chunk_size=chunk_size,
+                               max_workers=max_workers):
+        results[result.key] = result
+    return [results[k] for k in keys]
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import functools
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from hm_wrapper import _codec
+from hm_wrapper.metrics import Metrics
+from hm_wrapper.resilience import CircuitBreaker, RetryPolicy, UNAVAILABLE_STATUSES
+
+DEFAULT_POOL_SIZE = 10
+# (connect, read) in seconds
+DEFAULT_TIMEOUT = (10, 60)
+# marks the retry / circuit_breaker arguments that were not given, None turns them off
+_DEFAULT = object()
+# Unix socket of a local proxy daemon (see hm_wrapper.proxy) that new clients should send their requests through
+PROXY_ENV = 'HM_WRAPPER_PROXY'
+
+
+def host_key(url: str) -> str:
+    """Returns the scheme://host[:port] part of url, used to key connection pools"""
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'.lower()
+
+
+class Transport(object):
+    """Pooled keep-alive HTTP transport used by the Sonarr and Radarr clients.
+
+    Every host gets one connection pool (an HTTPAdapter) of at most pool_size keep-alive connections. Each thread
+    talks through its own requests.Session mounted on that shared adapter, so a single client (or transport) can be
+    used from many worker threads at once while still reusing the same TCP/TLS connections.
+
+    Every request has a timeout, idempotent requests are retried with backoff (see resilience.RetryPolicy) and a
+    per-host circuit breaker fails requests fast while their host is down (see resilience.CircuitBreaker). With a
+    metrics registry, every request reports its latency, size, status and retries (see metrics.Metrics).
+    """
+
+    def __init__(self, api_key: str = None, pool_size: int = DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 headers: dict = None, retry: RetryPolicy = _DEFAULT, circuit_breaker: CircuitBreaker = _DEFAULT,
+                 metrics: Metrics = None):
+        """
+        :param api_key: sent as the X-Api-Key header on every request
+        :param pool_size: maximum number of pooled connections per host; extra concurrent requests wait for a free one
+        :param timeout: default timeout for every request, either seconds or a (connect, read) tuple
+        :param headers: extra headers to preset on every request
+        :param retry: RetryPolicy of the GET/HEAD requests, defaults to RetryPolicy(); None disables retries
+        :param circuit_breaker: defaults to a CircuitBreaker() of this transport; None disables it
+        :param metrics: Metrics registry to report requests and response decoding to
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retry = RetryPolicy() if retry is _DEFAULT else retry
+        self.circuit_breaker = CircuitBreaker() if circuit_breaker is _DEFAULT else circuit_breaker
+        self.metrics = metrics
+        self.headers = dict()
+        if api_key is not None:
+            self.headers['X-Api-Key'] = api_key
+        if headers is not None:
+            self.headers.update(headers)
+
+        self._adapters = dict()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def adapter(self, url: str) -> HTTPAdapter:
+        """Returns the connection pool for the host of url, creating it on first use"""
+        key = host_key(url)
+        adapter = self._adapters.get(key)
+        if adapter is None:
+            with self._lock:
+                adapter = self._adapters.get(key)
+                if adapter is None:
+                    adapter = self._new_adapter()
+                    self._adapters[key] = adapter
+        return adapter
+
+    def _new_adapter(self) -> HTTPAdapter:
+        return HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+
+    def session(self, url: str) -> requests.Session:
+        """Returns the calling thread's session for the host of url"""
+        key = host_key(url)
+        sessions = getattr(self._local, 'sessions', None)
+        if sessions is None:
+            sessions = self._local.sessions = dict()
+        session = sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount(key + '/', self.adapter(url))
+            sessions[key] = session
+        return session
+
+    def request(self, method: str, url: str, json=None, **kwargs) -> requests.Response:
+        """Sends a request through the pooled session for url; accepts the same keyword arguments as requests.
+        A json body is serialized once by the codec; str or bytes are taken to be serialized JSON already.
+        Raises CircuitOpenError without sending anything while the circuit breaker of the host is open."""
+        if self.metrics is None:
+            return self._send(method, url, json, kwargs)
+        metrics = self.metrics
+        retries = []
+        start = time.perf_counter()
+        try:
+            res = self._send(method, url, json, kwargs, retries)
+        except Exception:
+            metrics.observe_request(method, url, 'error', time.perf_counter() - start, retries=len(retries))
+            raise
+        if kwargs.get('stream'):
+            # the body has not been read yet
+            nbytes = int(res.headers.get('Content-Length') or 0)
+        else:
+            nbytes = len(res.content)
+        metrics.observe_request(method, url, res.status_code, time.perf_counter() - start, nbytes, len(retries))
+        res.observe_decode = functools.partial(metrics.observe_decode, method, url)
+        return res
+
+    def _send(self, method: str, url: str, json, kwargs: dict, retries: list = None) -> requests.Response:
+        """Sends the request, retrying it as the retry policy allows; the delay before every retry is appended to
+        retries"""
+        if json is not None:
+            kwargs['data'] = _codec.encode_body(json)
+            headers = {'Content-Type': _codec.CONTENT_TYPE}
+            if kwargs.get('headers'):
+                headers.update(kwargs['headers'])
+            kwargs['headers'] = headers
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        session = self.session(url)
+        host = host_key(url)
+        breaker = self.circuit_breaker
+        retry = self.retry
+        attempt = 0
+        while True:
+            probe = breaker is not None and breaker.before(host)
+            try:
+                res = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if breaker is not None:
+                    breaker.failure(host)
+                if retry is None or not retry.retryable(method, attempt):
+                    raise
+                delay = retry.delay(attempt)
+            except BaseException:
+                # a client-side error (bad URL, header or argument, too many redirects) or an interruption says
+                # nothing about the host: let the next request probe it again
+                if probe:
+                    breaker.release(host)
+                raise
+            else:
+                if breaker is not None:
+                    if res.status_code in UNAVAILABLE_STATUSES:
+                        breaker.failure(host)
+                    else:
+                        breaker.success(host)
+                if retry is None or not retry.retryable(method, attempt, res.status_code):
+                    return res
+                res.close()
+                delay = retry.delay(attempt, res.headers.get('Retry-After'))
+            if retries is not None:
+                retries.append(delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        """Closes every pooled connection; the transport can still be used afterwards and will reconnect"""
+        with self._lock:
+            adapters = list(self._adapters.values())
+            self._adapters.clear()
+        for adapter in adapters:
+            adapter.close()
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def new_transport(api_key: str = None, pool_size: int = DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                  metrics: Metrics = None) -> Transport:
+    """Returns the transport of a client that was not given one: a Transport, or a proxy.ProxyTransport when
+    $HM_WRAPPER_PROXY names the socket of a running proxy daemon"""
+    socket_path = os.environ.get(PROXY_ENV)
+    if socket_path:
+        from hm_wrapper.proxy import ProxyTransport, _listening
+        # a daemon that was killed leaves its socket file behind, so check that something accepts connections
+        if _listening(socket_path):
+            return ProxyTransport(socket_path, api_key, pool_size=pool_size, timeout=timeout, metrics=metrics)
+    return Transport(api_key, pool_size=pool_size, timeout=timeout, metrics=metrics)
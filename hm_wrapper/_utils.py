@@ -1,99 +1,196 @@
 import datetime
+import functools
+import re
+from typing import NamedTuple
+
+from hm_wrapper import _codec
+
+
+# a date with one or two digit month/day and a two or four digit year, the same separator ('-' or '/') twice
+_DATE_PATTERN = re.compile(r'(\d{1,4})([-/])(\d{1,2})\2(\d{1,4})')
+# tried in this order; a date that is valid in more than one order (1/2/19) is read in the first that fits
+_DATE_ORDERS = ((0, 1, 2), (1, 0, 2), (1, 2, 0))  # (month, day, year) positions for M|D|Y, D|M|Y, Y|M|D
+
+
+def _year(part: str):
+    # like strptime: %y is exactly two digits (69-99 -> 19xx, 00-68 -> 20xx), %Y exactly four
+    if len(part) == 2:
+        year = int(part)
+        return year + (1900 if year >= 69 else 2000)
+    if len(part) == 4:
+        return int(part)
+    return None
+
+
+def _date_from_parts(parts: tuple, order: tuple):
+    month, day, year = (parts[i] for i in order)
+    if len(month) > 2 or len(day) > 2:
+        return None
+    year = _year(year)
+    if year is None:
+        return None
+    try:
+        return datetime.datetime(year, int(month), int(day))
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date_string(date_string: str, first_order: tuple = None):
+    """Returns (datetime, order it was read in) or raises TypeError if date_string is not a date"""
+    match = _DATE_PATTERN.fullmatch(date_string)
+    if match is None:
+        raise TypeError(f'unrecognized date: {date_string!r}')
+    parts = (match.group(1), match.group(3), match.group(4))
+    if len(parts[0]) == 4:
+        # unambiguous, and says nothing about how the ambiguous dates around it are written
+        result = _date_from_parts(parts, (1, 2, 0))
+        if result is None:
+            raise TypeError(f'unrecognized date: {date_string!r}')
+        return result, first_order
+    orders = _DATE_ORDERS
+    if first_order is not None:
+        orders = (first_order,) + orders
+    for order in orders:
+        result = _date_from_parts(parts, order)
+        if result is not None:
+            return result, order
+    raise TypeError(f'unrecognized date: {date_string!r}')
+
+
+@functools.lru_cache(maxsize=4096)
+def _iso_date_string(date_string: str) -> str:
+    return _parse_date_string(date_string)[0].isoformat()
 
 
 def parse_date_input(date_object: object) -> str:
     """
     accepts datetime, date objects or date formatted strings (eg 1/2/19);  should be able to handle most regional
-    format variations.
+    format variations (M/D/Y, D/M/Y or Y/M/D with '/' or '-', two or four digit years).
     Returns an ISO 8601 formatted date string
      :type date_object: object
     """
-    iso_formatted_string: str
     if isinstance(date_object, datetime.datetime):
-        iso_formatted_string = datetime.datetime(date_object).isoformat(timespec='seconds')
-    elif isinstance(date_object, datetime.date):
-        iso_formatted_string = datetime.date(date_object).isoformat()
-    else:
-        input_datetime: datetime.datetime
-        input_datetime = None
-        sep_chars = {'-', '/'}
-        date_formats_order = {'M|D|Y', 'D|M|Y', 'Y|M|D'}
-        for ordr in date_formats_order:
-            if input_datetime is not None:
-                break
-            else:
-                for sep in sep_chars:
-                    result: datetime.datetime
-
-                    try:
-                        form = ordr.replace('|', sep).replace('M', '%m').replace('Y', '%y').replace('D', '%d')
-                        result = datetime.datetime.strptime(date_object, form)
-                    except ValueError:
-                        try:
-                            form = ordr.replace('|', sep).replace('M', '%m').replace('Y', '%Y').replace('D', '%d')
-                            result = datetime.datetime.strptime(date_object, form)
-                        except ValueError:
-                            result = None
-                            pass
-                    finally:
-                        if result is not None:
-                            input_datetime = result
-                            break
-        if input_datetime is not None:
-            iso_formatted_string = input_datetime.isoformat()
+        return date_object.isoformat(timespec='seconds')
+    if isinstance(date_object, datetime.date):
+        return date_object.isoformat()
+    if not isinstance(date_object, str):
+        raise TypeError(f'unrecognized date: {date_object!r}')
+    return _iso_date_string(date_object)
+
+
+def parse_date_inputs(date_objects) -> list:
+    """
+    Parses a sequence of dates in one call, see parse_date_input.
+    The order (M/D/Y, D/M/Y or Y/M/D) the previous string was read in is tried first for the next one, so a batch
+    written in one regional format is read consistently (after 13/01/20, 01/02/20 is the 1st of February).
+    """
+    results = []
+    last_order = None
+    for date_object in date_objects:
+        if isinstance(date_object, str):
+            result, last_order = _parse_date_string(date_object, last_order)
+            results.append(result.isoformat())
         else:
-            raise TypeError
-    return iso_formatted_string
+            results.append(parse_date_input(date_object))
+    return results
 
 
-def dict_to_json(args: dict) -> str:
+def parse_date(date_object: object) -> datetime.date:
+    """Like parse_date_input, but returns a datetime.date"""
+    if isinstance(date_object, datetime.datetime):
+        return date_object.date()
+    if isinstance(date_object, datetime.date):
+        return date_object
+    if not isinstance(date_object, str):
+        raise TypeError(f'unrecognized date: {date_object!r}')
+    return _parse_date_string(date_object)[0].date()
+
+
+DEFAULT_WINDOW_DAYS = 14
+
+
+class CalendarWindow(NamedTuple):
+    """The calendar entries of one window of a range fetched by iter_calendar"""
+    start: datetime.date
+    end: datetime.date
+    items: list
+
+
+def date_windows(start_date, end_date, days: int = DEFAULT_WINDOW_DAYS) -> list:
+    """
+    Splits the range from start_date to end_date into consecutive (start, end) windows of at most days days, each
+    window ending on the day the next one starts.
     """
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    if days < 1:
+        raise ValueError('days must be at least 1')
+    if end < start:
+        raise ValueError(f'end date {end} is before start date {start}')
+    step = datetime.timedelta(days=days)
+    windows = []
+    while True:
+        stop = min(start + step, end)
+        windows.append((start, stop))
+        if stop >= end:
+            return windows
+        start = stop
+
+
+def new_in_window(items: list, seen: set, sort_key) -> list:
+    """Returns the items of a calendar window whose id is not in seen, sorted by sort_key, and adds their ids to seen
+    (the server returns an entry on the boundary of two windows in both)"""
+    fresh = []
+    for item in items:
+        item_id = record_id(item)
+        if item_id is None or item_id not in seen:
+            seen.add(item_id)
+            fresh.append(item)
+    fresh.sort(key=sort_key)
+    return fresh
 
+
+def dict_to_json(args: dict) -> str:
+    """
+    Serializes a flat dict of request arguments: lists keep their int/bool items and stringify the rest,
+    other values are sent as strings.
     :rtype: object
     """
     if args is None or len(args) == 0:
         return None
-    else:
-        json_body = "{"
-        for key, value in args.items():
-            if isinstance(value, list):
-                json_body += f'\"{key}\": ['
-                for i in value:
-                    if isinstance(i, int):
-                        json_body += f'{i}, '
-                    elif isinstance(i, bool):
-                        if bool(i):
-                            json_body += 'true, '
-                        else:
-                            json_body += 'false, '
-                    else:
-                        json_body += f'\"{i}\", '
-                json_body = json_body.rstrip(', ')
-                json_body += ']'
-            else:
-                json_body += f'\"{key}\":\"{value}\", '
-        json_body = json_body.rstrip(', ')
-        json_body += "}"
-        return json_body
+    body = dict()
+    for key, value in args.items():
+        if isinstance(value, list):
+            body[key] = [i if isinstance(i, (int, bool)) else str(i) for i in value]
+        else:
+            body[key] = str(value)
+    return _codec.dumps(body).decode('utf-8')
 
 
 def parse_json_item(item: object) -> str:
-    if isinstance(item, int):
-        return str(item)
-    elif isinstance(item, bool):
-        if bool(item):
-            return 'true'
-        else:
-            return 'false'
-    elif isinstance(item, list):
-        return parse_json_list(item)
-    elif isinstance(item, dict):
-        return dict_to_json(item)
+    return _codec.dumps(item).decode('utf-8')
 
 
 def parse_json_list(litem: list) -> str:
-    json_item = '['
-    for li in litem:
-        json_item += parse_json_item(li) + ', '
-    json_item += ']'
-    return json_item
+    return _codec.dumps(litem).decode('utf-8')
+
+
+def record_id(payload):
+    """Returns the 'id' of an API resource, or None if payload is not a resource (e.g. an error response)"""
+    if isinstance(payload, dict):
+        return payload.get('id')
+    return None
+
+
+def page_query(page_size: int, sort_key: str = None, sort_dir: str = None, monitored_only: bool = False) -> dict:
+    """Returns the query parameters of a paged endpoint (history, wanted/missing, wanted/cutoff), without the page"""
+    query = {'pageSize': page_size}
+    if sort_key is not None:
+        query['sortKey'] = sort_key
+    if sort_dir is not None:
+        query['sortDir'] = sort_dir
+    if monitored_only:
+        query['filterKey'] = 'monitored'
+        query['filterValue'] = 'true'
+    return query
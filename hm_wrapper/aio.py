@@ -0,0 +1,717 @@
+# -*- coding: utf-8 -*-
+"""asyncio variants of the Sonarr and Radarr clients, built on aiohttp (pip install hm_wrapper[async])"""
+import asyncio
+import functools
+import math
+import time
+
+from hm_wrapper import _codec, _utils
+from hm_wrapper._concurrent import page_records, DEFAULT_PAGE_SIZE
+from hm_wrapper._transport import DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, _DEFAULT, host_key
+from hm_wrapper.metrics import Metrics
+from hm_wrapper.radarr import _release_date
+from hm_wrapper.ratelimit import RateLimiter, NORMAL
+from hm_wrapper.resilience import CircuitBreaker, RetryPolicy, UNAVAILABLE_STATUSES
+from hm_wrapper.sonarr import _air_date, _new_series_object, _series_json_from_lookup
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+DEFAULT_CONCURRENCY = 32
+
+
+class AsyncResponse(object):
+    """A fully read response; the body is read before the connection goes back to the pool"""
+    __slots__ = ('status_code', 'headers', 'content', 'url', 'observe_decode')
+
+    def __init__(self, status_code: int, headers, content: bytes, url: str):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.observe_decode = None
+
+    def json(self):
+        return _codec.decode(self)
+
+
+class AsyncTransport(object):
+    """aiohttp counterpart of Transport: one pooled ClientSession plus a semaphore bounding in-flight requests.
+
+    The session and semaphore are created on first use so that they bind to the running event loop. Retries and
+    circuit breaking work as in Transport, and so do metrics.
+    """
+
+    def __init__(self, api_key: str = None, pool_size: int = DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 concurrency: int = DEFAULT_CONCURRENCY, headers: dict = None, retry: RetryPolicy = _DEFAULT,
+                 circuit_breaker: CircuitBreaker = _DEFAULT, metrics: Metrics = None):
+        """
+        :param api_key: sent as the X-Api-Key header on every request
+        :param pool_size: maximum number of pooled connections per host
+        :param timeout: default timeout for every request, either seconds or a (connect, read) tuple
+        :param concurrency: maximum number of requests in flight at once through this transport
+        :param headers: extra headers to preset on every request
+        :param retry: RetryPolicy of the GET/HEAD requests, defaults to RetryPolicy(); None disables retries
+        :param circuit_breaker: defaults to a CircuitBreaker() of this transport; None disables it
+        :param metrics: Metrics registry to report requests and response decoding to
+        """
+        if aiohttp is None:
+            raise ImportError('the asyncio clients require aiohttp: pip install hm_wrapper[async]')
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.headers = dict()
+        if api_key is not None:
+            self.headers['X-Api-Key'] = api_key
+        if headers is not None:
+            self.headers.update(headers)
+        self.retry = RetryPolicy() if retry is _DEFAULT else retry
+        self.circuit_breaker = CircuitBreaker() if circuit_breaker is _DEFAULT else circuit_breaker
+        self.metrics = metrics
+        self._session = None
+        self._semaphore = None
+
+    @staticmethod
+    def _client_timeout(timeout):
+        if isinstance(timeout, (tuple, list)):
+            connect, read = timeout
+            return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=timeout)
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                                  timeout=self._client_timeout(self.timeout))
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def request(self, method: str, url: str, params: dict = None, json=None, timeout=None) -> AsyncResponse:
+        """Sends a request and returns it with its body already read"""
+        if self.metrics is None:
+            return await self._send(method, url, params, json, timeout)
+        metrics = self.metrics
+        retries = []
+        start = time.perf_counter()
+        try:
+            response = await self._send(method, url, params, json, timeout, retries)
+        except Exception:
+            metrics.observe_request(method, url, 'error', time.perf_counter() - start, retries=len(retries))
+            raise
+        metrics.observe_request(method, url, response.status_code, time.perf_counter() - start,
+                                len(response.content), len(retries))
+        response.observe_decode = functools.partial(metrics.observe_decode, method, url)
+        return response
+
+    async def _send(self, method: str, url: str, params: dict, json, timeout, retries: list = None) -> AsyncResponse:
+        session = self._get_session()
+        kwargs = dict()
+        if params is not None:
+            kwargs['params'] = {key: str(value) for key, value in params.items()}
+        if json is not None:
+            kwargs['data'] = _codec.encode_body(json)
+            kwargs['headers'] = {'Content-Type': _codec.CONTENT_TYPE}
+        if timeout is not None:
+            kwargs['timeout'] = self._client_timeout(timeout)
+        host = host_key(url)
+        breaker = self.circuit_breaker
+        retry = self.retry
+        attempt = 0
+        while True:
+            probe = breaker is not None and breaker.before(host)
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, **kwargs) as res:
+                        content = await res.read()
+                        response = AsyncResponse(res.status, res.headers, content, str(res.url))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if breaker is not None:
+                    breaker.failure(host)
+                if retry is None or not retry.retryable(method, attempt):
+                    raise
+                delay = retry.delay(attempt)
+            except asyncio.CancelledError:
+                # the caller gave up (an Exception before Python 3.8), which says nothing about the host
+                if probe:
+                    breaker.release(host)
+                raise
+            except BaseException:
+                # a client-side error (bad URL, header or argument, too many redirects) or an interruption says
+                # nothing about the host: let the next request probe it again
+                if probe:
+                    breaker.release(host)
+                raise
+            else:
+                if breaker is not None:
+                    if response.status_code in UNAVAILABLE_STATUSES:
+                        breaker.failure(host)
+                    else:
+                        breaker.success(host)
+                if retry is None or not retry.retryable(method, attempt, response.status_code):
+                    return response
+                delay = retry.delay(attempt, response.headers.get('Retry-After'))
+            if retries is not None:
+                retries.append(delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+def _api_url(host_url: str) -> str:
+    if host_url.rstrip('/').endswith('api'):
+        return host_url.rstrip('/')
+    return host_url.rstrip('/') + '/api'
+
+
+def _command_body(kwargs: dict) -> dict:
+    return {key: value for key, value in kwargs.items() if value is not None}
+
+
+async def _rate_limit(rate_limiter: RateLimiter, command_name: str, priority: int):
+    if rate_limiter is not None:
+        await rate_limiter.acquire_async(command_name, priority)
+
+
+def _calendar_params(start_date, end_date) -> dict:
+    query_params = dict()
+    if start_date is not None:
+        query_params['start'] = _utils.parse_date_input(start_date)
+    if end_date is not None:
+        query_params['end'] = _utils.parse_date_input(end_date)
+    return query_params
+
+
+async def _merged_calendar(client, windows: list, window_sort_key) -> list:
+    """Fetches the calendar windows concurrently and merges them in order without duplicates;
+    window_sort_key(window start as ISO date) returns the sort key for that window's entries"""
+    chunks = await asyncio.gather(*(client._get('calendar', params={'start': start.isoformat(), 'end': end.isoformat()})
+                                    for start, end in windows))
+    seen = set()
+    merged = []
+    for (start, _), items in zip(windows, chunks):
+        merged.extend(_utils.new_in_window(items or [], seen, window_sort_key(start.isoformat())))
+    return merged
+
+
+async def _all_pages(client, path: str, params: dict) -> list:
+    """Async counterpart of _concurrent.paged: fetches page 1 to learn totalRecords, then the remaining pages at once
+    (bounded by the transport's concurrency), and returns their records in order without duplicate ids"""
+    first = await client._get(path, params=dict(params, page=1))
+    pages = [page_records(1, first)]
+    page_size = first.get('pageSize') or len(pages[0])
+    if page_size > 0:
+        numbers = range(2, math.ceil((first.get('totalRecords') or 0) / page_size) + 1)
+        payloads = await asyncio.gather(*(client._get(path, params=dict(params, page=page)) for page in numbers))
+        pages.extend(page_records(page, payload) for page, payload in zip(numbers, payloads))
+    seen = set()
+    records = []
+    for page in pages:
+        for record in page:
+            if record.get('id') not in seen:
+                seen.add(record.get('id'))
+                records.append(record)
+    return records
+
+
+class AsyncSonarr(object):
+    """asyncio version of hm_wrapper.sonarr.Sonarr; every API method is a coroutine with the same arguments"""
+
+    def __init__(self, host_url: str, api_key: str, pool_size: int = DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 concurrency: int = DEFAULT_CONCURRENCY, transport: AsyncTransport = None,
+                 rate_limiter: RateLimiter = None, metrics: Metrics = None):
+        """Constructor requires Host-URL and API-KEY
+        :param concurrency: maximum number of requests this client has in flight at once
+        :param transport: use an existing AsyncTransport; pool_size, timeout and concurrency are then ignored
+        :param rate_limiter: optional RateLimiter for indexer-heavy commands, may be shared with synchronous clients
+        :param metrics: optional Metrics registry recording every request, may be shared with synchronous clients
+        """
+        self.host_url = _api_url(host_url)
+        self.api_key = api_key
+        if transport is None:
+            transport = AsyncTransport(api_key, pool_size=pool_size, timeout=timeout, concurrency=concurrency,
+                                       metrics=metrics)
+        elif metrics is not None:
+            transport.metrics = metrics
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+        self.Commands = self._Commands(self)
+
+    async def _get(self, path: str, params: dict = None):
+        res = await self.request_get(f'{self.host_url}/{path}', params=params)
+        return res.json()
+
+    # ENDPOINT CALENDAR
+    async def get_calendar(self, start_date=None, end_date=None, window_days: int = _utils.DEFAULT_WINDOW_DAYS):
+        """Gets upcoming episodes, if start/end are not supplied episodes airing today and tomorrow will be returned;
+        a range longer than window_days is fetched as concurrent windows and merged, see Sonarr.get_calendar"""
+        if start_date is not None and end_date is not None:
+            windows = _utils.date_windows(start_date, end_date, window_days)
+            if len(windows) > 1:
+                return await _merged_calendar(self, windows, lambda after: _air_date)
+        return await self._get('calendar', params=_calendar_params(start_date, end_date))
+
+    # ENDPOINT COMMAND
+    async def run_command(self, priority: int = NORMAL, **kwargs):
+        ags = _command_body(kwargs)
+        await _rate_limit(self.rate_limiter, ags['name'], priority)
+        res = await self.request_post(f'{self.host_url}/command', data=ags)
+        return res.json()
+
+    async def get_command(self, command_id: int = None):
+        """Without an id argument, returns the status of all currently started commands;
+        if id argument is supplied, it will return the status of just that command"""
+        if command_id is None:
+            return await self._get('command')
+        return await self._get(f'command/{command_id}')
+
+    # ENDPOINT DISKSPACE
+    async def get_diskspace(self) -> list:
+        """Return Information about Diskspace"""
+        return await self._get('diskspace')
+
+    # ENDPOINT EPISODE
+    async def get_episodes_by_series_id(self, series_id) -> list:
+        """Returns all episodes for the given series"""
+        return await self._get('episode', params={'seriesId': series_id})
+
+    async def get_episode_by_episode_id(self, episode_id):
+        """Returns the episode with the matching id"""
+        return await self._get(f'episode/{episode_id}')
+
+    async def upd_episode(self, data):
+        """Update the given episode, currently only monitored is changed, all other modifications are ignored"""
+        res = await self.request_put(f'{self.host_url}/episode', data)
+        return res.json()
+
+    # ENDPOINT EPISODE FILE
+    async def get_episode_files_by_series_id(self, series_id) -> list:
+        """Returns all episode files for the given series"""
+        return await self._get('episodefile', params={'seriesId': series_id})
+
+    async def get_episode_file_by_episode_id(self, episode_id):
+        """Returns the episode file with the matching id"""
+        return await self._get(f'episodefile/{episode_id}')
+
+    async def rem_episode_file_by_episode_id(self, episode_id):
+        """Delete the given episode file"""
+        res = await self.request_del(f'{self.host_url}/episodefile/{episode_id}')
+        return res.json()
+
+    # ENDPOINT HISTORY
+    async def get_history(self):
+        """Gets history (grabs/failures/completed)"""
+        return await self._get('history')
+
+    async def get_history_size(self, page_size):
+        """Gets history (grabs/failures/completed)"""
+        return await self._get('history', params={'pageSize': page_size})
+
+    async def get_all_history(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'date', sort_dir: str = 'desc'):
+        """Gets the whole history, newest first by default, fetching the pages after the first concurrently"""
+        return await _all_pages(self, 'history', _utils.page_query(page_size, sort_key, sort_dir))
+
+    # ENDPOINT WANTED MISSING
+    async def get_wanted_missing(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'airDateUtc',
+                                 sort_dir: str = 'desc', monitored_only: bool = True):
+        """Gets missing episode (episodes without files), every page of them"""
+        return await _all_pages(self, 'wanted/missing', _utils.page_query(page_size, sort_key, sort_dir,
+                                                                          monitored_only))
+
+    # ENDPOINT WANTED CUTOFF
+    async def get_cutoff_unmet(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'airDateUtc',
+                               sort_dir: str = 'desc', monitored_only: bool = True):
+        """Gets the episodes whose file is below the cutoff of their quality profile, every page of them"""
+        return await _all_pages(self, 'wanted/cutoff', _utils.page_query(page_size, sort_key, sort_dir,
+                                                                         monitored_only))
+
+    # ENDPOINT QUEUE
+    async def get_queue(self):
+        """Gets current downloading info"""
+        return await self._get('queue')
+
+    # ENDPOINT PROFILE
+    async def get_quality_profiles(self):
+        """Gets all quality profiles"""
+        return await self._get('profile')
+
+    # ENDPOINT RELEASE/PUSH
+    async def push_release(self, title, download_url, protocol, publish_date):
+        """Notifies Sonarr of a new release."""
+        res = await self.request_post(f'{self.host_url}/release/push', {
+            'title': title,
+            'download_url': download_url,
+            'protocol': protocol,
+            'publish_date': publish_date
+        })
+        return res.json()
+
+    # ENDPOINT ROOTFOLDER
+    async def get_root_folder(self):
+        """Returns the Root Folder"""
+        return await self._get('rootfolder')
+
+    # ENDPOINT SERIES
+    async def get_series(self):
+        """Return all series in your collection"""
+        return await self._get('series')
+
+    async def get_series_by_series_id(self, series_id):
+        """Return the series with the matching ID or 404 if no matching series is found"""
+        return await self._get(f'series/{series_id}')
+
+    # noinspection PyPep8Naming
+    async def construct_series_json(self, tvdbId, quality_profile):
+        """Searches for new shows on trakt and returns Series object to add"""
+        lookup, root_folders = await asyncio.gather(self.lookup_series(f'tvdbId:{tvdbId}'), self.get_root_folder())
+        return _series_json_from_lookup(lookup[0], tvdbId, quality_profile, root_folders[0]['path'])
+
+    # noinspection PyPep8Naming
+    async def add_series_by_tvdbId(self, tvdbId, quality_profile):
+        series_json = await self.construct_series_json(tvdbId=tvdbId, quality_profile=quality_profile)
+        return await self.add_series_from_json(series_json)
+
+    # noinspection PyPep8Naming
+    async def add_series_by_parameters(self, tvdbId: int, title: str, profileId: int, titleSlug: str, images: list,
+                                       seasons: list, **kwargs):
+        """Adds a series to Sonarr, takes the same optional arguments as Sonarr.add_series_by_parameters"""
+        return await self.add_series_from_json(
+            _new_series_object(tvdbId=tvdbId, title=title, profileId=profileId, titleSlug=titleSlug, images=images,
+                               seasons=seasons, **kwargs))
+
+    async def add_series_from_json(self, series_json):
+        """Add a new series to your collection from pre-assembled json"""
+        res = await self.request_post(f'{self.host_url}/series', data=series_json)
+        return res.json()
+
+    async def upd_series(self, data):
+        """Update an existing series"""
+        res = await self.request_put(f'{self.host_url}/series', data)
+        return res.json()
+
+    async def rem_series(self, series_id, rem_files=False):
+        """Delete the series with the given ID"""
+        res = await self.request_del(f'{self.host_url}/series/{series_id}', {'deleteFiles': 'true'})
+        return res.json()
+
+    # ENDPOINT SERIES LOOKUP
+    async def lookup_series(self, query):
+        """Searches for new shows on trakt"""
+        return await self._get('series/lookup', params={'term': query})
+
+    # ENDPOINT SYSTEM-STATUS
+    async def get_system_status(self):
+        """Returns the System Status"""
+        return await self._get('system/status')
+
+    # REQUESTS STUFF
+    async def request_get(self, url, params=None, timeout=None):
+        return await self.transport.request('GET', url, params=params, timeout=timeout)
+
+    async def request_post(self, url, data, timeout=None):
+        return await self.transport.request('POST', url, json=data, timeout=timeout)
+
+    async def request_put(self, url, data, timeout=None):
+        return await self.transport.request('PUT', url, json=data, timeout=timeout)
+
+    async def request_del(self, url, data=None, timeout=None):
+        return await self.transport.request('DELETE', url, json=data, timeout=timeout)
+
+    async def close(self):
+        """Closes the pooled connections held by this client"""
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    class _Commands(object):
+        def __init__(self, parent):
+            self._sonarr = parent
+
+        async def refresh_series(self, series_id: int = None):
+            return await self._sonarr.run_command(name='RefreshSeries', seriesId=series_id)
+
+        async def rescan_series(self, series_id: int = None):
+            return await self._sonarr.run_command(name='RescanSeries', seriesId=series_id)
+
+        async def episode_search(self, episode_ids: list = None, priority: int = NORMAL):
+            return await self._sonarr.run_command(name='EpisodeSearch', episodeIds=episode_ids, priority=priority)
+
+        async def season_search(self, series_id: int, season_number: int, priority: int = NORMAL):
+            return await self._sonarr.run_command(name='SeasonSearch', seriesId=series_id, seasonNumber=season_number,
+                                                  priority=priority)
+
+        async def series_search(self, series_id: int, priority: int = NORMAL):
+            return await self._sonarr.run_command(name='SeriesSearch', seriesId=series_id, priority=priority)
+
+        async def downloaded_episodes_scan(self, path: str = None, download_client_id: str = None,
+                                           import_mode: str = None):
+            return await self._sonarr.run_command(name='DownloadedEpisodesScan', path=path,
+                                                  downloadClientId=download_client_id, importMode=import_mode)
+
+        async def rss_sync(self, priority: int = NORMAL):
+            return await self._sonarr.run_command(name='RssSync', priority=priority)
+
+        async def rename_files(self, files: list = None):
+            return await self._sonarr.run_command(name='RenameFiles', files=files)
+
+        async def rename_series(self, series_ids: list):
+            return await self._sonarr.run_command(name='RenameSeries', seriesIds=series_ids)
+
+        async def backup(self):
+            return await self._sonarr.run_command(name='Backup')
+
+        async def missing_episode_search(self, priority: int = NORMAL):
+            return await self._sonarr.run_command(name='missingEpisodeSearch', priority=priority)
+
+
+class AsyncRadarr(object):
+    """asyncio version of hm_wrapper.radarr.Radarr; every API method is a coroutine with the same arguments"""
+
+    def __init__(self, host_url: str, api_key: str, pool_size: int = DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 concurrency: int = DEFAULT_CONCURRENCY, transport: AsyncTransport = None,
+                 rate_limiter: RateLimiter = None, metrics: Metrics = None):
+        """Constructor requires Host-URL and API-KEY
+        :param concurrency: maximum number of requests this client has in flight at once
+        :param transport: use an existing AsyncTransport; pool_size, timeout and concurrency are then ignored
+        :param rate_limiter: optional RateLimiter for indexer-heavy commands, may be shared with synchronous clients
+        :param metrics: optional Metrics registry recording every request, may be shared with synchronous clients
+        """
+        self.host_url = _api_url(host_url)
+        self.api_key = api_key
+        if transport is None:
+            transport = AsyncTransport(api_key, pool_size=pool_size, timeout=timeout, concurrency=concurrency,
+                                       metrics=metrics)
+        elif metrics is not None:
+            transport.metrics = metrics
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+        self.Commands = self._Commands(self)
+
+    async def _get(self, path: str, params: dict = None):
+        res = await self.request_get(f'{self.host_url}/{path}', params=params)
+        return res.json()
+
+    # ENDPOINT CALENDAR
+    async def get_calendar(self, start_date=None, end_date=None, window_days: int = _utils.DEFAULT_WINDOW_DAYS):
+        """Gets upcoming movies, will attempt to parse date strings;
+        a range longer than window_days is fetched as concurrent windows and merged, see Radarr.get_calendar"""
+        if start_date is not None and end_date is not None:
+            windows = _utils.date_windows(start_date, end_date, window_days)
+            if len(windows) > 1:
+                return await _merged_calendar(self, windows, lambda after: lambda m: _release_date(m, after))
+        return await self._get('calendar', params=_calendar_params(start_date, end_date))
+
+    # ENDPOINT COMMAND
+    async def run_command(self, priority: int = NORMAL, **kwargs):
+        ags = _command_body(kwargs)
+        await _rate_limit(self.rate_limiter, ags['name'], priority)
+        res = await self.request_post(f'{self.host_url}/command', data=ags, params={'name': ags['name']})
+        return res.json()
+
+    async def get_command(self, command_id: int = None):
+        """Without an id argument, returns the status of all currently started commands;
+        if id argument is supplied, it will return the status of just that command"""
+        if command_id is None:
+            return await self._get('command')
+        return await self._get(f'command/{command_id}')
+
+    # ENDPOINT DISKSPACE
+    async def get_diskspace(self):
+        """Return Information about Diskspace"""
+        return await self._get('diskspace')
+
+    # ENDPOINT HISTORY
+    async def get_history(self, page: int = 0, page_size: int = 10, sort_key: str = None, sort_dir: str = None):
+        """Gets history (grabs/failures/completed)"""
+        params = {'page': page}
+        if page_size is not None:
+            params['pageSize'] = page_size
+        if sort_key is not None:
+            params['sortKey'] = sort_key
+        if sort_dir is not None:
+            params['sortDir'] = sort_dir
+        return await self._get('history', params=params)
+
+    async def get_history_size(self, page_size):
+        """Gets history (grabs/failures/completed)"""
+        return await self._get('history', params={'pageSize': page_size})
+
+    async def get_all_history(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'date', sort_dir: str = 'desc'):
+        """Gets the whole history, newest first by default, fetching the pages after the first concurrently"""
+        return await _all_pages(self, 'history', _utils.page_query(page_size, sort_key, sort_dir))
+
+    # ENDPOINT WANTED MISSING
+    async def get_wanted_missing(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'title',
+                                 sort_dir: str = 'asc', monitored_only: bool = True):
+        """Gets the movies without a file, every page of them"""
+        return await _all_pages(self, 'wanted/missing', _utils.page_query(page_size, sort_key, sort_dir,
+                                                                          monitored_only))
+
+    # ENDPOINT WANTED CUTOFF
+    async def get_cutoff_unmet(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'title',
+                               sort_dir: str = 'asc', monitored_only: bool = True):
+        """Gets the movies whose file is below the cutoff of their quality profile, every page of them"""
+        return await _all_pages(self, 'wanted/cutoff', _utils.page_query(page_size, sort_key, sort_dir,
+                                                                         monitored_only))
+
+    # ENDPOINT MOVIE
+    async def get_movie(self, movie_id: int = None):
+        """If no arguments: Gets all movies in your collection, otherwise will attempt to find the movie id specified"""
+        if movie_id is None:
+            return await self._get('movie')
+        return await self._get(f'movie/{movie_id}')
+
+    async def add_movie(self, title: str, quality_profile_id: str, title_slug: str, tmdb_id: int, year: int,
+                        path: str, images: list = None, monitored: bool = None, search_for_movie: bool = None):
+        """Adds a new movie to your collection, see Radarr.add_movie"""
+        jsonbody = {
+            'title': title,
+            'qualityProfileId': quality_profile_id,
+            'titleSlug': title_slug,
+            'tmdbId': tmdb_id,
+            'year': year,
+            'path': path,
+        }
+        if images is not None:
+            jsonbody['images'] = images
+        if search_for_movie is not None:
+            jsonbody['addOptions'] = {"searchForMovie": search_for_movie}
+        if monitored is not None:
+            jsonbody['monitored'] = monitored
+        res = await self.request_post(f'{self.host_url}/movie', data=jsonbody)
+        return res.json()
+
+    async def delete_movie(self, movie_id: int, delete_files: bool = None, add_exclusion: bool = None):
+        """Delete the movie with the given ID"""
+        json_body = None
+        if delete_files is not None or add_exclusion is not None:
+            json_body = dict()
+            if delete_files is not None:
+                json_body['deleteFiles'] = delete_files
+            if add_exclusion is not None:
+                json_body['addExclusion'] = add_exclusion
+        res = await self.request_del(f'{self.host_url}/movie/{movie_id}', data=json_body)
+        return res.json()
+
+    # ENDPOINT MOVIE LOOKUP
+    async def movie_lookup_by_name(self, term: str):
+        """Searches for new movies on trakt"""
+        return await self._get('movie/lookup', params={'term': term})
+
+    async def movie_lookup_by_id(self, tmdb_id: int):
+        return await self._get('movie/lookup/tmdb', params={'tmdbId': tmdb_id})
+
+    async def movie_lookup_by_imdb_id(self, imdb_id: str):
+        return await self._get('movie/lookup/imdb', params={'imdbId': imdb_id})
+
+    # ENDPOINT QUEUE
+    async def get_queue(self):
+        """Gets queue info (downloading/completed, ok/warning)"""
+        return await self._get('queue')
+
+    async def delete_queue_item(self, queue_id: int, blacklist: bool = False):
+        """Deletes an item from the queue and download client. Optionally blacklist item after deletion."""
+        res = await self.request_del(f'{self.host_url}/queue/{queue_id}?blacklist={str(blacklist).lower()}')
+        return res.json()
+
+    # ENDPOINT PROFILE
+    async def get_quality_profiles(self):
+        """Gets all quality profiles"""
+        return await self._get('profile')
+
+    # ENDPOINT RELEASE/PUSH
+    async def push_release(self, title, download_url, protocol, publish_date):
+        """Notifies Radarr of a new release."""
+        res = await self.request_post(f'{self.host_url}/release/push', data={
+            'title': title,
+            'download_url': download_url,
+            'protocol': protocol,
+            'publish_date': publish_date
+        })
+        return res.json()
+
+    # ENDPOINT ROOTFOLDER
+    async def get_root_folder(self):
+        """Returns the Root Folder"""
+        return await self._get('rootfolder')
+
+    # ENDPOINT SYSTEM-STATUS
+    async def get_system_status(self):
+        """Returns the System Status"""
+        return await self._get('system/status')
+
+    # REQUESTS STUFF
+    async def request_get(self, url, params=None, timeout=None):
+        return await self.transport.request('GET', url, params=params, timeout=timeout)
+
+    async def request_post(self, url, data, params=None, timeout=None):
+        return await self.transport.request('POST', url, params=params, json=data, timeout=timeout)
+
+    async def request_put(self, url, data, timeout=None):
+        return await self.transport.request('PUT', url, json=data, timeout=timeout)
+
+    async def request_del(self, url, data=None, timeout=None):
+        return await self.transport.request('DELETE', url, json=data, timeout=timeout)
+
+    async def close(self):
+        """Closes the pooled connections held by this client"""
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    class _Commands(object):
+        def __init__(self, parent):
+            self.radarr = parent
+
+        async def refresh_movie(self, movie_id: int = None):
+            return await self.radarr.run_command(name='RefreshMovie', movieId=movie_id)
+
+        async def rescan_movie(self, movie_id: int = None):
+            return await self.radarr.run_command(name='RescanMovie', movieId=movie_id)
+
+        async def movie_search(self, movie_ids: list = None, priority: int = NORMAL):
+            return await self.radarr.run_command(name='MoviesSearch', movieIds=movie_ids, priority=priority)
+
+        async def downloaded_movies_scan(self, path: str = None, download_client_id: str = None,
+                                         import_mode: str = None):
+            return await self.radarr.run_command(name='DownloadedMoviesScan', path=path,
+                                                 downloadClientId=download_client_id, importMode=import_mode)
+
+        async def rss_sync(self, priority: int = NORMAL):
+            return await self.radarr.run_command(name='RssSync', priority=priority)
+
+        async def rename_files(self, files: list = None):
+            return await self.radarr.run_command(name='RenameFiles', files=files)
+
+        async def rename_movie(self, movie_ids: list):
+            return await self.radarr.run_command(name='RenameMovie', movieIds=movie_ids)
+
+        async def cut_off_unmet_movies_search(self, filter_key: str, filter_value: str, priority: int = NORMAL):
+            return await self.radarr.run_command(name='CutOffUnmetMoviesSearch', filterKey=filter_key,
+                                                 filterValue=filter_value, priority=priority)
+
+        async def net_import_sync(self):
+            return await self.radarr.run_command(name='NetImportSync')
+
+        async def missing_movies_search(self, filter_key: str, filter_value: str, priority: int = NORMAL):
+            return await self.radarr.run_command(name='MissingMoviesSearch', filterKey=filter_key,
+                                                 filterValue=filter_value, priority=priority)
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from hm_wrapper import _codec
+
+# seconds a response of each endpoint stays fresh; endpoints not listed are never cached
+DEFAULT_TTLS = {
+    'profile': 3600,
+    'rootfolder': 3600,
+    'system/status': 300,
+    'diskspace': 60,
+    'series': 300,
+    'movie': 300,
+}
+
+
+class _Entry(object):
+    __slots__ = ('content', 'content_type', 'payload', 'expires', 'etag', 'last_modified')
+
+    def __init__(self, content: bytes, content_type: str, payload, expires: float, etag: str = None,
+                 last_modified: str = None):
+        self.content = content
+        self.content_type = content_type
+        self.payload = payload
+        self.expires = expires
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class ResponseCache(object):
+    """Opt-in, thread-safe cache of parsed GET responses for slow-changing endpoints.
+
+    Entries are keyed by full URL, expire after the TTL configured for their endpoint and are evicted least recently
+    used first once max_entries is reached. An expired entry that came with an ETag or Last-Modified header is kept
+    and revalidated with a conditional request, so an unchanged payload costs a single 304 response.
+    A cache can be shared by several clients; invalidation only affects the URLs of the client that asks for it.
+    """
+
+    def __init__(self, max_entries: int = 256, ttls: dict = None, copy_payloads: bool = True):
+        """
+        :param max_entries: maximum number of responses kept
+        :param ttls: endpoint -> seconds, merged over DEFAULT_TTLS; a TTL of 0 or None disables caching the endpoint
+        :param copy_payloads: decode the stored response body again on every hit so callers may modify what they get
+        back; disable to share one decoded payload between all callers, who must then treat it as read-only
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls is not None:
+            self.ttls.update(ttls)
+        self.copy_payloads = copy_payloads
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def caches(self, endpoint: str) -> bool:
+        return bool(self.ttls.get(endpoint))
+
+    def fetch(self, url: str, endpoint: str, send):
+        """Returns the payload for url, from the cache when fresh, otherwise through send.
+        :param url: full URL, used as the cache key
+        :param endpoint: endpoint name used to look up the TTL, e.g. 'series'
+        :param send: callable(headers: dict) -> response performing the GET with the given extra headers
+        """
+        if not self.caches(endpoint):
+            return _codec.decode(send(None))
+        entry, res = self._lookup(url, endpoint, send)
+        if entry is not None:
+            return self._out(entry)
+        payload = _codec.decode(res)
+        self._store(url, endpoint, res, None if self.copy_payloads else payload)
+        return payload
+
+    def fetch_content(self, url: str, endpoint: str, send) -> tuple:
+        """Like fetch, but returns the response body as it came from the server, without decoding it:
+        (content, content type, response). On a hit or a successful revalidation response is None and content is the
+        stored body; otherwise response is what send returned."""
+        if not self.caches(endpoint):
+            res = send(None)
+            return res.content, res.headers.get('Content-Type'), res
+        entry, res = self._lookup(url, endpoint, send)
+        if entry is not None:
+            return entry.content, entry.content_type, None
+        self._store(url, endpoint, res, None)
+        return res.content, res.headers.get('Content-Type'), res
+
+    def _lookup(self, url: str, endpoint: str, send) -> tuple:
+        """Returns (entry, None) for a fresh or successfully revalidated entry, otherwise (None, response of send)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                if entry.expires > now:
+                    self.hits += 1
+                    return entry, None
+
+        headers = dict()
+        if entry is not None:
+            if entry.etag is not None:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['If-Modified-Since'] = entry.last_modified
+        res = send(headers or None)
+
+        if res.status_code == 304 and entry is not None:
+            with self._lock:
+                self.revalidations += 1
+                entry.expires = time.monotonic() + self.ttls[endpoint]
+                if url not in self._entries:
+                    self._entries[url] = entry
+                    self._evict()
+            return entry, None
+        return None, res
+
+    def _store(self, url: str, endpoint: str, res, payload):
+        expires = time.monotonic() + self.ttls[endpoint]
+        with self._lock:
+            self.misses += 1
+            if 200 <= res.status_code < 300:
+                self._entries[url] = _Entry(res.content, res.headers.get('Content-Type'), payload, expires,
+                                            res.headers.get('ETag'), res.headers.get('Last-Modified'))
+                self._entries.move_to_end(url)
+                self._evict()
+
+    def invalidate(self, url_prefix: str = None):
+        """Drops the entry for url_prefix and every entry below it (url_prefix/... or url_prefix?...);
+        without an argument the whole cache is cleared"""
+        with self._lock:
+            if url_prefix is None:
+                self._entries.clear()
+                return
+            for url in [u for u in self._entries if u == url_prefix or u.startswith((url_prefix + '/',
+                                                                                     url_prefix + '?'))]:
+                del self._entries[url]
+
+    def clear(self):
+        self.invalidate()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _out(self, entry: _Entry):
+        if self.copy_payloads:
+            # a fresh decode of the stored body is much cheaper than a deep copy of the payload
+            return _codec.loads(entry.content)
+        if entry.payload is None:
+            entry.payload = _codec.loads(entry.content)
+        return entry.payload
+
+
+def default_lookup_cache_path() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'hm_wrapper', 'lookups.sqlite3')
+
+
+def normalize_lookup_key(key: str) -> str:
+    """Lower-cases key and collapses runs of whitespace so equivalent search terms share one entry"""
+    return re.sub(r'\s+', ' ', str(key).strip().lower())
+
+
+class LookupCache(object):
+    """Persistent cache of metadata lookups (series/lookup, movie/lookup, ...) stored in a local SQLite database.
+
+    Entries survive restarts, expire ttl seconds after they were stored and the least recently used ones are evicted
+    beyond max_entries. Eviction is checked every few inserts rather than on each one, so the table may briefly hold
+    up to max_entries / 100 (at most 256) entries more. The database runs in WAL mode, so several processes can share
+    one file. hits and misses count what this instance served from the database and what had to go to the server.
+    """
+
+    def __init__(self, path: str = None, ttl: float = 7 * 24 * 3600, max_entries: int = 50000):
+        """
+        :param path: database file, defaults to $XDG_CACHE_HOME/hm_wrapper/lookups.sqlite3
+        :param ttl: seconds an entry stays valid
+        :param max_entries: number of entries kept before the least recently used are evicted
+        """
+        if path is None:
+            path = default_lookup_cache_path()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._evict_every = max(1, min(256, max_entries // 100))
+        self._puts = 0
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS lookups '
+                         '(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored REAL NOT NULL, accessed REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS lookups_accessed ON lookups (accessed)')
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # used by its own thread only, but closed by whichever thread calls close()
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def get(self, key: str):
+        """Returns the cached value for key or None"""
+        key = normalize_lookup_key(key)
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute('SELECT value, stored FROM lookups WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] + self.ttl < now:
+                if row is not None:
+                    conn.execute('DELETE FROM lookups WHERE key = ?', (key,))
+                with self._lock:
+                    self.misses += 1
+                return None
+            conn.execute('UPDATE lookups SET accessed = ? WHERE key = ?', (now, key))
+        with self._lock:
+            self.hits += 1
+        return _codec.loads(row[0])
+
+    def put(self, key: str, value):
+        key = normalize_lookup_key(key)
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO lookups (key, value, stored, accessed) VALUES (?, ?, ?, ?)',
+                         (key, _codec.dumps(value).decode('utf-8'), now, now))
+            with self._lock:
+                self._puts += 1
+                evict = self._puts % self._evict_every == 0
+            if evict and conn.execute('SELECT COUNT(*) FROM lookups').fetchone()[0] > self.max_entries:
+                conn.execute('DELETE FROM lookups WHERE key IN '
+                             '(SELECT key FROM lookups ORDER BY accessed DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def fetch(self, key: str, send):
+        """Returns the cached value for key, otherwise calls send() -> response and stores its JSON if successful"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        res = send()
+        value = _codec.decode(res)
+        if 200 <= res.status_code < 300:
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key: str = None):
+        """Drops one entry, or all of them without a key"""
+        with self._connection() as conn:
+            if key is None:
+                conn.execute('DELETE FROM lookups')
+            else:
+                conn.execute('DELETE FROM lookups WHERE key = ?', (normalize_lookup_key(key),))
+
+    def stats(self) -> dict:
+        with self._connection() as conn:
+            entries = conn.execute('SELECT COUNT(*) FROM lookups').fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+    def close(self):
+        """Closes the database connections of all threads; a later call opens a new one"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
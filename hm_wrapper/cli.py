@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""The hm command: starts Sonarr/Radarr commands and prints listings as JSON, for cron jobs and post-processing hooks.
+
+    hm sonarr command rss-sync
+    hm sonarr command downloaded-episodes-scan --path /downloads/Show.S01E01 --wait 60
+    hm radarr get movies --compact
+    hm radarr get wanted-missing --page-size 100
+    hm proxy --socket /run/user/1000/hm_wrapper.sock
+
+The server comes from --url and --api-key, or from the SONARR_URL / SONARR_API_KEY and RADARR_URL / RADARR_API_KEY
+environment variables. The commands are the Commands helpers of the clients, with their parameters as options. Only
+the client module of the chosen application is imported, once the application argument has been read, since its
+options are built from that client.
+"""
+import argparse
+import importlib
+import inspect
+import json
+import os
+import sys
+
+APPS = {'sonarr': ('hm_wrapper.sonarr', 'Sonarr'), 'radarr': ('hm_wrapper.radarr', 'Radarr')}
+# `hm <app> get <name>` -> client method
+GETTERS = {
+    'sonarr': {
+        'series': 'get_series', 'queue': 'get_queue', 'calendar': 'get_calendar', 'history': 'iter_history',
+        'wanted-missing': 'iter_wanted_missing', 'cutoff-unmet': 'iter_cutoff_unmet', 'status': 'get_system_status',
+        'diskspace': 'get_diskspace', 'commands': 'get_command', 'root-folders': 'get_root_folder',
+        'quality-profiles': 'get_quality_profiles',
+    },
+    'radarr': {
+        'movies': 'get_movie', 'queue': 'get_queue', 'calendar': 'get_calendar', 'history': 'iter_history',
+        'wanted-missing': 'iter_wanted_missing', 'cutoff-unmet': 'iter_cutoff_unmet', 'status': 'get_system_status',
+        'diskspace': 'get_diskspace', 'commands': 'get_command', 'root-folders': 'get_root_folder',
+        'quality-profiles': 'get_quality_profiles',
+    },
+}
+# parameters that make no sense on the command line: there is no rate limiter to prioritize for, output is JSON
+_SKIPPED_PARAMETERS = frozenset(('self', 'priority', 'typed'))
+
+
+def _boolean(value: str) -> bool:
+    if value.lower() in ('1', 'true', 'yes', 'on'):
+        return True
+    if value.lower() in ('0', 'false', 'no', 'off'):
+        return False
+    raise argparse.ArgumentTypeError(f'not a boolean: {value!r}')
+
+
+def _argument_options(parameter: inspect.Parameter) -> dict:
+    annotation = parameter.annotation
+    if annotation is inspect.Parameter.empty and parameter.default not in (inspect.Parameter.empty, None):
+        annotation = type(parameter.default)
+    if annotation is list:
+        return {'nargs': '+', 'type': int if parameter.name.endswith('_ids') else str}
+    if annotation is bool:
+        return {'type': _boolean, 'metavar': 'true|false'}
+    if annotation in (int, float):
+        return {'type': annotation}
+    return {}
+
+
+def _add_parameters(parser: argparse.ArgumentParser, method) -> list:
+    """Adds an argument per parameter of method, positional if it has no default, and returns the parameter names"""
+    names = []
+    for parameter in inspect.signature(method).parameters.values():
+        if parameter.name in _SKIPPED_PARAMETERS or parameter.kind in (inspect.Parameter.VAR_POSITIONAL,
+                                                                       inspect.Parameter.VAR_KEYWORD):
+            continue
+        options = _argument_options(parameter)
+        if parameter.default is inspect.Parameter.empty:
+            parser.add_argument(parameter.name, **options)
+        else:
+            parser.add_argument('--' + parameter.name.replace('_', '-'), dest=parameter.name,
+                                default=parameter.default, **options)
+        names.append(parameter.name)
+    return names
+
+
+def _summary(method) -> str:
+    lines = [line.strip() for line in (inspect.getdoc(method) or '').splitlines() if line.strip()]
+    return lines[0] if lines else None
+
+
+def _app_parser(app: str, client_class) -> argparse.ArgumentParser:
+    prefix = app.upper()
+    parser = argparse.ArgumentParser(prog=f'hm {app}')
+    parser.add_argument('--url', default=os.environ.get(f'{prefix}_URL'), help=f'default: ${prefix}_URL')
+    parser.add_argument('--api-key', default=os.environ.get(f'{prefix}_API_KEY'), help=f'default: ${prefix}_API_KEY')
+    parser.add_argument('--timeout', type=float, default=30.0, help='request timeout in seconds')
+    parser.add_argument('--compact', action='store_true', help='print the JSON on one line')
+    actions = parser.add_subparsers(dest='action', metavar='{command,get}')
+    actions.required = True
+
+    commands = actions.add_parser('command', help='start a command').add_subparsers(dest='method', metavar='COMMAND')
+    commands.required = True
+    for name, method in inspect.getmembers(client_class._Commands, inspect.isfunction):
+        if name.startswith('_'):
+            continue
+        summary = _summary(method)
+        sub = commands.add_parser(name.replace('_', '-'), help=summary, description=summary)
+        sub.add_argument('--wait', type=float, metavar='SECONDS',
+                         help='wait up to SECONDS for the command to finish; exit status 1 if it did not succeed')
+        sub.set_defaults(method=name, target='Commands', parameters=_add_parameters(sub, method))
+
+    getters = actions.add_parser('get', help='print a listing').add_subparsers(dest='method', metavar='LISTING')
+    getters.required = True
+    for name, method_name in GETTERS[app].items():
+        method = getattr(client_class, method_name)
+        summary = _summary(method)
+        sub = getters.add_parser(name, help=summary, description=summary)
+        sub.set_defaults(method=method_name, target=None, parameters=_add_parameters(sub, method))
+    return parser
+
+
+def _run(client, args):
+    """Calls the chosen method and returns (exit status, result)"""
+    target = client if args.target is None else getattr(client, args.target)
+    result = getattr(target, args.method)(**{name: getattr(args, name) for name in args.parameters})
+    if hasattr(result, '__next__'):
+        result = list(result)
+    if args.target is None:
+        return 0, result
+    if not isinstance(result, dict) or 'id' not in result:
+        # the server refused the command; its answer says why
+        return 1, result
+    if args.wait is None:
+        return 0, result
+    from hm_wrapper.commands import CommandHandle
+    handle = CommandHandle(client, result).wait(timeout=args.wait)
+    return (0 if handle.succeeded else 1), handle.command
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog='hm', description=__doc__.splitlines()[0],
+                                     epilog='Run hm sonarr --help or hm radarr --help for the commands and listings.')
+    parser.add_argument('app', choices=list(APPS) + ['proxy'], help='proxy runs the local proxy daemon')
+    parser.add_argument('arguments', nargs=argparse.REMAINDER, help='see hm APP --help')
+    top = parser.parse_args(argv)
+    if top.app == 'proxy':
+        return importlib.import_module('hm_wrapper.proxy').main(top.arguments)
+
+    module_name, class_name = APPS[top.app]
+    client_class = getattr(importlib.import_module(module_name), class_name)
+    app_parser = _app_parser(top.app, client_class)
+    args = app_parser.parse_args(top.arguments)
+    if not args.url or not args.api_key:
+        app_parser.error(f'the server is not configured: pass --url and --api-key or set ${top.app.upper()}_URL and '
+                         f'${top.app.upper()}_API_KEY')
+
+    client = client_class(args.url, args.api_key, timeout=args.timeout)
+    try:
+        status, result = _run(client, args)
+    except Exception as e:
+        print(f'hm: error: {e}', file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    json.dump(result, sys.stdout, indent=None if args.compact else 2)
+    sys.stdout.write('\n')
+    return status
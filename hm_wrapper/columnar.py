@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""Columnar export of a library to NumPy arrays, with vectorized reports (pip install hm_wrapper[columnar]).
+
+A Table holds one array per field. Tables are saved as a directory with one .npy file per column plus a
+manifest.json and are loaded back memory-mapped, so repeated analysis does not query or walk the library again:
+
+    export_library('/data/library', sonarr=sonarr, radarr=radarr)
+    library = open_library('/data/library')          # milliseconds, nothing is read until used
+    size_by_quality(library['episode_files'])        # {'Bluray-1080p': 81604378624, ...}
+    missing_by_series(library['episodes'])           # Table of seriesId, episodes, missing, percentMissing
+    growth(library['movies'], 'added', 'sizeOnDisk')
+
+Text fields with few distinct values (status, quality) are stored as integer codes into a list of categories.
+"""
+import json
+import os
+from typing import NamedTuple
+
+from hm_wrapper._concurrent import DEFAULT_WORKERS, bounded_map
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+MANIFEST = 'manifest.json'
+_DTYPES = {'int16': 'int16', 'int32': 'int32', 'int64': 'int64', 'float': 'float64', 'bool': 'bool',
+           'datetime': 'datetime64[s]', 'category': 'int32'}
+
+
+class Column(NamedTuple):
+    name: str
+    # dotted path of the field in the API resource, e.g. 'quality.quality.name'
+    path: str
+    # int16, int32, int64, float, bool, datetime, category or str
+    kind: str
+
+
+SERIES_COLUMNS = (
+    Column('id', 'id', 'int32'),
+    Column('tvdbId', 'tvdbId', 'int32'),
+    Column('title', 'title', 'str'),
+    Column('status', 'status', 'category'),
+    Column('seriesType', 'seriesType', 'category'),
+    Column('monitored', 'monitored', 'bool'),
+    Column('qualityProfileId', 'qualityProfileId', 'int16'),
+    Column('year', 'year', 'int16'),
+    Column('seasonCount', 'seasonCount', 'int16'),
+    Column('episodeCount', 'episodeCount', 'int32'),
+    Column('episodeFileCount', 'episodeFileCount', 'int32'),
+    Column('sizeOnDisk', 'sizeOnDisk', 'int64'),
+    Column('added', 'added', 'datetime'),
+)
+EPISODE_COLUMNS = (
+    Column('id', 'id', 'int32'),
+    Column('seriesId', 'seriesId', 'int32'),
+    Column('seasonNumber', 'seasonNumber', 'int16'),
+    Column('episodeNumber', 'episodeNumber', 'int16'),
+    Column('episodeFileId', 'episodeFileId', 'int32'),
+    Column('hasFile', 'hasFile', 'bool'),
+    Column('monitored', 'monitored', 'bool'),
+    Column('airDateUtc', 'airDateUtc', 'datetime'),
+)
+EPISODE_FILE_COLUMNS = (
+    Column('id', 'id', 'int32'),
+    Column('seriesId', 'seriesId', 'int32'),
+    Column('seasonNumber', 'seasonNumber', 'int16'),
+    Column('size', 'size', 'int64'),
+    Column('quality', 'quality.quality.name', 'category'),
+    Column('dateAdded', 'dateAdded', 'datetime'),
+)
+MOVIE_COLUMNS = (
+    Column('id', 'id', 'int32'),
+    Column('tmdbId', 'tmdbId', 'int32'),
+    Column('title', 'title', 'str'),
+    Column('status', 'status', 'category'),
+    Column('monitored', 'monitored', 'bool'),
+    Column('hasFile', 'hasFile', 'bool'),
+    Column('qualityProfileId', 'qualityProfileId', 'int16'),
+    Column('year', 'year', 'int16'),
+    Column('sizeOnDisk', 'sizeOnDisk', 'int64'),
+    Column('quality', 'movieFile.quality.quality.name', 'category'),
+    Column('added', 'added', 'datetime'),
+)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('columnar export requires numpy: pip install hm_wrapper[columnar]')
+
+
+def _get(record: dict, path: str):
+    for key in path.split('.'):
+        if not isinstance(record, dict):
+            return None
+        record = record.get(key)
+    return record
+
+
+def _array(values: list, kind: str, categories: list = None):
+    if kind == 'category':
+        codes = {name: code for code, name in enumerate(categories)}
+        for value in values:
+            if value is not None and value not in codes:
+                codes[value] = len(categories)
+                categories.append(value)
+        return np.array([-1 if v is None else codes[v] for v in values], dtype='int32')
+    if kind == 'str':
+        return np.array(['' if v is None else str(v) for v in values], dtype=str)
+    if kind == 'datetime':
+        # '2019-05-04T12:00:00Z' -> seconds, without the zone numpy would warn about
+        return np.array([v[:19] if v else 'NaT' for v in values], dtype='datetime64[s]')
+    return np.array([v or 0 for v in values], dtype=_DTYPES[kind])
+
+
+class Table(object):
+    """Named columns of equal length: NumPy arrays, possibly memory-mapped. Category columns hold codes into
+    categories[name], -1 where the field was missing."""
+
+    def __init__(self, columns: dict, categories: dict = None):
+        self.columns = dict(columns)
+        self.categories = categories if categories is not None else dict()
+
+    @classmethod
+    def from_records(cls, records, columns=SERIES_COLUMNS) -> 'Table':
+        """Builds a table from API resources (dicts); missing fields become 0, False, '', NaT or code -1"""
+        _require_numpy()
+        records = records if isinstance(records, list) else list(records)
+        categories = {c.name: [] for c in columns if c.kind == 'category'}
+        return cls({c.name: _array([_get(r, c.path) for r in records], c.kind, categories.get(c.name))
+                    for c in columns}, categories)
+
+    def __getitem__(self, name: str):
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    @property
+    def names(self) -> list:
+        return list(self.columns)
+
+    def labels(self, name: str):
+        """Returns a category column decoded to its names (None where missing)"""
+        names = np.array(self.categories[name] + [None], dtype=object)
+        return names[self[name]]
+
+    def filter(self, mask) -> 'Table':
+        """Returns the rows where the boolean array mask is true"""
+        return Table({name: column[mask] for name, column in self.columns.items()}, self.categories)
+
+    def to_records(self) -> list:
+        """Returns the rows as dicts, category columns decoded"""
+        columns = {name: (self.labels(name) if name in self.categories else column).tolist()
+                   for name, column in self.columns.items()}
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+    def save(self, directory: str):
+        """Writes every column to directory/<name>.npy and the categories to directory/manifest.json"""
+        os.makedirs(directory, exist_ok=True)
+        for name, column in self.columns.items():
+            np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(column), allow_pickle=False)
+        manifest = {'rows': len(self), 'columns': self.names, 'categories': self.categories}
+        with open(os.path.join(directory, MANIFEST), 'w') as f:
+            json.dump(manifest, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> 'Table':
+        """Loads a table saved with save(); with mmap the columns are memory-mapped read-only rather than read"""
+        _require_numpy()
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+        mode = 'r' if mmap else None
+        columns = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mode, allow_pickle=False)
+                   for name in manifest['columns']}
+        return cls(columns, manifest['categories'])
+
+    def __repr__(self):
+        return f'<Table {len(self)} rows: {", ".join(self.names)}>'
+
+
+def export_library(directory: str, sonarr=None, radarr=None, include_episodes: bool = True,
+                   max_workers: int = DEFAULT_WORKERS) -> dict:
+    """
+    Downloads the libraries of a Sonarr and/or Radarr and saves them as tables under directory: 'series', 'episodes'
+    and 'episode_files' (with include_episodes, fetched max_workers series at a time) and 'movies'. Returns the tables
+    by name. episode_files has one row per file, also for files of several episodes or of none. Series whose episodes
+    or files failed to download are left out of the episode tables.
+    """
+    _require_numpy()
+    tables = dict()
+    if sonarr is not None:
+        series = sonarr.get_series()
+        tables['series'] = Table.from_records(series, SERIES_COLUMNS)
+        if include_episodes:
+            episodes = []
+            files = dict()
+            for s, result, error in bounded_map(lambda x: _series_library(sonarr, x['id']), series,
+                                                max_workers=max_workers):
+                if error is not None:
+                    continue
+                series_episodes, series_files = result
+                episodes.extend(series_episodes)
+                for episode_file in series_files:
+                    files.setdefault(episode_file.get('id'), dict(episode_file, seriesId=s['id']))
+            tables['episodes'] = Table.from_records(episodes, EPISODE_COLUMNS)
+            tables['episode_files'] = Table.from_records(list(files.values()), EPISODE_FILE_COLUMNS)
+    if radarr is not None:
+        tables['movies'] = Table.from_records(radarr.get_movie(), MOVIE_COLUMNS)
+    for name, table in tables.items():
+        table.save(os.path.join(directory, name))
+    return tables
+
+
+def _series_library(sonarr, series_id) -> tuple:
+    """Returns the episodes and the episode files of a series; raises ValueError if either could not be fetched"""
+    episodes = sonarr.get_episodes_by_series_id(series_id)
+    files = sonarr.get_episode_files_by_series_id(series_id)
+    for name, records in (('episodes', episodes), ('episode files', files)):
+        if not isinstance(records, list):
+            raise ValueError(f'could not fetch the {name} of series {series_id}: {records!r:.80}')
+    return episodes, files
+
+
+def open_library(directory: str, mmap: bool = True) -> dict:
+    """Loads every table saved by export_library under directory, memory-mapped"""
+    return {name: Table.load(os.path.join(directory, name), mmap=mmap) for name in sorted(os.listdir(directory))
+            if os.path.isfile(os.path.join(directory, name, MANIFEST))}
+
+
+# REPORTS
+def size_by_quality(files: Table, size_column: str = 'size', quality_column: str = 'quality') -> dict:
+    """Total size per quality name, largest first; works on episode_files (size) and movies (sizeOnDisk)"""
+    codes = np.asarray(files[quality_column])
+    known = codes >= 0
+    totals = np.bincount(codes[known], weights=np.asarray(files[size_column])[known],
+                         minlength=len(files.categories[quality_column]))
+    ranked = sorted(zip(files.categories[quality_column], totals.astype('int64').tolist()), key=lambda x: -x[1])
+    return dict(ranked)
+
+
+def missing_by_series(episodes: Table, monitored_only: bool = True, aired_before=None) -> Table:
+    """
+    Episodes without a file per series: a Table of seriesId, episodes, missing and percentMissing
+    :param monitored_only: only count monitored episodes
+    :param aired_before: only count episodes that aired before this datetime / ISO string (default now), so
+    unaired episodes are not reported missing
+    """
+    aired_before = np.datetime64('now' if aired_before is None else str(aired_before)[:19], 's')
+    mask = np.asarray(episodes['airDateUtc']) < aired_before
+    if monitored_only:
+        mask &= np.asarray(episodes['monitored'])
+    series_ids, index = np.unique(np.asarray(episodes['seriesId'])[mask], return_inverse=True)
+    total = np.bincount(index, minlength=len(series_ids))
+    missing = np.bincount(index, weights=~np.asarray(episodes['hasFile'])[mask], minlength=len(series_ids))
+    missing = missing.astype('int64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percent = np.where(total > 0, missing * 100.0 / total, 0.0)
+    return Table({'seriesId': series_ids, 'episodes': total, 'missing': missing, 'percentMissing': percent})
+
+
+def growth(table: Table, date_column: str = 'dateAdded', size_column: str = 'size', unit: str = 'M') -> Table:
+    """
+    Items and bytes added per period: a Table of period (datetime64), count, bytes, cumulativeCount and
+    cumulativeBytes, oldest first. E.g. growth(library['episode_files']) or growth(movies, 'added', 'sizeOnDisk').
+    :param unit: numpy datetime unit of a period: 'Y', 'M', 'W' or 'D'
+    """
+    dates = np.asarray(table[date_column])
+    known = ~np.isnat(dates)
+    periods, index = np.unique(dates[known].astype(f'datetime64[{unit}]'), return_inverse=True)
+    count = np.bincount(index, minlength=len(periods))
+    size = np.bincount(index, weights=np.asarray(table[size_column])[known], minlength=len(periods)).astype('int64')
+    return Table({'period': periods, 'count': count, 'bytes': size, 'cumulativeCount': np.cumsum(count),
+                  'cumulativeBytes': np.cumsum(size)})
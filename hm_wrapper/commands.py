@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+from hm_wrapper import _codec
+from hm_wrapper.exceptions import CommandTimeoutError
+
+# state given to a command the server no longer knows (purged from its command history); its outcome is unknown
+UNKNOWN_STATE = 'unknown'
+# command states after which a command will not change anymore
+FINISHED_STATES = frozenset(('completed', 'failed', 'aborted', 'cancelled', 'orphaned', UNKNOWN_STATE))
+DEFAULT_MIN_INTERVAL = 0.5
+DEFAULT_MAX_INTERVAL = 10.0
+DEFAULT_BACKOFF = 1.5
+
+
+def command_state(command: dict) -> str:
+    """Returns the lower-cased state of a command resource ('queued', 'started', 'completed', ...)"""
+    state = command.get('status') or command.get('state') or ''
+    return str(state).lower()
+
+
+class CommandHandle(object):
+    """Tracks a command started with run_command (or one of the Commands helpers) until it finishes"""
+
+    def __init__(self, client, command):
+        """
+        :param client: the Sonarr or Radarr client the command was sent to
+        :param command: the command resource returned by run_command, or just its id
+        """
+        self.client = client
+        if isinstance(command, dict):
+            self.id = command['id']
+            self.command = command
+        else:
+            self.id = command
+            self.command = {'id': command}
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.command.get('name')
+
+    @property
+    def state(self) -> str:
+        return command_state(self.command)
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    @property
+    def succeeded(self) -> bool:
+        return self.state == 'completed'
+
+    def add_done_callback(self, callback):
+        """Registers callback(handle), called once when the command is seen finished; immediately if it already is"""
+        with self._lock:
+            if not self.done:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def refresh(self) -> dict:
+        """Fetches the command's current state; a command the server no longer knows ends up in UNKNOWN_STATE"""
+        res = self.client.request_get(f'{self.client.host_url}/command/{self.id}')
+        if res.status_code == 404:
+            self._update(dict(self.command, status=UNKNOWN_STATE))
+            return self.command
+        command = _codec.decode(res)
+        if 200 <= res.status_code < 300 and not (isinstance(command, dict) and command.get('id') == self.id):
+            command = dict(self.command, status=UNKNOWN_STATE)
+        self._update(command)
+        return self.command
+
+    def wait(self, timeout: float = None, min_interval: float = DEFAULT_MIN_INTERVAL,
+             max_interval: float = DEFAULT_MAX_INTERVAL) -> 'CommandHandle':
+        """Blocks until the command finished; raises CommandTimeoutError after timeout seconds"""
+        wait_all([self], timeout=timeout, min_interval=min_interval, max_interval=max_interval)
+        return self
+
+    def _update(self, command: dict):
+        if not isinstance(command, dict) or command.get('id') != self.id:
+            return
+        with self._lock:
+            was_done = self.done
+            self.command = command
+            callbacks = []
+            if self.done and not was_done:
+                callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def __repr__(self):
+        return f'<CommandHandle {self.id} {self.name} {self.state}>'
+
+
+def wait_all(handles, timeout: float = None, min_interval: float = DEFAULT_MIN_INTERVAL,
+             max_interval: float = DEFAULT_MAX_INTERVAL, backoff: float = DEFAULT_BACKOFF, callback=None) -> list:
+    """
+    Blocks until every handle finished and returns the handles.
+    Each tick fetches the command list once per client rather than once per command; commands that already dropped
+    off the list are fetched individually. The polling interval starts at min_interval and grows by backoff up to
+    max_interval while nothing changes, and drops back to min_interval as soon as a command changes state.
+    :param handles: CommandHandles, possibly of different clients
+    :param timeout: seconds to wait before raising CommandTimeoutError (with the unfinished handles as .pending)
+    :param callback: optional callable(handle), called as each command finishes
+    """
+    handles = list(handles)
+    if callback is not None:
+        for handle in handles:
+            handle.add_done_callback(callback)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    interval = min_interval
+    while True:
+        pending = [h for h in handles if not h.done]
+        if not pending:
+            return handles
+        by_client = dict()
+        for handle in pending:
+            by_client.setdefault(id(handle.client), []).append(handle)
+
+        changed = False
+        for client_handles in by_client.values():
+            before = {h.id: h.state for h in client_handles}
+            listed = client_handles[0].client.get_command()
+            if isinstance(listed, list):
+                listed = {c.get('id'): c for c in listed if isinstance(c, dict)}
+            else:
+                listed = dict()
+            for handle in client_handles:
+                if handle.id in listed:
+                    handle._update(listed[handle.id])
+                else:
+                    handle.refresh()
+                changed = changed or handle.state != before[handle.id]
+
+        if all(h.done for h in handles):
+            return handles
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            pending = [h for h in handles if not h.done]
+            raise CommandTimeoutError(f'{len(pending)} command(s) did not finish within {timeout}s', pending)
+        interval = min_interval if changed else min(interval * backoff, max_interval)
+        sleep = interval if deadline is None else min(interval, deadline - now)
+        time.sleep(sleep)
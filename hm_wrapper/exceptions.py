@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+
+class HmWrapperError(Exception):
+    """Base class of the errors raised by hm_wrapper"""
+
+
+class CommandTimeoutError(HmWrapperError, TimeoutError):
+    """Raised when commands did not finish within the time they were waited for"""
+
+    def __init__(self, message: str, pending: list = None):
+        super().__init__(message)
+        self.pending = pending if pending is not None else []
+
+
+class RateLimitTimeoutError(HmWrapperError, TimeoutError):
+    """Raised when a command could not be sent within its timeout because of the client-side rate limit"""
+
+
+class CircuitOpenError(HmWrapperError, ConnectionError):
+    """Raised instead of sending a request to a host that the circuit breaker considers down"""
+
+    def __init__(self, message: str, host: str = None, retry_in: float = None):
+        super().__init__(message)
+        self.host = host
+        self.retry_in = retry_in
+
+
+class InstanceTimeoutError(HmWrapperError, TimeoutError):
+    """Recorded for an instance of a Federation that did not answer within its timeout"""
+
+    def __init__(self, message: str, instance: str = None):
+        super().__init__(message)
+        self.instance = instance
+
+
+class NoRouteError(HmWrapperError, LookupError):
+    """Raised when no routing rule of a Federation matches a record to write and there is no default instance"""
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""Fan-out over several Sonarr and/or Radarr instances.
+
+    fed = Federation({'hd': Sonarr(...), '4k': Sonarr(...), 'anime': Sonarr(...)}, timeout=10,
+                     rules=[({'seriesType': 'anime'}, 'anime'), (lambda s: s.get('qualityProfileId') == 5, '4k')],
+                     default='hd')
+    queue = fed.get_queue()               # every instance queried at once
+    for item in queue:
+        print(item.instance, item.value['title'])
+    queue.errors                          # {'4k': InstanceTimeoutError(...)} if an instance failed
+    fed.write('add_series_from_json', series_json)    # sent to the instance the rules pick
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import NamedTuple
+
+from hm_wrapper.exceptions import InstanceTimeoutError, NoRouteError
+from hm_wrapper.radarr import _release_date
+from hm_wrapper.sonarr import _air_date
+
+
+class Tagged(NamedTuple):
+    """A record (or any result) together with the name of the instance it came from"""
+    instance: str
+    value: object
+
+
+class InstanceResult(NamedTuple):
+    """Outcome of a call on one instance"""
+    instance: str
+    value: object = None
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class FederatedResult(list):
+    """Merged results of a fan-out call: a list of Tagged items from the instances that answered, with the errors of
+    the others by instance name in .errors"""
+
+    def __init__(self, items=(), errors: dict = None):
+        super().__init__(items)
+        self.errors = errors if errors is not None else dict()
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def values(self) -> list:
+        """The items without their instance tags"""
+        return [item.value for item in self]
+
+    def by_instance(self) -> dict:
+        """Returns {instance name: [values]}"""
+        grouped = dict()
+        for item in self:
+            grouped.setdefault(item.instance, []).append(item.value)
+        return grouped
+
+
+def _matcher(rule):
+    """Turns a routing rule, a callable(record) or a dict of field values, into a predicate"""
+    if callable(rule):
+        return rule
+    fields = dict(rule)
+    return lambda record: isinstance(record, dict) and all(record.get(k) == v for k, v in fields.items())
+
+
+class Federation(object):
+    """Runs read calls concurrently against several client instances and merges their results tagged by instance,
+    tolerating instances that fail or time out; routes writes to one instance by configurable rules."""
+
+    def __init__(self, instances: dict, timeout=None, rules: list = None, default: str = None,
+                 max_workers: int = None):
+        """
+        :param instances: {name: Sonarr/Radarr client}, in the order results are merged
+        :param timeout: seconds each instance has to answer a fan-out call, or {name: seconds}; an instance that takes
+        longer is reported with an InstanceTimeoutError. A running call cannot be stopped: it is left to finish in the
+        background and holds a worker thread until its request returns, at the latest after the client's own request
+        timeout. The interpreter waits for such calls on exit, so keep that timeout finite.
+        :param rules: (rule, instance name) pairs tried in order to route a record to write; a rule is a
+        callable(record) -> bool or a dict of field values the record must have
+        :param default: instance records no rule matches are routed to
+        :param max_workers: worker threads shared by all fan-out calls, defaults to 4 per instance; calls queue up
+        when they are all busy, e.g. with calls to an instance that stopped answering
+        """
+        self.instances = dict(instances)
+        self.timeout = timeout
+        self.max_workers = max_workers or 4 * len(self.instances)
+        self._pool = None
+        self._lock = threading.Lock()
+        self.rules = [(_matcher(rule), name) for rule, name in rules or ()]
+        self.default = default
+        for name in [name for _, name in self.rules] + ([default] if default is not None else []):
+            if name not in self.instances:
+                raise ValueError(f'unknown instance {name!r}')
+
+    def __getitem__(self, name: str):
+        return self.instances[name]
+
+    def __len__(self):
+        return len(self.instances)
+
+    def _timeout(self, name: str):
+        if isinstance(self.timeout, dict):
+            return self.timeout.get(name)
+        return self.timeout
+
+    def call(self, method: str, *args, instances: list = None, **kwargs) -> list:
+        """
+        Calls method(*args, **kwargs) on every instance (or the named ones) at once and returns an InstanceResult
+        per instance, in instance order. Exceptions and timeouts are captured in the results, not raised.
+        Instances without the method (a Radarr for a Sonarr method) are left out.
+        """
+        names = [name for name in (instances or self.instances) if hasattr(self.instances[name], method)]
+        if not names:
+            return []
+        pool = self._executor()
+        started = time.monotonic()
+        futures = [(name, pool.submit(getattr(self.instances[name], method), *args, **kwargs)) for name in names]
+        results = []
+        for name, future in futures:
+            timeout = self._timeout(name)
+            remaining = None if timeout is None else max(timeout - (time.monotonic() - started), 0)
+            try:
+                results.append(InstanceResult(name, future.result(timeout=remaining)))
+            except FutureTimeoutError:
+                # only stops a call that is still queued; a running one keeps its worker until it returns
+                future.cancel()
+                error = InstanceTimeoutError(f'{name} did not answer {method} within {timeout}s', instance=name)
+                results.append(InstanceResult(name, error=error))
+            except Exception as e:
+                results.append(InstanceResult(name, error=e))
+        return results
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hm-federation')
+            return self._pool
+
+    def gather(self, method: str, *args, instances: list = None, sort_key=None, **kwargs) -> FederatedResult:
+        """
+        Like call(), merged into one FederatedResult: list results are flattened into one Tagged item per element,
+        other results become a single Tagged item; failed instances end up in .errors.
+        :param sort_key: if given, the merged items are sorted by sort_key(value)
+        """
+        merged = FederatedResult()
+        for result in self.call(method, *args, instances=instances, **kwargs):
+            if not result.ok:
+                merged.errors[result.instance] = result.error
+            elif isinstance(result.value, list):
+                merged.extend(Tagged(result.instance, value) for value in result.value)
+            else:
+                merged.append(Tagged(result.instance, result.value))
+        if sort_key is not None:
+            merged.sort(key=lambda item: sort_key(item.value))
+        return merged
+
+    # READS
+    def get_queue(self, **kwargs) -> FederatedResult:
+        return self.gather('get_queue', **kwargs)
+
+    def get_calendar(self, start_date=None, end_date=None, **kwargs) -> FederatedResult:
+        """Episodes and movies of every instance in the range, in air / release date order"""
+        return self.gather('get_calendar', start_date, end_date, sort_key=_calendar_date, **kwargs)
+
+    def get_series(self, **kwargs) -> FederatedResult:
+        return self.gather('get_series', **kwargs)
+
+    def lookup_series(self, query) -> FederatedResult:
+        return self.gather('lookup_series', query)
+
+    def get_movie(self, movie_id: int = None, **kwargs) -> FederatedResult:
+        """Every movie of every Radarr; with a movie_id, that movie of each instance that has it"""
+        return self.gather('get_movie', movie_id, **kwargs)
+
+    def movie_lookup_by_name(self, term: str) -> FederatedResult:
+        return self.gather('movie_lookup_by_name', term)
+
+    def get_system_status(self) -> FederatedResult:
+        return self.gather('get_system_status')
+
+    # WRITES
+    def route(self, record) -> str:
+        """Returns the name of the instance a record is written to: the instance of a Tagged record, else the first
+        instance whose rule matches, else the default. Raises NoRouteError if there is none."""
+        if isinstance(record, Tagged):
+            return record.instance
+        for matches, name in self.rules:
+            if matches(record):
+                return name
+        if self.default is None:
+            raise NoRouteError(f'no routing rule matches {record!r:.80} and there is no default instance')
+        return self.default
+
+    def client_for(self, record):
+        return self.instances[self.route(record)]
+
+    def write(self, method: str, record, *args, **kwargs):
+        """Calls method(record, *args, **kwargs) on the instance the record routes to and returns its result;
+        a Tagged record is passed on unwrapped, e.g. write('upd_series', tagged_series)"""
+        client = self.client_for(record)
+        if isinstance(record, Tagged):
+            record = record.value
+        return getattr(client, method)(record, *args, **kwargs)
+
+    def close(self):
+        """Closes the clients and shuts the worker threads down, without waiting for calls that timed out"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+        for client in self.instances.values():
+            client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _calendar_date(entry) -> str:
+    if not isinstance(entry, dict):
+        return ''
+    if 'airDateUtc' in entry:
+        return _air_date(entry)
+    return _release_date(entry)
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""Request instrumentation: per host and endpoint latency histograms, response bytes, JSON decode time, status codes
+and retries, readable from Python (summary(), hooks) or as a Prometheus text page (render(), start_http_server()).
+
+    metrics = Metrics()
+    sonarr = Sonarr(url, key, metrics=metrics)
+    metrics.add_hook(lambda sample: sample.seconds > 1 and print('slow', sample))
+    metrics.start_http_server(9464)
+"""
+import bisect
+import logging
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DECODE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# /api/, /api/v3/ ... up to the endpoint
+_API_PREFIX = re.compile(r'^.*?/api(?:/v\d+)?/')
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F]{32}|tt\d+)$')
+
+
+def endpoint_template(url: str) -> str:
+    """Returns the endpoint of a request URL with its ids replaced, e.g. .../api/series/12?x=1 -> 'series/{id}'"""
+    path = _API_PREFIX.sub('', urlsplit(url).path, count=1).strip('/')
+    return '/'.join('{id}' if _ID_SEGMENT.match(segment) else segment for segment in path.split('/'))
+
+
+class RequestSample(NamedTuple):
+    host: str
+    method: str
+    endpoint: str
+    # HTTP status, or 'error' if no response was received
+    status: object
+    seconds: float
+    bytes: int
+    retries: int
+
+
+class DecodeSample(NamedTuple):
+    host: str
+    endpoint: str
+    seconds: float
+    bytes: int
+
+
+class _Histogram(object):
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by linear interpolation within its bucket, like Prometheus' histogram_quantile"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+
+class _EndpointStats(object):
+    __slots__ = ('latency', 'decode', 'bytes', 'statuses', 'retries')
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.decode = _Histogram(DECODE_BUCKETS)
+        self.bytes = 0
+        self.statuses = dict()
+        self.retries = 0
+
+
+def _labels(**labels) -> str:
+    return ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels.items())
+
+
+class Metrics(object):
+    """Thread-safe registry the transports report every request to; share one between clients to aggregate them"""
+
+    def __init__(self):
+        self._stats = dict()
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def _endpoint(self, host: str, method: str, endpoint: str) -> _EndpointStats:
+        key = (host, method, endpoint)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _EndpointStats()
+        return stats
+
+    def add_hook(self, callback):
+        """Registers callback(sample), called on the requesting thread with a RequestSample after every request and a
+        DecodeSample after every decoded response body; keep it cheap. Exceptions are logged, not raised."""
+        self._hooks.append(callback)
+
+    def remove_hook(self, callback):
+        self._hooks.remove(callback)
+
+    def observe_request(self, method: str, url: str, status, seconds: float, nbytes: int = 0, retries: int = 0):
+        sample = RequestSample(_host(url), method, endpoint_template(url), status, seconds, nbytes, retries)
+        with self._lock:
+            stats = self._endpoint(sample.host, method, sample.endpoint)
+            stats.latency.observe(seconds)
+            stats.bytes += nbytes
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.retries += retries
+        self._notify(sample)
+
+    def observe_decode(self, method: str, url: str, seconds: float, nbytes: int = 0):
+        sample = DecodeSample(_host(url), endpoint_template(url), seconds, nbytes)
+        with self._lock:
+            self._endpoint(sample.host, method, sample.endpoint).decode.observe(seconds)
+        self._notify(sample)
+
+    def _notify(self, sample):
+        for hook in list(self._hooks):
+            try:
+                hook(sample)
+            except Exception:
+                logger.exception('metrics hook %r failed', hook)
+
+    def summary(self) -> list:
+        """Returns a dict per (host, method, endpoint) with count, mean/p50/p95 latency, bytes, decode seconds, retries
+        and status counts, the slowest endpoints (by total time) first"""
+        rows = []
+        with self._lock:
+            for (host, method, endpoint), stats in self._stats.items():
+                latency = stats.latency
+                rows.append({
+                    'host': host,
+                    'method': method,
+                    'endpoint': endpoint,
+                    'count': latency.count,
+                    'seconds': latency.sum,
+                    'mean': latency.sum / latency.count if latency.count else 0.0,
+                    'p50': latency.quantile(0.5),
+                    'p95': latency.quantile(0.95),
+                    'bytes': stats.bytes,
+                    'decode_seconds': stats.decode.sum,
+                    'retries': stats.retries,
+                    'statuses': dict(stats.statuses),
+                })
+        rows.sort(key=lambda row: row['seconds'], reverse=True)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def render(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            items = sorted(self._stats.items())
+            lines.append('# HELP hm_wrapper_request_duration_seconds Time from sending a request to its response, '
+                         'retries included')
+            lines.append('# TYPE hm_wrapper_request_duration_seconds histogram')
+            for (host, method, endpoint), stats in items:
+                _render_histogram(lines, 'hm_wrapper_request_duration_seconds', stats.latency,
+                                  _labels(host=host, method=method, endpoint=endpoint))
+            lines.append('# HELP hm_wrapper_decode_duration_seconds Time spent parsing JSON response bodies')
+            lines.append('# TYPE hm_wrapper_decode_duration_seconds histogram')
+            for (host, method, endpoint), stats in items:
+                if stats.decode.count:
+                    _render_histogram(lines, 'hm_wrapper_decode_duration_seconds', stats.decode,
+                                      _labels(host=host, method=method, endpoint=endpoint))
+            lines.append('# HELP hm_wrapper_response_bytes_total Bytes of response bodies received')
+            lines.append('# TYPE hm_wrapper_response_bytes_total counter')
+            for (host, method, endpoint), stats in items:
+                lines.append(f'hm_wrapper_response_bytes_total{{{_labels(host=host, method=method, endpoint=endpoint)}}}'
+                             f' {stats.bytes}')
+            lines.append('# HELP hm_wrapper_requests_total Requests by response status (error: no response)')
+            lines.append('# TYPE hm_wrapper_requests_total counter')
+            for (host, method, endpoint), stats in items:
+                for status, count in sorted(stats.statuses.items(), key=lambda item: str(item[0])):
+                    labels = _labels(host=host, method=method, endpoint=endpoint, status=status)
+                    lines.append(f'hm_wrapper_requests_total{{{labels}}} {count}')
+            lines.append('# HELP hm_wrapper_retries_total Requests sent again after a failed attempt')
+            lines.append('# TYPE hm_wrapper_retries_total counter')
+            for (host, method, endpoint), stats in items:
+                lines.append(f'hm_wrapper_retries_total{{{_labels(host=host, method=method, endpoint=endpoint)}}}'
+                             f' {stats.retries}')
+        return '\n'.join(lines) + '\n'
+
+    def start_http_server(self, port: int = 0, host: str = '127.0.0.1') -> HTTPServer:
+        """Serves render() at /metrics on a background thread; returns the server (server_address, shutdown())"""
+        server = _Server((host, port), _Handler)
+        server.metrics = self
+        threading.Thread(target=server.serve_forever, args=(0.5,), daemon=True).start()
+        return server
+
+
+def _host(url: str) -> str:
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'.lower()
+
+
+def _render_histogram(lines: list, name: str, histogram: _Histogram, labels: str):
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = self.server.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from hm_wrapper import _codec
+
+# fields a record's version is made of; a record whose version and indexed fields are unchanged is not re-indexed
+VERSION_FIELDS = ('added', 'lastInfoSync')
+
+
+def _normalize(field: str, value):
+    if field == 'path' and isinstance(value, str):
+        return value.rstrip('/\\')
+    if field == 'titleSlug' and isinstance(value, str):
+        return value.lower()
+    return value
+
+
+class LibraryMirror(object):
+    """In-memory copy of a library (all series of a Sonarr or all movies of a Radarr) with hash indexes.
+
+    The library is downloaded once; lookups by any of the indexed fields are then dictionary lookups. refresh()
+    reconciles the mirror with the server and only re-indexes records whose added/lastInfoSync or indexed fields
+    changed. Records touched by mutating calls of the client (add, update, delete) are marked dirty and re-fetched
+    individually, without downloading the whole library again, the next time the mirror is read or sync() is called.
+    The mirror is thread-safe.
+    """
+    endpoint = None
+    indexes = ('id', 'titleSlug', 'path')
+
+    def __init__(self, client, load: bool = True):
+        """
+        :param client: the Sonarr or Radarr client the mirror reads from
+        :param load: download the library right away rather than on first refresh()
+        """
+        self.client = client
+        self._records = dict()
+        self._index = {field: dict() for field in self.indexes if field != 'id'}
+        self._dirty = set()
+        self._lock = threading.RLock()
+        self.loaded = False
+        client.add_change_listener(self._on_change)
+        if load:
+            self.refresh()
+
+    # overridden by SeriesMirror / MovieMirror
+    def _fetch_all(self) -> list:
+        raise NotImplementedError
+
+    def _fetch_one(self, record_id):
+        """Returns the current record or None if it no longer exists"""
+        res = self.client.request_get(f'{self.client.host_url}/{self.endpoint}/{record_id}')
+        if res.status_code == 404:
+            return None
+        res.raise_for_status()
+        return _codec.decode(res)
+
+    def refresh(self) -> int:
+        """Reconciles the mirror with the full library and returns the number of records added, changed or removed"""
+        records = self._fetch_all()
+        changed = 0
+        with self._lock:
+            seen = set()
+            for record in records:
+                seen.add(record['id'])
+                if self._store(record):
+                    changed += 1
+            for record_id in [i for i in self._records if i not in seen]:
+                self._remove(record_id)
+                changed += 1
+            self._dirty.clear()
+            self.loaded = True
+        return changed
+
+    def sync(self) -> int:
+        """Re-fetches only the records marked dirty by mutating calls and returns how many were updated"""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            dirty = list(self._dirty)
+            self._dirty.clear()
+        for record_id in dirty:
+            record = self._fetch_one(record_id)
+            with self._lock:
+                if record is None:
+                    self._remove(record_id)
+                else:
+                    self._store(record)
+        return len(dirty)
+
+    def touch(self, *record_ids):
+        """Marks records as changed on the server so the next read re-fetches them"""
+        with self._lock:
+            self._dirty.update(record_ids)
+
+    def discard(self, record_id):
+        """Removes a record that is known to be deleted on the server"""
+        with self._lock:
+            self._dirty.discard(record_id)
+            self._remove(record_id)
+
+    def update(self, record: dict):
+        """Stores a record that is known to be current, e.g. one received from a webhook or a PUT response"""
+        with self._lock:
+            self._dirty.discard(record['id'])
+            self._store(record)
+
+    def _on_change(self, endpoint: str, record_ids: tuple):
+        if endpoint != self.endpoint:
+            return
+        if record_ids:
+            self.touch(*record_ids)
+        else:
+            with self._lock:
+                self.loaded = False
+
+    def _store(self, record: dict) -> bool:
+        record_id = record['id']
+        old = self._records.get(record_id)
+        self._records[record_id] = record
+        if old is not None:
+            if all(old.get(f) == record.get(f) for f in VERSION_FIELDS) and \
+                    all(old.get(f) == record.get(f) for f in self._index):
+                return False
+            self._unindex(old)
+        for field, index in self._index.items():
+            value = _normalize(field, record.get(field))
+            if value is not None:
+                index[value] = record_id
+        return True
+
+    def _remove(self, record_id):
+        old = self._records.pop(record_id, None)
+        if old is not None:
+            self._unindex(old)
+
+    def _unindex(self, record: dict):
+        for field, index in self._index.items():
+            value = _normalize(field, record.get(field))
+            if value is not None and index.get(value) == record['id']:
+                del index[value]
+
+    def _ready(self):
+        if not self.loaded:
+            self.refresh()
+        elif self._dirty:
+            self.sync()
+
+    def get(self, record_id):
+        """Returns the record with the given id or None"""
+        self._ready()
+        return self._records.get(record_id)
+
+    def find(self, field: str, value):
+        """Returns the record whose indexed field equals value, or None"""
+        if field == 'id':
+            return self.get(value)
+        self._ready()
+        with self._lock:
+            record_id = self._index[field].get(_normalize(field, value))
+            return None if record_id is None else self._records.get(record_id)
+
+    def by_title_slug(self, title_slug: str):
+        return self.find('titleSlug', title_slug)
+
+    def by_path(self, path: str):
+        return self.find('path', path)
+
+    def records(self) -> list:
+        self._ready()
+        with self._lock:
+            return list(self._records.values())
+
+    def __contains__(self, record_id):
+        return self.get(record_id) is not None
+
+    def __len__(self):
+        self._ready()
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self.records())
+
+    def close(self):
+        """Stops listening to the client's changes"""
+        self.client.remove_change_listener(self._on_change)
+
+
+class SeriesMirror(LibraryMirror):
+    """Mirror of a Sonarr library, indexed on id, tvdbId, imdbId, titleSlug and path"""
+    endpoint = 'series'
+    indexes = ('id', 'tvdbId', 'imdbId', 'titleSlug', 'path')
+
+    def _fetch_all(self) -> list:
+        return self.client.get_series()
+
+    def by_tvdb_id(self, tvdb_id: int):
+        return self.find('tvdbId', tvdb_id)
+
+    def by_imdb_id(self, imdb_id: str):
+        return self.find('imdbId', imdb_id)
+
+
+class MovieMirror(LibraryMirror):
+    """Mirror of a Radarr library, indexed on id, tmdbId, imdbId, titleSlug and path"""
+    endpoint = 'movie'
+    indexes = ('id', 'tmdbId', 'imdbId', 'titleSlug', 'path')
+
+    def _fetch_all(self) -> list:
+        return self.client.get_movie()
+
+    def by_tmdb_id(self, tmdb_id: int):
+        return self.find('tmdbId', tmdb_id)
+
+    def by_imdb_id(self, imdb_id: str):
+        return self.find('imdbId', imdb_id)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Compact typed records for the main resources (Series, Episode, Movie, QueueItem).
+
+A record keeps its scalar fields in __slots__ instead of a per-object dict, and keeps nested fields (images, seasons,
+ratings, ...) as encoded JSON bytes that are only decoded the first time they are accessed. Keys a model does not know
+are kept in a small side dict, so to_dict() round-trips what the server sent and records can be passed back to calls
+such as Sonarr.upd_series or Sonarr.add_series_from_json.
+"""
+from hm_wrapper import _codec
+
+
+class _LazyField(object):
+    __slots__ = ('name', 'slot')
+
+    def __init__(self, name: str, slot: str):
+        self.name = name
+        self.slot = slot
+
+    def __get__(self, obj, owner):
+        if obj is None:
+            return self
+        try:
+            value = getattr(obj, self.slot)
+        except AttributeError:
+            return None
+        # decoded JSON is never bytes, so bytes means not decoded yet
+        if isinstance(value, bytes):
+            value = _codec.loads(value)
+            setattr(obj, self.slot, value)
+        return value
+
+    def __set__(self, obj, value):
+        setattr(obj, self.slot, value)
+
+    def __delete__(self, obj):
+        delattr(obj, self.slot)
+
+
+class _RecordMeta(type):
+    """Builds __slots__ from the _fields and _lazy tuples declared by a record class"""
+
+    def __new__(mcs, name, bases, namespace):
+        fields = tuple(namespace.get('_fields', ()))
+        lazy = tuple(namespace.get('_lazy', ()))
+        if '__slots__' not in namespace:
+            namespace['__slots__'] = fields + tuple('_lazy_' + n for n in lazy)
+        for n in lazy:
+            namespace[n] = _LazyField(n, '_lazy_' + n)
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._keys = frozenset(fields + lazy)
+        return cls
+
+
+class Record(object, metaclass=_RecordMeta):
+    """Base class of the typed records; behaves like a read/write mapping of the resource's keys"""
+    __slots__ = ('_extra',)
+    _fields = ()
+    _lazy = ()
+
+    def __init__(self, data: dict = None, **kwargs):
+        self._extra = None
+        if data is None:
+            data = kwargs
+        elif kwargs:
+            data = dict(data, **kwargs)
+        lazy = self._lazy
+        keys = self._keys
+        for key, value in data.items():
+            if key not in keys:
+                if self._extra is None:
+                    self._extra = dict()
+                self._extra[key] = value
+            elif key in lazy and value is not None:
+                # copied so the bytes are exactly sized, orjson returns over-allocated buffers
+                setattr(self, '_lazy_' + key, bytes(memoryview(_codec.dumps(value))))
+            else:
+                setattr(self, key, value)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data)
+
+    @classmethod
+    def from_list(cls, items) -> list:
+        """Converts a list (or any iterable) of resource dicts"""
+        return [cls(item) for item in items]
+
+    def __getattr__(self, name):
+        # only reached for unset slots and unknown names
+        if name in self._keys:
+            return None
+        extra = object.__getattribute__(self, '_extra')
+        if extra is not None and name in extra:
+            return extra[name]
+        raise AttributeError(f'{type(self).__name__!r} object has no attribute {name!r}')
+
+    def _has(self, key: str) -> bool:
+        slot = '_lazy_' + key if key in self._lazy else key
+        try:
+            object.__getattribute__(self, slot)
+        except AttributeError:
+            return False
+        return True
+
+    def keys(self) -> list:
+        keys = [k for k in self._fields + self._lazy if self._has(k)]
+        if self._extra is not None:
+            keys.extend(self._extra)
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, key):
+        return (key in self._keys and self._has(key)) or (self._extra is not None and key in self._extra)
+
+    def __getitem__(self, key):
+        if key in self._keys:
+            if not self._has(key):
+                raise KeyError(key)
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._keys:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = dict()
+            self._extra[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def items(self) -> list:
+        return [(k, self[k]) for k in self.keys()]
+
+    def to_dict(self) -> dict:
+        """Returns the resource as a plain dict, as the API returned it"""
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f'<{type(self).__name__} id={self.id!r} title={self.title!r}>'
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+
+class Series(Record):
+    """A series as returned by Sonarr.get_series"""
+    _fields = ('id', 'title', 'sortTitle', 'seasonCount', 'totalEpisodeCount', 'episodeCount', 'episodeFileCount',
+               'sizeOnDisk', 'status', 'overview', 'previousAiring', 'nextAiring', 'network', 'airTime', 'year',
+               'path', 'profileId', 'qualityProfileId', 'languageProfileId', 'seasonFolder', 'monitored',
+               'useSceneNumbering', 'runtime', 'tvdbId', 'tvRageId', 'tvMazeId', 'firstAired', 'lastInfoSync',
+               'seriesType', 'cleanTitle', 'imdbId', 'titleSlug', 'certification', 'added', 'rootFolderPath')
+    _lazy = ('images', 'seasons', 'genres', 'tags', 'ratings', 'alternateTitles', 'statistics', 'addOptions')
+
+
+class Episode(Record):
+    """An episode as returned by Sonarr.get_episodes_by_series_id"""
+    _fields = ('id', 'seriesId', 'episodeFileId', 'seasonNumber', 'episodeNumber', 'title', 'airDate', 'airDateUtc',
+               'overview', 'hasFile', 'monitored', 'absoluteEpisodeNumber', 'sceneAbsoluteEpisodeNumber',
+               'sceneEpisodeNumber', 'sceneSeasonNumber', 'unverifiedSceneNumbering', 'lastSearchTime')
+    _lazy = ('episodeFile', 'series', 'images')
+
+
+class Movie(Record):
+    """A movie as returned by Radarr.get_movie"""
+    _fields = ('id', 'title', 'sortTitle', 'sizeOnDisk', 'status', 'overview', 'inCinemas', 'physicalRelease',
+               'digitalRelease', 'website', 'downloaded', 'year', 'hasFile', 'youTubeTrailerId', 'studio', 'path',
+               'profileId', 'qualityProfileId', 'pathState', 'monitored', 'minimumAvailability', 'isAvailable',
+               'folderName', 'runtime', 'lastInfoSync', 'cleanTitle', 'imdbId', 'tmdbId', 'titleSlug',
+               'certification', 'added', 'qualityProfileCutoff', 'secondaryYearSourceId')
+    _lazy = ('images', 'genres', 'tags', 'ratings', 'alternativeTitles', 'movieFile', 'collection')
+
+
+class QueueItem(Record):
+    """A queue item as returned by Sonarr.get_queue / Radarr.get_queue"""
+    _fields = ('id', 'title', 'size', 'sizeleft', 'timeleft', 'estimatedCompletionTime', 'status',
+               'trackedDownloadStatus', 'trackedDownloadState', 'downloadId', 'protocol', 'downloadClient', 'indexer',
+               'outputPath', 'errorMessage')
+    _lazy = ('series', 'episode', 'movie', 'quality', 'language', 'statusMessages')
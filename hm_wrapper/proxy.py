@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""Local caching proxy daemon shared by the clients of all processes on a host.
+
+The daemon listens on a Unix socket and forwards the clients' requests through one pooled Transport. GET responses of
+the slow-changing endpoints (series, movie, rootfolder, profile, ...) are kept in a ResponseCache shared by every
+process, identical GETs that are in flight at the same time go to the server only once, and writes are forwarded
+and drop the cached responses of the endpoint they changed:
+
+    $ hm proxy --socket /run/user/1000/hm_wrapper.sock &
+    $ export HM_WRAPPER_PROXY=/run/user/1000/hm_wrapper.sock
+
+Every Sonarr / Radarr created without a transport then sends its requests through the daemon (see
+_transport.new_transport), and falls back to connecting directly while the socket does not exist. A transport can also
+be given explicitly: Sonarr(url, api_key, transport=ProxyTransport(socket_path, api_key)).
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+from hm_wrapper import _codec
+from hm_wrapper._transport import DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, PROXY_ENV, Transport, _DEFAULT
+from hm_wrapper.cache import ResponseCache
+from hm_wrapper.metrics import endpoint_template
+
+logger = logging.getLogger(__name__)
+
+# request headers passed on to the server, and response headers passed back to the client
+_FORWARDED_REQUEST_HEADERS = ('X-Api-Key', 'Content-Type', 'If-None-Match', 'If-Modified-Since')
+_FORWARDED_RESPONSE_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After')
+_CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+
+def default_socket_path() -> str:
+    base = os.environ.get('XDG_RUNTIME_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'hm_wrapper')
+    return os.path.join(base, 'hm_wrapper.sock')
+
+
+class _Flight(object):
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Collapses concurrent calls with the same key: the first caller runs the function, the ones arriving while it
+    runs wait for it and get its result (or exception) instead of running it again"""
+
+    def __init__(self):
+        self.collapsed = 0
+        self._flights = dict()
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.collapsed += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
+def _collection_url(url: str) -> str:
+    """Returns the URL of the endpoint a request URL belongs to, e.g. .../api/series/12?x=1 -> .../api/series"""
+    path = url.split('?', 1)[0].rstrip('/')
+    for _ in range(endpoint_template(url).count('/')):
+        path = path.rsplit('/', 1)[0]
+    return path
+
+
+def _listening(socket_path: str) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def _reply(res) -> tuple:
+    headers = {name: res.headers[name] for name in _FORWARDED_RESPONSE_HEADERS if name in res.headers}
+    return res.status_code, headers, res.content
+
+
+class _Server(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _proxy(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        if not self.path.startswith(('http://', 'https://')):
+            status, headers, content = 400, {}, b'{"message": "requests to the proxy need an absolute URL"}'
+        else:
+            headers = {name: self.headers[name] for name in _FORWARDED_REQUEST_HEADERS if name in self.headers}
+            try:
+                status, headers, content = self.server.proxy.forward(self.command, self.path, headers, body)
+            except Exception as e:
+                logger.warning('%s %s failed: %s', self.command, self.path, e)
+                status, headers, content = 502, {}, _codec.dumps({'message': f'proxy: {e}'})
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _proxy
+
+    def address_string(self) -> str:
+        return 'unix'
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt, *args)
+
+
+class CachingProxy(object):
+    """The proxy daemon: a threaded HTTP server on a Unix socket that forwards every request, in absolute form
+    (GET http://host:8989/api/series), through one pooled Transport.
+
+    Cacheable GETs are answered from a ResponseCache per API key, so a process only ever sees responses fetched with
+    its own key; concurrent identical GETs (same key and URL) are collapsed into one request. Conditional GETs bypass
+    both. Writes are forwarded as they are and invalidate the cached responses of their endpoint.
+    """
+
+    def __init__(self, socket_path: str = None, transport: Transport = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 ttls: dict = None, max_entries: int = 256, mode: int = 0o600):
+        """
+        :param socket_path: defaults to default_socket_path(); a stale socket file left there is replaced
+        :param transport: Transport to the servers, e.g. one with metrics; defaults to a Transport of pool_size
+        connections per server
+        :param ttls: endpoint -> seconds for the response caches, merged over cache.DEFAULT_TTLS
+        :param max_entries: responses kept per API key
+        :param mode: permissions of the socket file; whoever can connect can use the proxy
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.transport = transport if transport is not None else Transport(pool_size=pool_size)
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.forwarded = 0
+        self.flights = SingleFlight()
+        self._caches = dict()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            if _listening(self.socket_path):
+                raise OSError(f'a proxy is already listening on {self.socket_path}')
+            os.unlink(self.socket_path)
+        self._server = _Server(self.socket_path, _Handler)
+        self._server.proxy = self
+        os.chmod(self.socket_path, mode)
+        self._thread = None
+        self._serving = False
+
+    def cache(self, api_key: str) -> ResponseCache:
+        """Returns the response cache of an API key"""
+        with self._lock:
+            cache = self._caches.get(api_key)
+            if cache is None:
+                cache = self._caches[api_key] = ResponseCache(self.max_entries, self.ttls)
+            return cache
+
+    @property
+    def stats(self) -> dict:
+        """Requests sent to the servers, requests collapsed into one already in flight and cache hits"""
+        with self._lock:
+            caches = list(self._caches.values())
+        return {'forwarded': self.forwarded, 'collapsed': self.flights.collapsed,
+                'hits': sum(c.hits + c.revalidations for c in caches)}
+
+    def forward(self, method: str, url: str, headers: dict, body: bytes) -> tuple:
+        """Answers one request and returns (status, headers, content)"""
+        api_key = headers.get('X-Api-Key')
+        if method == 'GET' and not any(name in headers for name in _CONDITIONAL_HEADERS):
+            return self.flights.do((api_key, url), lambda: self._get(url, api_key))
+        res = self._send(method, url, headers, body)
+        if method != 'GET' and res.status_code < 400:
+            self.cache(api_key).invalidate(_collection_url(url))
+        return _reply(res)
+
+    def _send(self, method: str, url: str, headers: dict, body: bytes = None):
+        with self._lock:
+            self.forwarded += 1
+        return self.transport.request(method, url, data=body, headers=headers)
+
+    def _get(self, url: str, api_key: str) -> tuple:
+        cache = self.cache(api_key)
+        endpoint = endpoint_template(url)
+        key_header = {'X-Api-Key': api_key} if api_key is not None else {}
+
+        def send(headers):
+            return self._send('GET', url, dict(key_header, **(headers or {})))
+
+        # hits are served as the stored bytes, nothing is decoded or encoded again
+        content, content_type, res = cache.fetch_content(url, endpoint, send)
+        if res is not None:
+            return _reply(res)
+        return 200, {'Content-Type': content_type or _codec.CONTENT_TYPE}, content
+
+    def start(self):
+        """Serves on a background daemon thread and returns self"""
+        if self._thread is None:
+            self._serving = True
+            self._thread = threading.Thread(target=self._server.serve_forever, args=(0.1,), daemon=True)
+            self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serves on the calling thread until close() is called from another one"""
+        self._serving = True
+        self._server.serve_forever(0.1)
+
+    def close(self):
+        if self._serving:
+            self._server.shutdown()
+            self._serving = False
+        self._thread = None
+        self._server.server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.transport.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _UnixConnection(HTTPConnection):
+    """HTTP connection over a Unix socket"""
+
+    def __init__(self, *args, socket_path: str = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class _UnixConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _UnixConnection
+
+
+class _ProxyAdapter(HTTPAdapter):
+    """Sends every request, whatever its host, in absolute form to the proxy daemon listening on socket_path"""
+
+    def __init__(self, socket_path: str, pool_size: int):
+        super().__init__(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self._pool = _UnixConnectionPool('localhost', maxsize=pool_size, block=True, socket_path=socket_path)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self._pool
+
+    def get_connection(self, url, proxies=None):
+        return self._pool
+
+    def cert_verify(self, conn, url, verify, cert):
+        # TLS to the server is the daemon's business
+        pass
+
+    def request_url(self, request, proxies) -> str:
+        return request.url
+
+    def close(self):
+        self._pool.close()
+        super().close()
+
+
+class ProxyTransport(Transport):
+    """Transport sending the requests of a client through the proxy daemon at socket_path instead of connecting to the
+    server; the clients get the same requests.Response objects as with a Transport. GETs are not retried here by
+    default, since the daemon retries them against the server already."""
+
+    def __init__(self, socket_path: str, api_key: str = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_TIMEOUT, retry=None, circuit_breaker=_DEFAULT, **kwargs):
+        """
+        :param socket_path: socket of the CachingProxy
+        The other arguments are those of Transport; pool_size is the number of connections kept to the daemon.
+        """
+        super().__init__(api_key, pool_size=pool_size, timeout=timeout, retry=retry, circuit_breaker=circuit_breaker,
+                         **kwargs)
+        self.socket_path = socket_path
+
+    def _new_adapter(self) -> HTTPAdapter:
+        return _ProxyAdapter(self.socket_path, self.pool_size)
+
+
+def main(argv: list = None) -> int:
+    """Runs the daemon until it is interrupted or terminated"""
+    parser = argparse.ArgumentParser(prog='hm proxy', description=__doc__.splitlines()[0])
+    parser.add_argument('--socket', default=os.environ.get(PROXY_ENV) or default_socket_path(),
+                        help=f'default: ${PROXY_ENV} or {default_socket_path()}')
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE, help='connections kept to each server')
+    parser.add_argument('--max-entries', type=int, default=256, help='responses cached per API key')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format='%(asctime)s %(message)s')
+    proxy = CachingProxy(args.socket, pool_size=args.pool_size, max_entries=args.max_entries)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=proxy.close).start())
+    logger.info('listening on %s', proxy.socket_path)
+    try:
+        proxy.serve_forever()
+    except KeyboardInterrupt:
+        proxy.close()
+    logger.info('stopped: %s', proxy.stats)
+    return 0
@@ -1,17 +1,33 @@
 # -*- coding: utf-8 -*-
-import json
-
-import requests
-
-from hm_wrapper import _utils
-
-
-class Radarr(object):
-
-    def __init__(self, host_url: str, api_key: str):
+from hm_wrapper import _codec, _utils
+from hm_wrapper._client import ClientMixin
+from hm_wrapper._concurrent import bulk_apply, bulk_chunked, bulk_update, delete_queue_item, ordered_map, \
+    ItemResult, DEFAULT_CHUNK_SIZE, DEFAULT_PAGE_SIZE, DEFAULT_WORKERS
+from hm_wrapper._transport import Transport, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, new_transport
+from hm_wrapper._utils import CalendarWindow
+from hm_wrapper.cache import LookupCache, ResponseCache
+from hm_wrapper.commands import CommandHandle
+from hm_wrapper.metrics import Metrics
+from hm_wrapper.models import Movie, QueueItem
+from hm_wrapper.ratelimit import RateLimiter, NORMAL
+from hm_wrapper.watch import DEFAULT_MAX_INTERVAL, DEFAULT_MIN_INTERVAL, QueueWatcher
+
+
+class Radarr(ClientMixin):
+
+    def __init__(self, host_url: str, api_key: str, pool_size: int = DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 transport: Transport = None, cache: ResponseCache = None, lookup_cache: LookupCache = None,
+                 rate_limiter: RateLimiter = None, metrics: Metrics = None):
         """Constructor requires Host-URL and API-KEY
         :type api_key: object
         :type host_url: str
+        :param pool_size: maximum number of keep-alive connections kept open to the host
+        :param timeout: default request timeout, either seconds or a (connect, read) tuple
+        :param transport: use an existing Transport instead of creating one; pool_size and timeout are then ignored
+        :param cache: optional ResponseCache for the slow-changing endpoints (profiles, root folders, status, ...)
+        :param lookup_cache: optional persistent LookupCache for the metadata lookup endpoints
+        :param rate_limiter: optional RateLimiter that holds back indexer-heavy commands (searches, RSS sync)
+        :param metrics: optional Metrics registry recording the latency, size and status of every request by endpoint
         """
 
         if host_url.rstrip('/').endswith('api'):
@@ -19,56 +35,93 @@ class Radarr(object):
         else:
             self.host_url = host_url.rstrip('/') + '/api'
         self.api_key = api_key
+        if transport is None:
+            transport = new_transport(api_key, pool_size=pool_size, timeout=timeout, metrics=metrics)
+        elif metrics is not None:
+            transport.metrics = metrics
+        self.transport = transport
+        self.cache = cache
+        self.lookup_cache = lookup_cache
+        self.rate_limiter = rate_limiter
+        self._change_listeners = []
+        self._queue_watcher = None
         self.Commands = self._Commands(self)
 
     # ENDPOINT CALENDAR
-    def get_calendar(self, start_date=None, end_date=None):
+    def get_calendar(self, start_date=None, end_date=None, window_days: int = _utils.DEFAULT_WINDOW_DAYS,
+                     max_workers: int = DEFAULT_WORKERS):
         """Gets upcoming episodes, if start/end are not supplied episodes airing today and tomorrow will be returned,
         Returns Json
-            will attempt to parse date strings """
-        query_params = dict()
-        if start_date is not None:
-            query_params['start'] = _utils.parse_date_input(start_date)
-        if end_date is not None:
-            query_params['end'] = _utils.parse_date_input(end_date)
-
-        res = self.request_get("{}/calendar".format(self.host_url), params=query_params)
-        return res.json()
+            will attempt to parse date strings. A range longer than window_days is fetched as windows of window_days,
+            max_workers at a time, and the movies are merged in release date order without duplicates"""
+        if start_date is None or end_date is None or \
+                len(_utils.date_windows(start_date, end_date, window_days)) == 1:
+            query_params = dict()
+            if start_date is not None:
+                query_params['start'] = _utils.parse_date_input(start_date)
+            if end_date is not None:
+                query_params['end'] = _utils.parse_date_input(end_date)
+
+            res = self.request_get("{}/calendar".format(self.host_url), params=query_params)
+            return _codec.decode(res)
+        movies = []
+        for window in self.iter_calendar(start_date, end_date, window_days=window_days, max_workers=max_workers):
+            movies.extend(window.items)
+        return movies
+
+    def iter_calendar(self, start_date, end_date, window_days: int = _utils.DEFAULT_WINDOW_DAYS,
+                      max_workers: int = DEFAULT_WORKERS):
+        """Yields a CalendarWindow (start, end, items) per window_days of the range, nearest first, so the near term
+        can be shown while later windows are still being fetched (max_workers at a time). Each window's movies are
+        sorted by their first release date in the window; a movie already yielded by an earlier window is left out."""
+        seen = set()
+        windows = _utils.date_windows(start_date, end_date, window_days)
+        for (start, end), movies, error in ordered_map(self._calendar_window, windows, max_workers=max_workers):
+            if error is not None:
+                raise error
+            after = start.isoformat()
+            yield CalendarWindow(start, end, _utils.new_in_window(movies, seen, lambda m: _release_date(m, after)))
+
+    def _calendar_window(self, window: tuple) -> list:
+        start, end = window
+        res = self.request_get(f'{self.host_url}/calendar', params={'start': start.isoformat(), 'end': end.isoformat()})
+        res.raise_for_status()
+        return _codec.decode(res)
 
     # ENDPOINT COMMAND
 
-    def run_command(self, **kwargs):
+    def run_command(self, priority: int = NORMAL, **kwargs):
+        """Starts the command given by name and its parameters as keyword arguments
+        :param priority: with a rate_limiter, commands waiting for the limit are sent in order of priority (URGENT,
+        NORMAL, BACKGROUND from hm_wrapper.ratelimit)"""
         ags = dict()
         for key, value in kwargs.items():
             if value is not None:
                 ags[key] = value
-        data = None
-        if len(ags) > 0:
-            # for some reason the api is only accepting json after being serialized and then deserialized again
-            # ... not sure why, possibly due to the way that requests encodes json
-            data = json.dumps(ags)
-        # with io.StringIO() as f:
-        #     json.dumps(ags, fp=f)
-        #     data = f.getvalue()
-        #     f.close()
-
-        res = self.request_post(f'{self.host_url}/command?name={ags["name"]}', data=data)
-        return res.json()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(ags['name'], priority)
+        res = self.request_post(f'{self.host_url}/command?name={ags["name"]}', data=ags)
+        return _codec.decode(res)
 
     def get_command(self, command_id: int = None):
         """Without an id argument, returns the status of all currently started commands;
         if id argument is supplied, it will return the status of just that run_command"""
         id_string = str()
         if command_id is not None:
-            id_string += "/" + command_id
-        res = self.request_get(f"{self.host_url}/run_command{id_string}")
-        return res.json()
+            id_string += "/" + str(command_id)
+        res = self.request_get(f"{self.host_url}/command{id_string}")
+        return _codec.decode(res)
+
+    def track_command(self, command) -> CommandHandle:
+        """Returns a CommandHandle to wait on a command started with run_command or one of the Commands helpers
+        :param command: the command resource returned when the command was started, or its id
+        """
+        return CommandHandle(self, command)
 
     # ENDPOINT DISKSPACE
     def get_diskspace(self):
         """Return Information about Diskspace"""
-        res = self.request_get("{}/diskspace".format(self.host_url))
-        return res.json()
+        return self._cached_get('diskspace')
 
     # ENDPOINT HISTORY
     def get_history(self, page: int = 0, page_size: int = 10, sort_key: str = None, sort_dir: str = None):
@@ -78,27 +131,72 @@ class Radarr(object):
         :param sort_dir: asc or desc - Default: asc
         :param sort_key: movie.title or date
         """
-        query_string = "?"
-        query_string += f'page={page}'
-        if page_size is not None:
-            query_string += f'&pageSize={page_size}'
-        if sort_key is not None:
-            query_string += f'&sortKey={sort_key}'
-        if sort_dir is not None:
-            query_string += f'&sortDir={sort_dir}'
-
+        query_string = _history_query(page, page_size, sort_key, sort_dir)
         res = self.request_get(f"{self.host_url}/history{query_string}")
-        return res.json()
+        return _codec.decode(res)
+
+    def stream_history(self, page: int = 1, page_size: int = 10, sort_key: str = None, sort_dir: str = None,
+                       fields: list = None):
+        """Like get_history, but parses the response incrementally and yields the history records one by one
+        :param fields: if given, only these keys are kept of each record
+        """
+        query_string = _history_query(page, page_size, sort_key, sort_dir)
+        return self._stream(f"{self.host_url}/history{query_string}", key='records', fields=fields)
+
+    def iter_history(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'date', sort_dir: str = 'desc',
+                     max_workers: int = DEFAULT_WORKERS):
+        """Yields the whole history, newest first by default, fetching the pages after the first concurrently
+        :param page_size: records per request
+        :param max_workers: number of pages fetched at once
+        """
+        return self._iter_pages('history', _utils.page_query(page_size, sort_key, sort_dir), max_workers)
+
+    # ENDPOINT WANTED MISSING
+    def get_wanted_missing(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'title', sort_dir: str = 'asc',
+                           monitored_only: bool = True, max_workers: int = DEFAULT_WORKERS):
+        """Gets the movies without a file, every page of them"""
+        return list(self.iter_wanted_missing(page_size, sort_key, sort_dir, monitored_only, max_workers))
+
+    def iter_wanted_missing(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'title', sort_dir: str = 'asc',
+                            monitored_only: bool = True, max_workers: int = DEFAULT_WORKERS):
+        """Yields the movies without a file, fetching the pages after the first concurrently
+        :param page_size: records per request
+        :param monitored_only: leave out unmonitored movies
+        :param max_workers: number of pages fetched at once
+        """
+        query = _utils.page_query(page_size, sort_key, sort_dir, monitored_only)
+        return self._iter_pages('wanted/missing', query, max_workers)
+
+    # ENDPOINT WANTED CUTOFF
+    def get_cutoff_unmet(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'title', sort_dir: str = 'asc',
+                         monitored_only: bool = True, max_workers: int = DEFAULT_WORKERS):
+        """Gets the movies whose file is below the cutoff of their quality profile, every page of them"""
+        return list(self.iter_cutoff_unmet(page_size, sort_key, sort_dir, monitored_only, max_workers))
+
+    def iter_cutoff_unmet(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'title', sort_dir: str = 'asc',
+                          monitored_only: bool = True, max_workers: int = DEFAULT_WORKERS):
+        """Like iter_wanted_missing, for the movies whose file is below the cutoff of their quality profile"""
+        query = _utils.page_query(page_size, sort_key, sort_dir, monitored_only)
+        return self._iter_pages('wanted/cutoff', query, max_workers)
 
     # ENDPOINT MOVIE
-    def get_movie(self, movie_id: int = None):
+    def get_movie(self, movie_id: int = None, typed: bool = False):
         """If no arguments: Gets all movies in your collection, otherwise will attempt to find the movie id specified
-        :param movie_id: the id of the movie to lookup"""
-        movieid = str()
-        if movie_id is not None:
-            movieid = f'/{movie_id}'
-        res = self.request_get(f'{self.host_url}/movie{movieid}')
-        return res.json()
+        :param movie_id: the id of the movie to lookup
+        :param typed: return compact models.Movie records instead of dicts"""
+        if movie_id is None:
+            movies = self._cached_get('movie')
+            return Movie.from_list(movies) if typed else movies
+        res = self.request_get(f'{self.host_url}/movie/{movie_id}')
+        movie = _codec.decode(res)
+        return Movie(movie) if typed and isinstance(movie, dict) else movie
+
+    def stream_movies(self, fields: list = None):
+        """Like get_movie() without an id, but parses the response incrementally and yields the movies one by one, so
+        memory use does not grow with the size of the library
+        :param fields: if given, only these keys are kept of each movie, e.g. ['id', 'tmdbId', 'hasFile']
+        """
+        return self._stream(f'{self.host_url}/movie', fields=fields)
 
     def add_movie(self, title: str, quality_profile_id: str, title_slug: str, tmdb_id: int, year: int,
                   path: str,
@@ -137,13 +235,97 @@ class Radarr(object):
             jsonbody['addOptions'] = op
         if monitored is not None:
             jsonbody['monitored'] = monitored
-        data = json.dumps(jsonbody)
-        res = self.request_post(f'{self.host_url}/movie', data=data)
-        return res.json()
+        res = self.request_post(f'{self.host_url}/movie', data=jsonbody)
+        movie = _codec.decode(res)
+        self._invalidate('movie', _utils.record_id(movie))
+        return movie
+
+    def add_movies_by_tmdb_ids(self, tmdb_ids: list, quality_profile, root_folder: str = None,
+                               monitored: bool = True, search_for_movie: bool = False, skip_existing: bool = True,
+                               max_workers: int = DEFAULT_WORKERS) -> list:
+        """
+        Adds many movies at once. The root folder, quality profile and (with skip_existing) the ids already in the
+        library are resolved once up front, then the lookups and adds run concurrently.
+        Returns an ItemResult per distinct tmdb id, in input order: status 'ok' with the added movie as value,
+        'skipped' if the movie is already in the library or 'failed' with the error that occurred.
+        :param tmdb_ids: tmdb ids of the movies to add
+        :param quality_profile: quality profile id or name
+        :param root_folder: root folder path the movie folders are created in, defaults to the first root folder
+        :param monitored: whether the movies should be monitored
+        :param search_for_movie: whether Radarr should search for each movie upon being added
+        :param skip_existing: skip ids already in the library instead of letting Radarr reject them
+        :param max_workers: number of movies looked up and added concurrently
+        """
+        tmdb_ids = list(dict.fromkeys(tmdb_ids))
+        if root_folder is None:
+            root_folder = self.get_root_folder()[0]['path']
+        if isinstance(quality_profile, str):
+            profiles = {p['name']: p['id'] for p in self.get_quality_profiles()}
+            if quality_profile not in profiles:
+                raise ValueError(f'unknown quality profile {quality_profile!r}')
+            quality_profile = profiles[quality_profile]
+        existing = set()
+        if skip_existing:
+            existing = {m.get('tmdbId') for m in self.get_movie()}
+
+        def add(tmdb_id):
+            found = self.movie_lookup_by_id(tmdb_id)
+            if not found or 'tmdbId' not in found:
+                raise LookupError(f'no movie found for tmdbId {tmdb_id}')
+            jsonbody = {
+                'title': found['title'],
+                'qualityProfileId': quality_profile,
+                'titleSlug': found['titleSlug'],
+                'tmdbId': tmdb_id,
+                'year': found['year'],
+                'rootFolderPath': root_folder,
+                'images': found.get('images', []),
+                'monitored': monitored,
+                'addOptions': {
+                    'searchForMovie': search_for_movie
+                }
+            }
+            res = self.request_post(f'{self.host_url}/movie', data=jsonbody)
+            res.raise_for_status()
+            return _codec.decode(res)
+
+        results = bulk_apply(add, [i for i in tmdb_ids if i not in existing], max_workers=max_workers)
+        if len(results) > 0:
+            self._invalidate('movie', *(_utils.record_id(r.value) for r in results if r.ok))
+        added = {r.key: r for r in results}
+        return [added.get(i) or ItemResult(i, 'skipped') for i in tmdb_ids]
+
+    def update_movie(self, data):
+        """
+        Saves changes to a movie
+        :param data: the full movie (as returned by get_movie) with the changes made
+        """
+        res = self.request_put(f'{self.host_url}/movie', data)
+        movie = _codec.decode(res)
+        self._invalidate('movie', _utils.record_id(movie))
+        return movie
+
+    def update_movies(self, movies: list, changes: dict = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      max_workers: int = DEFAULT_WORKERS) -> list:
+        """
+        Saves many movies at once through the movie editor, chunk_size movies per request, or with concurrent
+        single updates if the server has no editor endpoint.
+        Returns an ItemResult per movie id, in input order: 'ok' with the saved movie as value, or 'failed' with the
+        error that occurred.
+        :param movies: movies (as returned by get_movie) to save, or ids of movies in the library
+        :param changes: fields to set on every movie, e.g. {'monitored': False, 'qualityProfileId': 4}
+        :param max_workers: number of requests sent concurrently
+        """
+        def send_one(record):
+            res = self.request_put(f'{self.host_url}/movie', record)
+            res.raise_for_status()
+            return _codec.decode(res)
 
-    def update_movie(self):
-        # TODO
-        raise NotImplemented
+        results = bulk_update(movies, changes, self.get_movie,
+                              lambda chunk: self.request_put(f'{self.host_url}/movie/editor', chunk), send_one,
+                              chunk_size=chunk_size, max_workers=max_workers)
+        self._invalidate('movie', *(r.key for r in results if r.ok))
+        return results
 
     def delete_movie(self, movie_id: int, delete_files: bool = None, add_exclusion: bool = None):
         """
@@ -157,14 +339,35 @@ class Radarr(object):
         if delete_files is None and add_exclusion is None:
             jsonBody = None
         else:
-            query_string = "?"
             if delete_files is not None:
                 jsonBody['deleteFiles'] = delete_files
             if add_exclusion is not None:
                 jsonBody['addExclusion'] = add_exclusion
-            data = json.dumps(jsonBody)
-        res = self.request_del(f'{self.host_url}/movie/{movie_id}', data=data)
-        return res.json()
+        res = self.request_del(f'{self.host_url}/movie/{movie_id}', data=jsonBody)
+        self._invalidate('movie', movie_id)
+        return _codec.decode(res)
+
+    def delete_movies(self, movie_ids: list, delete_files: bool = False, add_exclusion: bool = False,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE, max_workers: int = DEFAULT_WORKERS) -> list:
+        """
+        Deletes many movies at once through the movie editor, or with concurrent single deletes if the server has
+        no editor endpoint. Returns an ItemResult per movie id, in input order.
+        :param delete_files: also delete the movie folders
+        :param add_exclusion: add the movies to the import exclusions
+        """
+        query_string = f'?deleteFiles={str(delete_files).lower()}&addExclusion={str(add_exclusion).lower()}'
+
+        def send_one(movie_id):
+            res = self.request_del(f'{self.host_url}/movie/{movie_id}{query_string}', None)
+            res.raise_for_status()
+
+        results = bulk_chunked(
+            movie_ids,
+            lambda chunk: self.request_del(f'{self.host_url}/movie/editor', {
+                'movieIds': chunk, 'deleteFiles': delete_files, 'addExclusion': add_exclusion}),
+            send_one, chunk_size=chunk_size, max_workers=max_workers)
+        self._invalidate('movie', *(r.key for r in results if r.ok))
+        return results
 
     # ENDPOINT MOVIE LOOKUP
     def movie_lookup_by_name(self, term: str):
@@ -173,32 +376,46 @@ class Radarr(object):
         :param term: the Movie's name
         """
         query_string = f"?term={term.replace(' ', '%20')}"
-        res = self.request_get(f'{self.host_url}/movie/lookup{query_string}')
-        return res.json()
+        return self._cached_lookup('movie', term, f'{self.host_url}/movie/lookup{query_string}')
 
     def movie_lookup_by_id(self, tmdb_id: int):
         """
 
         :param tmdb_id:
         """
-        res = self.request_get(f'{self.host_url}/movie/lookup/tmdb?tmdbId={tmdb_id}')
-        return res.json()
+        return self._cached_lookup('tmdb', tmdb_id, f'{self.host_url}/movie/lookup/tmdb?tmdbId={tmdb_id}')
 
     def movie_lookup_by_imdb_id(self, imdb_id: str):
         """
 
         :param imdb_id:
         """
-        res = self.request_get(f'{self.host_url}/movie/lookup/imdb?imdbId={imdb_id}')
-        return res.json()
+        return self._cached_lookup('imdb', imdb_id, f'{self.host_url}/movie/lookup/imdb?imdbId={imdb_id}')
 
     # ENDPOINT QUEUE
-    def get_queue(self):
+    def get_queue(self, typed: bool = False):
         """
         Gets queue info (downloading/completed, ok/warning)
+        :param typed: return compact models.QueueItem records instead of dicts
         """
         res = self.request_get(f'{self.host_url}/queue')
-        return res.json()
+        queue = _codec.decode(res)
+        return QueueItem.from_list(queue) if typed else queue
+
+    def stream_queue(self, fields: list = None):
+        """Like get_queue, but parses the response incrementally and yields the queue items one by one
+        :param fields: if given, only these keys are kept of each item
+        """
+        return self._stream(f'{self.host_url}/queue', fields=fields)
+
+    def watch_queue(self, min_interval: float = DEFAULT_MIN_INTERVAL,
+                    max_interval: float = DEFAULT_MAX_INTERVAL) -> QueueWatcher:
+        """Returns the client's QueueWatcher, which polls the queue while anyone iterates its events() or is
+        subscribed and reports only added, removed and progressed items. Every call returns the same watcher, so all
+        consumers share one poller; the intervals only apply when it is created."""
+        if self._queue_watcher is None:
+            self._queue_watcher = QueueWatcher(self, min_interval=min_interval, max_interval=max_interval)
+        return self._queue_watcher
 
     def delete_queue_item(self, queue_id: int, blacklist: bool = False):
         """
@@ -206,24 +423,35 @@ class Radarr(object):
         :param queue_id: Unique ID of the command
         :param blacklist: Set to 'true' to blacklist after delete
         """
-        json_body = dict()
-        json_body['id'] = queue_id
-        json_body['blacklist'] = blacklist
-        data = json.dumps(json_body)
-        res = self.request_del(f'{self.host_url}/queue', data=data)
-        return res.json()
+        res = self.request_del(f'{self.host_url}/queue/{queue_id}?blacklist={str(blacklist).lower()}', None)
+        self._invalidate('queue')
+        return _codec.decode(res)
+
+    def delete_queue_items(self, queue_ids: list, blacklist: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           max_workers: int = DEFAULT_WORKERS) -> list:
+        """
+        Removes many items from the queue through the bulk endpoint, or with concurrent single deletes if the server
+        has none. Returns an ItemResult per queue id, in input order.
+        :param blacklist: also blacklist the releases
+        """
+        results = bulk_chunked(
+            queue_ids,
+            lambda chunk: self.request_del(f'{self.host_url}/queue/bulk', {'ids': chunk, 'blacklist': blacklist}),
+            lambda queue_id: delete_queue_item(self, queue_id, blacklist),
+            chunk_size=chunk_size, max_workers=max_workers)
+        self._invalidate('queue')
+        return results
 
     # ENDPOINT HISTORY SIZE
     def get_history_size(self, page_size):
         """Gets history (grabs/failures/completed)"""
         res = self.request_get("{}/history?pageSize={}".format(self.host_url, page_size))
-        return res.json()
+        return _codec.decode(res)
 
     # ENDPOINT PROFILE
     def get_quality_profiles(self):
         """Gets all quality profiles"""
-        res = self.request_get("{}/profile".format(self.host_url))
-        return res.json()
+        return self._cached_get('profile')
 
     # ENDPOINT RELEASE
 
@@ -241,65 +469,56 @@ class Radarr(object):
             'protocol': protocol,
             'publish_date': publish_date
         }
-        data = json.dumps(json_body)
         res = self.request_post(
-            "{}/release/push".format(self.host_url), data=data)
-        return res.json()
+            "{}/release/push".format(self.host_url), data=json_body)
+        return _codec.decode(res)
 
     # ENDPOINT ROOTFOLDER
     def get_root_folder(self):
         """Returns the Root Folder"""
-        res = self.request_get("{}/rootfolder".format(self.host_url))
-        return res.json()
+        return self._cached_get('rootfolder')
 
     # ENDPOINT SYSTEM-STATUS
     def get_system_status(self):
         """Returns the System Status"""
-        res = self.request_get("{}/system/status".format(self.host_url))
-        return res.json()
+        return self._cached_get('system/status')
 
     # REQUESTS STUFF
-    def request_get(self, url, data=None, params=None):
+    def request_get(self, url, data=None, params=None, timeout=None):
         # """Wrapper on the requests.get"""
+        # timeout: seconds or (connect, read) for this call, defaults to the client's timeout
         if data is None:
             data = {}
-        headers = {
-            'X-Api-Key': self.api_key
-        }
 
         query_string = str()
         if params is not None:
             query_string += '?'
             for key, value in params.items():
                 query_string += f'&{key}={value}'
-        res = requests.get(url + query_string, headers=headers, json=data)
+        res = self.transport.request('GET', url + query_string, json=data, timeout=timeout)
         return res
 
-    def request_post(self, url, data):
+    def request_post(self, url, data, timeout=None):
         # """Wrapper on the requests.post"""
-        headers = {
-            'X-Api-Key': self.api_key
-        }
-        data2 = json.loads(data)
-        res = requests.post(url, headers=headers, json=data2)
+        res = self.transport.request('POST', url, json=data, timeout=timeout)
         return res
 
-    def request_put(self, url, data):
+    def request_put(self, url, data, timeout=None):
         # """Wrapper on the requests.put"""
-        headers = {
-            'X-Api-Key': self.api_key
-        }
-        res = requests.put(url, headers=headers, json=data)
+        res = self.transport.request('PUT', url, json=data, timeout=timeout)
         return res
 
-    def request_del(self, url, data):
+    def request_del(self, url, data, timeout=None):
         # """Wrapper on the requests.delete"""
-        headers = {
-            'X-Api-Key': self.api_key
-        }
-        res = requests.delete(url, headers=headers, json=data)
+        res = self.transport.request('DELETE', url, json=data, timeout=timeout)
         return res
 
+    def close(self):
+        """Stops the queue watcher and closes the pooled connections held by this client"""
+        if self._queue_watcher is not None:
+            self._queue_watcher.stop()
+        self.transport.close()
+
     class _Commands(object):
         def __init__(self, parent):
             self.radarr = parent
@@ -317,13 +536,14 @@ class Radarr(object):
             """
             return self.radarr.run_command(name='RescanMovie', movieId=movie_id)
 
-        def movie_search(self, movie_ids: list = None):
+        def movie_search(self, movie_ids: list = None, priority: int = NORMAL):
             """
             Search for one or more movies
             :type movie_ids: list
             :parameter movie_ids: one or more episodeIds in an array Not 100% sure on this run_command variable
+            :param priority: see run_command
             """
-            return self.radarr.run_command(name='MoviesSearch', movieIds=movie_ids)
+            return self.radarr.run_command(name='MoviesSearch', movieIds=movie_ids, priority=priority)
 
         def downloaded_movies_scan(self, path: str = None, download_client_id: str = None, import_mode: str = None):
             """Instruct Radarr to scan the DroneFactoryFolder or a folder defined by the path variable.
@@ -344,9 +564,9 @@ class Radarr(object):
             return self.radarr.run_command(name='DownloadedMoviesScan', path=path, downloadClientId=download_client_id,
                                            importMode=import_mode)
 
-        def rss_sync(self):
+        def rss_sync(self, priority: int = NORMAL):
             """Instruct Radarr to perform an RSS sync with all enabled indexers"""
-            return self.radarr.run_command(name='RssSync')
+            return self.radarr.run_command(name='RssSync', priority=priority)
 
         def rename_files(self, files: list = None):
             """Instruct Radarr to rename the list of files provided.
@@ -362,7 +582,7 @@ class Radarr(object):
             """
             return self.radarr.run_command(name='RenameMovie', movieIds=movie_ids)
 
-        def cut_off_unmet_movies_search(self, filter_key: str, filter_value: str):
+        def cut_off_unmet_movies_search(self, filter_key: str, filter_value: str, priority: int = NORMAL):
             """Instructs Radarr to search all cutoff unmet movies (Take care, since it could go over your indexers
             api limits!)
             :param filter_key:  Key by which to further filter cutoff unmet movies. (Possible values:
@@ -370,15 +590,16 @@ class Radarr(object):
             :param filter_value: Value by which to further filter cutoff unmet
             movies. This must correspond to the filterKey. (Possible values with respect to the ones for the
             filterKey above: (true (recommended), false), (all), (available, released, inCinemas, announced)
+            :param priority: see run_command
             """
             return self.radarr.run_command(name='CutOffUnmetMoviesSearch', filterKey=filter_key,
-                                           filterValue=filter_value)
+                                           filterValue=filter_value, priority=priority)
 
         def net_import_sync(self):
             """Instructs Radarr to search all lists for movies not yet added to Radarr."""
             return self.radarr.run_command(name='NetImportSync')
 
-        def missing_movies_search(self, filter_key: str, filter_value: str):
+        def missing_movies_search(self, filter_key: str, filter_value: str, priority: int = NORMAL):
             """Instructs Radarr to search all missing movies. This functionality is similar to what CouchPotato does
             and runs a backlog search for all your missing movies. For example You can use this api with curl and
             crontab to instruct Radarr to run a backlog search on 1 AM everyday.
@@ -388,5 +609,28 @@ class Radarr(object):
             further filter missing movies. (Possible values: monitored (recommended), all, status)
             :param filter_key:
             Key by which to further filter missing movies. (Possible values: monitored (recommended), all, status)
+            :param priority: see run_command
             """
-            return self.radarr.run_command(self, filterKey=filter_key, filterValue=filter_value)
+            return self.radarr.run_command(name='MissingMoviesSearch', filterKey=filter_key, filterValue=filter_value,
+                                           priority=priority)
+
+
+def _history_query(page: int, page_size: int, sort_key: str, sort_dir: str) -> str:
+    query_string = "?"
+    query_string += f'page={page}'
+    if page_size is not None:
+        query_string += f'&pageSize={page_size}'
+    if sort_key is not None:
+        query_string += f'&sortKey={sort_key}'
+    if sort_dir is not None:
+        query_string += f'&sortDir={sort_dir}'
+    return query_string
+
+
+_RELEASE_FIELDS = ('inCinemas', 'physicalRelease', 'digitalRelease')
+
+
+def _release_date(movie: dict, after: str = '') -> str:
+    """Returns the earliest release date of movie on or after the ISO date after, '' if there is none"""
+    dates = [movie[f] for f in _RELEASE_FIELDS if movie.get(f) and movie[f] >= after]
+    return min(dates) if dates else ''
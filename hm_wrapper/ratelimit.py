@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import heapq
+import itertools
+import threading
+import time
+from typing import NamedTuple
+
+from hm_wrapper.exceptions import RateLimitTimeoutError
+
+# priorities of run_command / the search helpers; lower goes first
+URGENT = 0
+NORMAL = 10
+BACKGROUND = 20
+# shortest sleep of a coroutine waiting behind other waiters before it checks its place in line again
+ASYNC_POLL_INTERVAL = 0.05
+
+
+class Limit(NamedTuple):
+    """At most calls commands per period seconds; up to burst (default: calls) of them may be sent back to back"""
+    calls: int
+    period: float
+    burst: int = None
+
+
+# command name -> class of commands that share a limit; commands not listed are never held back. Names are matched
+# case-insensitively, like the API does
+DEFAULT_COMMAND_CLASSES = {
+    'EpisodeSearch': 'search',
+    'SeasonSearch': 'search',
+    'SeriesSearch': 'search',
+    'MoviesSearch': 'search',
+    'missingEpisodeSearch': 'backlog',
+    'MissingMoviesSearch': 'backlog',
+    'CutOffUnmetMoviesSearch': 'backlog',
+    'RssSync': 'rss',
+}
+
+DEFAULT_LIMITS = {
+    'search': Limit(10, 60),
+    'backlog': Limit(1, 600),
+    'rss': Limit(1, 300),
+}
+
+
+class TokenBucket(object):
+    """Token bucket whose waiters are served by priority, then first come first served. Thread-safe."""
+
+    def __init__(self, rate: float, burst: int, clock=time.monotonic):
+        """
+        :param rate: tokens added per second
+        :param burst: maximum number of tokens held, i.e. how many calls can go out at once after an idle period
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError('rate must be positive and burst at least 1')
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        with self._cond:
+            self._refill()
+            return self._tokens
+
+    def acquire(self, priority: int = NORMAL, timeout: float = None) -> bool:
+        """Takes a token, waiting until one is available and every waiter of a higher priority was served.
+        Returns False if no token could be taken within timeout seconds."""
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._cond:
+            entry = self._enqueue(priority)
+            try:
+                while True:
+                    taken, wait = self._take(entry)
+                    if taken:
+                        entry = None
+                        return True
+                    if deadline is not None:
+                        remaining = deadline - self._clock()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                if entry is not None:
+                    self._dequeue(entry)
+
+    async def acquire_async(self, priority: int = NORMAL, timeout: float = None) -> bool:
+        """Like acquire, for coroutines: waits with asyncio.sleep instead of blocking a thread and can be cancelled.
+        Waiting threads are woken as usual; waiting coroutines check back when the next token is due."""
+        # imported here: the sync clients import this module and should not pay for asyncio at startup
+        import asyncio
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._cond:
+            entry = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    taken, wait = self._take(entry)
+                    if taken:
+                        entry = None
+                        return True
+                    if wait is None:
+                        # another waiter is first in line and gets the next token
+                        wait = max((1 - self._tokens) / self.rate, ASYNC_POLL_INTERVAL)
+                if deadline is not None:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                await asyncio.sleep(wait)
+        finally:
+            if entry is not None:
+                with self._cond:
+                    self._dequeue(entry)
+
+    def _enqueue(self, priority: int) -> tuple:
+        entry = (priority, next(self._sequence))
+        heapq.heappush(self._waiters, entry)
+        return entry
+
+    def _dequeue(self, entry: tuple):
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+        self._cond.notify_all()
+
+    def _take(self, entry: tuple) -> tuple:
+        """Takes a token for entry if it is first in line and one is available. Returns (taken, seconds until the next
+        token), the wait being None while another waiter is first. Called with the condition held."""
+        if self._waiters[0] != entry:
+            return False, None
+        self._refill()
+        if self._tokens < 1:
+            return False, (1 - self._tokens) / self.rate
+        self._tokens -= 1
+        heapq.heappop(self._waiters)
+        # the next waiter may be able to go right away
+        self._cond.notify_all()
+        return True, None
+
+
+class RateLimiter(object):
+    """Client-side rate limits for commands that hit the indexers.
+
+    Every class of commands (see DEFAULT_COMMAND_CLASSES) has its own token bucket, so commands are sent as fast as
+    their class's limit allows and back off only when it is exhausted. Waiting commands are served by priority, so an
+    URGENT user-triggered search jumps ahead of a BACKGROUND backlog. Pass the same limiter to several clients (e.g. a
+    Sonarr and a Radarr sharing indexers) to make them share the limits.
+    """
+
+    def __init__(self, limits: dict = None, command_classes: dict = None, clock=time.monotonic):
+        """
+        :param limits: command class -> Limit (or a (calls, period[, burst]) tuple); defaults to DEFAULT_LIMITS
+        :param command_classes: command name -> command class; defaults to DEFAULT_COMMAND_CLASSES
+        """
+        if limits is None:
+            limits = DEFAULT_LIMITS
+        if command_classes is None:
+            command_classes = DEFAULT_COMMAND_CLASSES
+        self.command_classes = {name.lower(): command_class for name, command_class in command_classes.items()}
+        self.buckets = dict()
+        for command_class, limit in limits.items():
+            limit = Limit(*limit)
+            burst = limit.calls if limit.burst is None else limit.burst
+            self.buckets[command_class] = TokenBucket(limit.calls / limit.period, burst, clock=clock)
+
+    def bucket(self, command_name: str):
+        """Returns the bucket the command is limited by, None if it is not limited"""
+        return self.buckets.get(self.command_classes.get(command_name.lower()))
+
+    def acquire(self, command_name: str, priority: int = NORMAL, timeout: float = None):
+        """Waits until the command may be sent; raises RateLimitTimeoutError if that takes longer than timeout"""
+        bucket = self.bucket(command_name)
+        if bucket is not None and not bucket.acquire(priority, timeout):
+            raise RateLimitTimeoutError(f'{command_name} was not let through the rate limit within {timeout}s')
+
+    async def acquire_async(self, command_name: str, priority: int = NORMAL, timeout: float = None):
+        """Like acquire, for coroutines; waits on the event loop instead of blocking a thread"""
+        bucket = self.bucket(command_name)
+        if bucket is not None and not await bucket.acquire_async(priority, timeout):
+            raise RateLimitTimeoutError(f'{command_name} was not let through the rate limit within {timeout}s')
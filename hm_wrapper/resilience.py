@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Retries and circuit breaking for the transports.
+
+Idempotent requests (GET, HEAD) that fail with a connection error, a timeout or a "try again" status are retried
+after an exponentially growing, jittered delay. A per-host circuit breaker stops sending requests to a host after
+repeated failures, fails fast with CircuitOpenError while it is down, and lets a single probe through every
+reset_timeout seconds to detect its recovery.
+"""
+import random
+import threading
+import time
+
+from hm_wrapper.exceptions import CircuitOpenError
+
+# statuses a server sends when it is overloaded or restarting
+UNAVAILABLE_STATUSES = frozenset((502, 503, 504))
+
+
+class RetryPolicy(object):
+    """Decides which requests are retried and how long to wait before each retry"""
+
+    def __init__(self, retries: int = 2, backoff: float = 0.25, max_backoff: float = 8.0, jitter: bool = True,
+                 methods=('GET', 'HEAD'), statuses=(429,) + tuple(UNAVAILABLE_STATUSES)):
+        """
+        :param retries: retries after the first attempt
+        :param backoff: delay before the first retry; it doubles with every further retry, up to max_backoff
+        :param jitter: wait a random time between 0 and the delay ("full jitter"), so clients that failed together do
+        not come back together
+        :param methods: only requests of these (idempotent) methods are retried
+        :param statuses: response statuses that are retried, besides connection errors and timeouts
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.methods = frozenset(m.upper() for m in methods)
+        self.statuses = frozenset(statuses)
+
+    def retryable(self, method: str, attempt: int, status_code: int = None) -> bool:
+        """Whether attempt (0 for the first) of a request that failed with status_code, or with a connection error or
+        timeout if status_code is None, is retried"""
+        if attempt >= self.retries or method.upper() not in self.methods:
+            return False
+        return status_code is None or status_code in self.statuses
+
+    def delay(self, attempt: int, retry_after: str = None) -> float:
+        """Seconds to wait before retrying after attempt; a Retry-After header in seconds is honoured up to
+        max_backoff"""
+        if retry_after is not None:
+            try:
+                return min(max(float(retry_after), 0.0), self.max_backoff)
+            except ValueError:
+                pass
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+class _HostState(object):
+    __slots__ = ('failures', 'opened_at', 'probing')
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+
+class CircuitBreaker(object):
+    """Per-host circuit breaker: 'closed' (requests pass), 'open' after failure_threshold consecutive failures
+    (requests fail fast with CircuitOpenError) and 'half-open' once reset_timeout has passed, when a single probe
+    request is let through; its success closes the circuit, its failure opens it again. Thread-safe; may be shared
+    by several transports."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._hosts = dict()
+        self._lock = threading.Lock()
+
+    def _host(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState()
+        return state
+
+    def state(self, host: str) -> str:
+        with self._lock:
+            state = self._host(host)
+            if state.opened_at is None:
+                return 'closed'
+            if state.probing or self._clock() - state.opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def before(self, host: str) -> bool:
+        """Called before a request to host; raises CircuitOpenError if it must not be sent. Returns True if the
+        request is the half-open probe, which must end with success(), failure() or release()."""
+        with self._lock:
+            state = self._host(host)
+            if state.opened_at is None:
+                return False
+            remaining = self.reset_timeout - (self._clock() - state.opened_at)
+            if remaining > 0 or state.probing:
+                raise CircuitOpenError(f'{host} is unavailable, failing fast for another {max(remaining, 0):.1f}s',
+                                       host=host, retry_in=max(remaining, 0))
+            state.probing = True
+            return True
+
+    def success(self, host: str):
+        with self._lock:
+            state = self._host(host)
+            state.failures = 0
+            state.opened_at = None
+            state.probing = False
+
+    def failure(self, host: str):
+        with self._lock:
+            state = self._host(host)
+            state.failures += 1
+            if state.probing or state.failures >= self.failure_threshold:
+                state.opened_at = self._clock()
+            state.probing = False
+
+    def release(self, host: str):
+        """Gives up the probe of host without an outcome (it was cancelled, interrupted or failed on the client side),
+        so that the next request becomes the probe instead of failing fast forever"""
+        with self._lock:
+            self._host(host).probing = False
+
+    def reset(self, host: str = None):
+        """Closes the circuit of host, or of every host"""
+        with self._lock:
+            if host is None:
+                self._hosts.clear()
+            else:
+                self._hosts.pop(host, None)
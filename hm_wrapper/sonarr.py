@@ -1,16 +1,44 @@
 # -*- coding: utf-8 -*-
-import json
 import logging
-
-import requests
-
-
-class Sonarr(object):
-
-    def __init__(self, host_url: str, api_key: str):
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+from hm_wrapper import _codec, _utils
+from hm_wrapper._client import ClientMixin
+from hm_wrapper._concurrent import bounded_map, bulk_apply, bulk_chunked, bulk_update, delete_queue_item, ordered_map, \
+    ItemResult, DEFAULT_CHUNK_SIZE, DEFAULT_PAGE_SIZE, DEFAULT_WORKERS
+from hm_wrapper._transport import Transport, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, new_transport
+from hm_wrapper._utils import CalendarWindow
+from hm_wrapper.cache import LookupCache, ResponseCache
+from hm_wrapper.commands import CommandHandle
+from hm_wrapper.metrics import Metrics
+from hm_wrapper.models import Episode, QueueItem, Series
+from hm_wrapper.ratelimit import RateLimiter, NORMAL
+from hm_wrapper.watch import DEFAULT_MAX_INTERVAL, DEFAULT_MIN_INTERVAL, QueueWatcher
+
+
+class SeriesSnapshot(NamedTuple):
+    """One series of a Sonarr.snapshot_episodes run; episodes is None and error is set if fetching it failed"""
+    series: dict
+    episodes: list = None
+    error: Exception = None
+
+
+class Sonarr(ClientMixin):
+
+    def __init__(self, host_url: str, api_key: str, pool_size: int = DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 transport: Transport = None, cache: ResponseCache = None, lookup_cache: LookupCache = None,
+                 rate_limiter: RateLimiter = None, metrics: Metrics = None):
         """Constructor requires Host-URL and API-KEY
         :type api_key: object
         :type host_url: str
+        :param pool_size: maximum number of keep-alive connections kept open to the host
+        :param timeout: default request timeout, either seconds or a (connect, read) tuple
+        :param transport: use an existing Transport instead of creating one; pool_size and timeout are then ignored
+        :param cache: optional ResponseCache for the slow-changing endpoints (profiles, root folders, status, ...)
+        :param lookup_cache: optional persistent LookupCache for the metadata lookup endpoints
+        :param rate_limiter: optional RateLimiter that holds back indexer-heavy commands (searches, RSS sync)
+        :param metrics: optional Metrics registry recording the latency, size and status of every request by endpoint
         """
 
         if host_url.rstrip('/').endswith('api'):
@@ -20,23 +48,70 @@ class Sonarr(object):
 
         self.Commands = self._Commands(self)
         self.api_key = api_key
+        if transport is None:
+            transport = new_transport(api_key, pool_size=pool_size, timeout=timeout, metrics=metrics)
+        elif metrics is not None:
+            transport.metrics = metrics
+        self.transport = transport
+        self.cache = cache
+        self.lookup_cache = lookup_cache
+        self.rate_limiter = rate_limiter
+        self._change_listeners = []
+        self._queue_watcher = None
 
     # ENDPOINT CALENDAR
-    def get_calendar(self):
-        # optional params: start (date) & end (date)
+    def get_calendar(self, start_date=None, end_date=None, window_days: int = _utils.DEFAULT_WINDOW_DAYS,
+                     max_workers: int = DEFAULT_WORKERS):
         """Gets upcoming episodes, if start/end are not supplied episodes airing today and tomorrow will be returned,
-        Returns Json """
-        res = self.request_get("{}/calendar".format(self.host_url))
-        return res.json()
+        Returns Json
+            will attempt to parse date strings. A range longer than window_days is fetched as windows of window_days,
+            max_workers at a time, and the episodes are merged in air date order without duplicates"""
+        if start_date is None or end_date is None or \
+                len(_utils.date_windows(start_date, end_date, window_days)) == 1:
+            query_params = dict()
+            if start_date is not None:
+                query_params['start'] = _utils.parse_date_input(start_date)
+            if end_date is not None:
+                query_params['end'] = _utils.parse_date_input(end_date)
+            res = self.request_get(_with_query(f'{self.host_url}/calendar', query_params))
+            return _codec.decode(res)
+        episodes = []
+        for window in self.iter_calendar(start_date, end_date, window_days=window_days, max_workers=max_workers):
+            episodes.extend(window.items)
+        return episodes
+
+    def iter_calendar(self, start_date, end_date, window_days: int = _utils.DEFAULT_WINDOW_DAYS,
+                      max_workers: int = DEFAULT_WORKERS):
+        """Yields a CalendarWindow (start, end, items) per window_days of the range, nearest first, so the near term
+        can be shown while later windows are still being fetched (max_workers at a time). Each window's episodes are
+        sorted by air date; an episode already yielded by an earlier window is left out."""
+        seen = set()
+        windows = _utils.date_windows(start_date, end_date, window_days)
+        for (start, end), episodes, error in ordered_map(self._calendar_window, windows, max_workers=max_workers):
+            if error is not None:
+                raise error
+            yield CalendarWindow(start, end, _utils.new_in_window(episodes, seen, _air_date))
+
+    def _calendar_window(self, window: tuple) -> list:
+        start, end = window
+        res = self.request_get(_with_query(f'{self.host_url}/calendar',
+                                           {'start': start.isoformat(), 'end': end.isoformat()}))
+        res.raise_for_status()
+        return _codec.decode(res)
 
     # ENDPOINT COMMAND
-    def run_command(self, **kwargs):
+    def run_command(self, priority: int = NORMAL, **kwargs):
+        """Starts the command given by name and its parameters as keyword arguments
+        :param priority: with a rate_limiter, commands waiting for the limit are sent in order of priority (URGENT,
+        NORMAL, BACKGROUND from hm_wrapper.ratelimit)"""
         ags = dict()
         for key, value in kwargs.items():
             if value is not None:
                 ags[key] = value
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(ags['name'], priority)
         res = self.request_post(f'{self.host_url}/command', data=ags)
-        return res.json()
+        return _codec.decode(res)
 
     def get_command(self, command_id: int = None) -> dict:
         """Without an id argument, returns the status of all currently started commands;
@@ -44,25 +119,32 @@ class Sonarr(object):
         id_string = str()
         if command_id is not None:
             id_string += "/" + str(command_id)
-        res = self.request_get(f"{self.host_url}/run_command{id_string}")
-        return res.json()
+        res = self.request_get(f"{self.host_url}/command{id_string}")
+        return _codec.decode(res)
+
+    def track_command(self, command) -> CommandHandle:
+        """Returns a CommandHandle to wait on a command started with run_command or one of the Commands helpers
+        :param command: the command resource returned when the command was started, or its id
+        """
+        return CommandHandle(self, command)
 
     # ENDPOINT DISKSPACE
     def get_diskspace(self) -> list:
         """Return Information about Diskspace"""
-        res = self.request_get("{}/diskspace".format(self.host_url))
-        return res.json()
+        return self._cached_get('diskspace')
 
     # ENDPOINT EPISODE
-    def get_episodes_by_series_id(self, series_id) -> list:
-        """Returns all episodes for the given series"""
+    def get_episodes_by_series_id(self, series_id, typed: bool = False) -> list:
+        """Returns all episodes for the given series
+        :param typed: return compact models.Episode records instead of dicts"""
         res = self.request_get("{}/episode?seriesId={}".format(self.host_url, series_id))
-        return res.json()
+        episodes = _codec.decode(res)
+        return Episode.from_list(episodes) if typed else episodes
 
     def get_episode_by_episode_id(self, episode_id) -> list:
         """Returns the episode with the matching id"""
         res = self.request_get("{}/episode/{}".format(self.host_url, episode_id))
-        return res.json()
+        return _codec.decode(res)
 
     def upd_episode(self, data):
         # TEST THIS
@@ -70,56 +152,172 @@ class Sonarr(object):
         '''NOTE: All parameters (you should perform a GET/{id} and submit the full body with the changes,
         as other values may be editable in the future.'''
         res = self.request_put("{}/episode".format(self.host_url, data))
-        return res.json()
+        return _codec.decode(res)
 
     # ENDPOINT EPISODE FILE
     def get_episode_files_by_series_id(self, series_id) -> list:
         """Returns all episode files for the given series"""
         res = self.request_get("{}/episodefile?seriesId={}".format(self.host_url, series_id))
-        return res.json()
+        return _codec.decode(res)
 
     # TEST THIS
     def get_episode_file_by_episode_id(self, episode_id) -> list:
         """Returns the episode file with the matching id"""
         res = self.request_get("{}/episodefile/{}".format(self.host_url, episode_id))
-        return res.json()
+        return _codec.decode(res)
 
     # TEST THIS
     def rem_episode_file_by_episode_id(self, episode_id):
         """Delete the given episode file"""
         res = self.request_del("{}/episodefile/{}".format(self.host_url, episode_id))
-        return res.json()
+        return _codec.decode(res)
+
+    def snapshot_episodes(self, series: list = None, include_files: bool = True,
+                          max_workers: int = DEFAULT_WORKERS, progress=None):
+        """Fetches the episodes of every series over a pool of max_workers threads and yields a SeriesSnapshot per
+        series as soon as it is done (in completion order, not library order).
+        With include_files each episode that has a file gets its episode file joined in under 'episodeFile'.
+        A failing series is yielded with its error set instead of aborting the snapshot.
+        :param series: series dicts to snapshot, defaults to get_series()
+        :param include_files: also fetch the episode files of every series and join them onto the episodes
+        :param max_workers: number of series fetched concurrently
+        :param progress: optional callable(completed: int, total: int, snapshot: SeriesSnapshot)
+        """
+        if series is None:
+            series = self.get_series()
+        total = len(series)
+        completed = 0
+        for s, episodes, error in bounded_map(lambda x: self._series_episodes(x['id'], include_files), series,
+                                              max_workers=max_workers):
+            completed += 1
+            snapshot = SeriesSnapshot(s, episodes, error)
+            if progress is not None:
+                progress(completed, total, snapshot)
+            yield snapshot
+
+    def _series_episodes(self, series_id, include_files: bool) -> list:
+        res = self.request_get("{}/episode?seriesId={}".format(self.host_url, series_id))
+        res.raise_for_status()
+        episodes = _codec.decode(res)
+        if include_files:
+            res = self.request_get("{}/episodefile?seriesId={}".format(self.host_url, series_id))
+            res.raise_for_status()
+            files = {f['id']: f for f in _codec.decode(res)}
+            for episode in episodes:
+                episode_file = files.get(episode.get('episodeFileId'))
+                if episode_file is not None:
+                    episode['episodeFile'] = episode_file
+        return episodes
 
     # ENDPOINT HISTORY
     def get_history(self):
         """Gets history (grabs/failures/completed)"""
         res = self.request_get("{}/history".format(self.host_url))
-        return res.json()
+        return _codec.decode(res)
 
     # ENDPOINT HISTORY SIZE
     def get_history_size(self, page_size):
         """Gets history (grabs/failures/completed)"""
         res = self.request_get("{}/history?pageSize={}".format(self.host_url, page_size))
-        return res.json()
+        return _codec.decode(res)
+
+    def stream_history(self, page_size: int = None, fields: list = None):
+        """Like get_history_size, but parses the response incrementally and yields the history records one by one
+        :param page_size: number of records to fetch, defaults to the server's page size
+        :param fields: if given, only these keys are kept of each record
+        """
+        query_string = str()
+        if page_size is not None:
+            query_string = f'?pageSize={page_size}'
+        return self._stream(f'{self.host_url}/history{query_string}', key='records', fields=fields)
+
+    def iter_history(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'date', sort_dir: str = 'desc',
+                     max_workers: int = DEFAULT_WORKERS):
+        """Yields the whole history, newest first by default, fetching the pages after the first concurrently
+        :param page_size: records per request
+        :param max_workers: number of pages fetched at once
+        """
+        return self._iter_pages('history', _utils.page_query(page_size, sort_key, sort_dir), max_workers)
 
     # ENDPOINT WANTED MISSING
-    # DOES NOT WORK
-    def get_wanted_missing(self):
-        """Gets missing episode (episodes without files)"""
-        res = self.request_get("{}/wanted/missing/".format(self.host_url))
-        return res.json()
+    def get_wanted_missing(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'airDateUtc',
+                           sort_dir: str = 'desc', monitored_only: bool = True, max_workers: int = DEFAULT_WORKERS):
+        """Gets missing episode (episodes without files), every page of them"""
+        return list(self.iter_wanted_missing(page_size, sort_key, sort_dir, monitored_only, max_workers))
+
+    def iter_wanted_missing(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'airDateUtc',
+                            sort_dir: str = 'desc', monitored_only: bool = True, max_workers: int = DEFAULT_WORKERS):
+        """Yields the aired episodes without a file, fetching the pages after the first concurrently
+        :param page_size: records per request
+        :param monitored_only: leave out unmonitored episodes
+        :param max_workers: number of pages fetched at once
+        """
+        query = _utils.page_query(page_size, sort_key, sort_dir, monitored_only)
+        return self._iter_pages('wanted/missing', query, max_workers)
+
+    # ENDPOINT WANTED CUTOFF
+    def get_cutoff_unmet(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'airDateUtc',
+                         sort_dir: str = 'desc', monitored_only: bool = True, max_workers: int = DEFAULT_WORKERS):
+        """Gets the episodes whose file is below the cutoff of their quality profile, every page of them"""
+        return list(self.iter_cutoff_unmet(page_size, sort_key, sort_dir, monitored_only, max_workers))
+
+    def iter_cutoff_unmet(self, page_size: int = DEFAULT_PAGE_SIZE, sort_key: str = 'airDateUtc',
+                          sort_dir: str = 'desc', monitored_only: bool = True, max_workers: int = DEFAULT_WORKERS):
+        """Like iter_wanted_missing, for the episodes whose file is below the cutoff of their quality profile"""
+        query = _utils.page_query(page_size, sort_key, sort_dir, monitored_only)
+        return self._iter_pages('wanted/cutoff', query, max_workers)
 
     # ENDPOINT QUEUE
-    def get_queue(self):
-        """Gets current downloading info"""
+    def get_queue(self, typed: bool = False):
+        """Gets current downloading info
+        :param typed: return compact models.QueueItem records instead of dicts"""
         res = self.request_get("{}/queue".format(self.host_url))
-        return res.json()
+        queue = _codec.decode(res)
+        return QueueItem.from_list(queue) if typed else queue
+
+    def stream_queue(self, fields: list = None):
+        """Like get_queue, but parses the response incrementally and yields the queue items one by one
+        :param fields: if given, only these keys are kept of each item
+        """
+        return self._stream(f'{self.host_url}/queue', fields=fields)
+
+    def watch_queue(self, min_interval: float = DEFAULT_MIN_INTERVAL,
+                    max_interval: float = DEFAULT_MAX_INTERVAL) -> QueueWatcher:
+        """Returns the client's QueueWatcher, which polls the queue while anyone iterates its events() or is
+        subscribed and reports only added, removed and progressed items. Every call returns the same watcher, so all
+        consumers share one poller; the intervals only apply when it is created."""
+        if self._queue_watcher is None:
+            self._queue_watcher = QueueWatcher(self, min_interval=min_interval, max_interval=max_interval)
+        return self._queue_watcher
+
+    def delete_queue_item(self, queue_id: int, blacklist: bool = False):
+        """
+        Removes an item from the queue and the download client
+        :param blacklist: also blacklist the release
+        """
+        res = self.request_del(f'{self.host_url}/queue/{queue_id}?blacklist={str(blacklist).lower()}', None)
+        self._invalidate('queue')
+        return _codec.decode(res)
+
+    def delete_queue_items(self, queue_ids: list, blacklist: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           max_workers: int = DEFAULT_WORKERS) -> list:
+        """
+        Removes many items from the queue through the bulk endpoint, or with concurrent single deletes if the server
+        has none. Returns an ItemResult per queue id, in input order.
+        :param blacklist: also blacklist the releases
+        """
+        results = bulk_chunked(
+            queue_ids,
+            lambda chunk: self.request_del(f'{self.host_url}/queue/bulk', {'ids': chunk, 'blacklist': blacklist}),
+            lambda queue_id: delete_queue_item(self, queue_id, blacklist),
+            chunk_size=chunk_size, max_workers=max_workers)
+        self._invalidate('queue')
+        return results
 
     # ENDPOINT PROFILE
     def get_quality_profiles(self):
         """Gets all quality profiles"""
-        res = self.request_get("{}/profile".format(self.host_url))
-        return res.json()
+        return self._cached_get('profile')
 
     # ENDPOINT RELEASE
 
@@ -139,49 +337,43 @@ class Sonarr(object):
                 'protocol': protocol,
                 'publish_date': publish_date
             })
-        return res.json()
+        return _codec.decode(res)
 
     # ENDPOINT ROOTFOLDER
     def get_root_folder(self):
         """Returns the Root Folder"""
-        res = self.request_get("{}/rootfolder".format(self.host_url))
-        return res.json()
+        return self._cached_get('rootfolder')
 
     # ENDPOINT SERIES
-    def get_series(self):
+    def get_series(self, typed: bool = False):
         # """Return all series in your collection"""
-        res = self.request_get("{}/series".format(self.host_url))
-        return res.json()
+        # :param typed: return compact models.Series records instead of dicts
+        series = self._cached_get('series')
+        return Series.from_list(series) if typed else series
+
+    def stream_series(self, fields: list = None):
+        """Like get_series, but parses the response incrementally and yields the series one by one, so memory use
+        does not grow with the size of the library
+        :param fields: if given, only these keys are kept of each series, e.g. ['id', 'tvdbId', 'path']
+        """
+        return self._stream(f'{self.host_url}/series', fields=fields)
 
     def get_series_by_series_id(self, series_id):
         # """Return the series with the matching ID or 404 if no matching series is found"""
         res = self.request_get("{}/series/{}".format(self.host_url, series_id))
-        return res.json()
+        return _codec.decode(res)
 
     # noinspection PyPep8Naming
-    def construct_series_json(self, tvdbId, quality_profile):
-        """Searches for new shows on trakt and returns Series object to add"""
-        res = self.request_get("{}/series/lookup?term={}".format(self.host_url, 'tvdbId:' + str(tvdbId)))
-        s_dict = res.json()[0]
+    def construct_series_json(self, tvdbId, quality_profile, root_folder: str = None):
+        """Searches for new shows on trakt and returns Series object to add
+        :param root_folder: root folder path to add the series under, defaults to the first root folder"""
+        s_dict = self.lookup_series('tvdbId:' + str(tvdbId))[0]
 
         # get root folder path
-        root = self.get_root_folder()[0]['path']
-        series_json = {
-            'title': s_dict['title'],
-            'seasons': s_dict['seasons'],
-            'path': root + s_dict['title'],
-            'qualityProfileId': quality_profile,
-            'seasonFolder': True,
-            'monitored': True,
-            'tvdbId': tvdbId,
-            'images': s_dict['images'],
-            'titleSlug': s_dict['titleSlug'],
-            "addOptions": {
-                "ignoreEpisodesWithFiles": True,
-                "ignoreEpisodesWithoutFiles": True
-            }
-        }
-        return series_json
+        root = root_folder
+        if root is None:
+            root = self.get_root_folder()[0]['path']
+        return _series_json_from_lookup(s_dict, tvdbId, quality_profile, root)
 
     def add_series_by_tvdbId(self, tvdbId, quality_profile):
         try:
@@ -196,6 +388,47 @@ class Sonarr(object):
             raise ex
         return
 
+    # noinspection PyPep8Naming
+    def add_series_by_tvdbIds(self, tvdbIds: list, quality_profile, root_folder: str = None,
+                              skip_existing: bool = True, max_workers: int = DEFAULT_WORKERS) -> list:
+        """
+        Adds many series at once. The root folder, quality profile and (with skip_existing) the ids already in the
+        library are resolved once up front, then the lookups and adds run concurrently.
+        Returns an ItemResult per distinct tvdbId, in input order: status 'ok' with the added series as value,
+        'skipped' if the series is already in the library or 'failed' with the error that occurred.
+        :param tvdbIds: tvdb ids of the series to add
+        :param quality_profile: quality profile id or name
+        :param root_folder: root folder path, defaults to the first root folder
+        :param skip_existing: skip ids already in the library instead of letting Sonarr reject them
+        :param max_workers: number of series looked up and added concurrently
+        """
+        tvdbIds = list(dict.fromkeys(tvdbIds))
+        if root_folder is None:
+            root_folder = self.get_root_folder()[0]['path']
+        if isinstance(quality_profile, str):
+            profiles = {p['name']: p['id'] for p in self.get_quality_profiles()}
+            if quality_profile not in profiles:
+                raise ValueError(f'unknown quality profile {quality_profile!r}')
+            quality_profile = profiles[quality_profile]
+        existing = set()
+        if skip_existing:
+            existing = {s.get('tvdbId') for s in self.get_series()}
+
+        def add(tvdb_id):
+            found = self.lookup_series(f'tvdbId:{tvdb_id}')
+            if not isinstance(found, list) or len(found) == 0:
+                raise LookupError(f'no series found for tvdbId {tvdb_id}')
+            series_json = _series_json_from_lookup(found[0], tvdb_id, quality_profile, root_folder)
+            res = self.request_post("{}/series".format(self.host_url), data=series_json)
+            res.raise_for_status()
+            return _codec.decode(res)
+
+        results = bulk_apply(add, [i for i in tvdbIds if i not in existing], max_workers=max_workers)
+        if len(results) > 0:
+            self._invalidate('series', *(_utils.record_id(r.value) for r in results if r.ok))
+        added = {r.key: r for r in results}
+        return [added.get(i) or ItemResult(i, 'skipped') for i in tvdbIds]
+
     # noinspection PyPep8Naming
     def add_series_by_parameters(self, tvdbId: int, title: str, profileId: int, titleSlug: str, images: list,
                                  seasons: list,
@@ -222,45 +455,13 @@ class Sonarr(object):
         :param searchForMissingEpisodes: Searches for missing files after applying ignoreEpisodesWithFiles and ignoreEpisodesWithoutFiles
         """
 
-        newSeriesObject = dict()
-        # check that we have EITHER fullPath or rootFolderPath
-        if fullPath is None and rootFolderPath is None:
-            raise Exception
-        elif fullPath is not None and rootFolderPath is not None:
-            raise Exception
-        elif fullPath is None and rootFolderPath is not None:
-            newSeriesObject["rootFolderPath"] = rootFolderPath
-        elif fullPath is not None and rootFolderPath is None:
-            newSeriesObject["path"] = fullPath
-        else:
-            pass
-
-        newSeriesObject.update({
-            "tvdbId": tvdbId,
-            "title": title,
-            "profileId": profileId,
-            "titleSlug": titleSlug,
-            "images": images,
-            "seasons": seasons,
-        })
-        if tvRageId is not None:
-            newSeriesObject["tvRageId"] = tvRageId
-        if seasonFolder is not None:
-            newSeriesObject["seasonFolder"] = seasonFolder
-        if monitored is not None:
-            newSeriesObject["monitored"] = monitored
-
-        # create the addOptions object, add it if applicable
-        addOptions = dict()
-        if ignoreEpisodesWithFiles is not None:
-            addOptions["ignoreEpisodesWithFiles"] = ignoreEpisodesWithFiles
-        if ignoreEpisodesWithoutFiles is not None:
-            addOptions["ignoreEpisodesWithoutFiles"] = ignoreEpisodesWithoutFiles
-        if searchForMissingEpisodes is not None:
-            addOptions["searchForMissingEpisodes"] = searchForMissingEpisodes
-        if len(addOptions) > 0:
-            newSeriesObject["addOptions"] = addOptions
-
+        newSeriesObject = _new_series_object(tvdbId=tvdbId, title=title, profileId=profileId, titleSlug=titleSlug,
+                                             images=images, seasons=seasons, fullPath=fullPath,
+                                             rootFolderPath=rootFolderPath, tvRageId=tvRageId,
+                                             seasonFolder=seasonFolder, monitored=monitored,
+                                             ignoreEpisodesWithFiles=ignoreEpisodesWithFiles,
+                                             ignoreEpisodesWithoutFiles=ignoreEpisodesWithoutFiles,
+                                             searchForMissingEpisodes=searchForMissingEpisodes)
         return self.add_series_from_json(newSeriesObject)
 
     def add_series_from_json(self, series_json):
@@ -269,12 +470,16 @@ class Sonarr(object):
         :return json response:
         """
         res = self.request_post("{}/series".format(self.host_url), data=series_json)
-        return res.json()
+        series = _codec.decode(res)
+        self._invalidate('series', _utils.record_id(series))
+        return series
 
     def upd_series(self, data):
         """Update an existing series"""
         res = self.request_put("{}/series".format(self.host_url), data)
-        return res.json()
+        series = _codec.decode(res)
+        self._invalidate('series', _utils.record_id(series))
+        return series
 
     def rem_series(self, series_id, rem_files=False):
         """Delete the series with the given ID"""
@@ -284,56 +489,90 @@ class Sonarr(object):
             'deleteFiles': 'true'
         }
         res = self.request_del("{}/series/{}".format(self.host_url, series_id), data)
-        return res.json()
+        self._invalidate('series', series_id)
+        return _codec.decode(res)
+
+    def upd_series_bulk(self, series: list, changes: dict = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        max_workers: int = DEFAULT_WORKERS) -> list:
+        """
+        Saves many series at once through the series editor, chunk_size series per request, or with concurrent
+        single updates if the server has no editor endpoint.
+        Returns an ItemResult per series id, in input order: 'ok' with the saved series as value, or 'failed' with
+        the error that occurred.
+        :param series: series (as returned by get_series) to save, or ids of series in the library
+        :param changes: fields to set on every series, e.g. {'monitored': False, 'qualityProfileId': 4}
+        :param max_workers: number of requests sent concurrently
+        """
+        def send_one(record):
+            res = self.request_put(f'{self.host_url}/series', record)
+            res.raise_for_status()
+            return _codec.decode(res)
+
+        results = bulk_update(series, changes, self.get_series,
+                              lambda chunk: self.request_put(f'{self.host_url}/series/editor', chunk), send_one,
+                              chunk_size=chunk_size, max_workers=max_workers)
+        self._invalidate('series', *(r.key for r in results if r.ok))
+        return results
+
+    def rem_series_bulk(self, series_ids: list, rem_files: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        max_workers: int = DEFAULT_WORKERS) -> list:
+        """
+        Deletes many series at once through the series editor, or with concurrent single deletes if the server has
+        no editor endpoint. Returns an ItemResult per series id, in input order.
+        :param rem_files: also delete the series folders
+        """
+        def send_one(series_id):
+            res = self.request_del(f'{self.host_url}/series/{series_id}?deleteFiles={str(rem_files).lower()}', None)
+            res.raise_for_status()
+
+        results = bulk_chunked(
+            series_ids,
+            lambda chunk: self.request_del(f'{self.host_url}/series/editor',
+                                           {'seriesIds': chunk, 'deleteFiles': rem_files}),
+            send_one, chunk_size=chunk_size, max_workers=max_workers)
+        self._invalidate('series', *(r.key for r in results if r.ok))
+        return results
 
     # ENDPOINT SERIES LOOKUP
     def lookup_series(self, query):
         """Searches for new shows on trakt"""
-        res = self.request_get("{}/series/lookup?term={}".format(self.host_url, query))
-        return res.json()
+        return self._cached_lookup('series', query, "{}/series/lookup?term={}".format(self.host_url, query))
 
     # ENDPOINT SYSTEM-STATUS
     def get_system_status(self):
         """Returns the System Status"""
-        res = self.request_get("{}/system/status".format(self.host_url))
-        return res.json()
+        return self._cached_get('system/status')
 
     # REQUESTS STUFF
-    def request_get(self, url, data=None):
+    def request_get(self, url, data=None, timeout=None):
         # """Wrapper on the requests.get"""
+        # timeout: seconds or (connect, read) for this call, defaults to the client's timeout
         if data is None:
             data = {}
-        headers = {
-            'X-Api-Key': self.api_key
-        }
-        res = requests.get(url, headers=headers, json=data)
+        res = self.transport.request('GET', url, json=data, timeout=timeout)
         return res
 
-    def request_post(self, url, data):
+    def request_post(self, url, data, timeout=None):
         # """Wrapper on the requests.post"""
-        headers = {
-            'X-Api-Key': self.api_key
-        }
-        res = requests.post(url, headers=headers, json=data)
+        res = self.transport.request('POST', url, json=data, timeout=timeout)
         return res
 
-    def request_put(self, url, data):
+    def request_put(self, url, data, timeout=None):
         # """Wrapper on the requests.put"""
-        headers = {
-            'X-Api-Key': self.api_key
-        }
-        data2 = json.loads(data)
-        res = requests.put(url, headers=headers, json=data2)
+        res = self.transport.request('PUT', url, json=data, timeout=timeout)
         return res
 
-    def request_del(self, url, data):
+    def request_del(self, url, data, timeout=None):
         # """Wrapper on the requests.delete"""
-        headers = {
-            'X-Api-Key': self.api_key
-        }
-        res = requests.delete(url, headers=headers, json=data)
+        res = self.transport.request('DELETE', url, json=data, timeout=timeout)
         return res
 
+    def close(self):
+        """Stops the queue watcher and closes the pooled connections held by this client"""
+        if self._queue_watcher is not None:
+            self._queue_watcher.stop()
+        self.transport.close()
+
     class _Commands(object):
         def __init__(self, parent):
             assert isinstance(parent, Sonarr)
@@ -352,28 +591,32 @@ class Sonarr(object):
             """
             return self._sonarr.run_command(name='RescanSeries', seriesId=series_id)
 
-        def episode_search(self, episode_ids: list = None):
+        def episode_search(self, episode_ids: list = None, priority: int = NORMAL):
             """
             Search for one or more movies
             :type episode_ids: list
             :parameter episode_ids: one or more episodeIds in an array Not 100% sure on this run_command variable
+            :param priority: see run_command
             """
-            return self._sonarr.run_command(name='EpisodeSearch', episodeIds=episode_ids)
+            return self._sonarr.run_command(name='EpisodeSearch', episodeIds=episode_ids, priority=priority)
 
-        def season_search(self, series_id: int, season_number: int):
+        def season_search(self, series_id: int, season_number: int, priority: int = NORMAL):
             """
             Search for all episodes of a particular season
             :param series_id:
             :param season_number:
+            :param priority: see run_command
             """
-            return self._sonarr.run_command(name='SeasonSearch', seriesId=series_id, seasonNumber=season_number)
+            return self._sonarr.run_command(name='SeasonSearch', seriesId=series_id, seasonNumber=season_number,
+                                            priority=priority)
 
-        def series_search(self, series_id: int):
+        def series_search(self, series_id: int, priority: int = NORMAL):
             """
             Search for all episodes in a series
             :param series_id:
+            :param priority: see run_command
             """
-            return self._sonarr.run_command(name='SeriesSearch', seriesId=series_id)
+            return self._sonarr.run_command(name='SeriesSearch', seriesId=series_id, priority=priority)
 
         def downloaded_episodes_scan(self, path: str = None, download_client_id: str = None, import_mode: str = None):
             """
@@ -397,9 +640,9 @@ class Sonarr(object):
                                             downloadClientId=download_client_id
                                             , importMode=import_mode)
 
-        def rss_sync(self):
+        def rss_sync(self, priority: int = NORMAL):
             """Instruct Sonarr to perform an RSS sync with all enabled indexers"""
-            return self._sonarr.run_command(name='RssSync')
+            return self._sonarr.run_command(name='RssSync', priority=priority)
 
         def rename_files(self, files: list = None):
             """Instruct Sonarr to rename the list of files provided.
@@ -411,9 +654,9 @@ class Sonarr(object):
         def rename_series(self, series_ids: list):
             """Instruct Sonarr to rename all files in the provided series.
             :type series_ids: list
-            :param series_ids: List of Movie IDs to rename
+            :param series_ids: List of Series IDs to rename
             """
-            return self._sonarr.run_command(name='RenameMovie', seriesIds=series_ids)
+            return self._sonarr.run_command(name='RenameSeries', seriesIds=series_ids)
 
         def backup(self):
             """
@@ -421,8 +664,85 @@ class Sonarr(object):
             """
             return self._sonarr.run_command(name='Backup')
 
-        def missing_episode_search(self):
+        def missing_episode_search(self, priority: int = NORMAL):
             """
             Instruct Sonarr to perform a backlog search of missing episodes (Similar functionality to Sickbeard)
+            :param priority: see run_command
             """
-            return self._sonarr.run_command(name='missingEpisodeSearch')
+            return self._sonarr.run_command(name='missingEpisodeSearch', priority=priority)
+
+
+# noinspection PyPep8Naming
+def _new_series_object(tvdbId: int, title: str, profileId: int, titleSlug: str, images: list, seasons: list,
+                       fullPath: str = None, rootFolderPath: str = None, tvRageId: int = None, seasonFolder=None,
+                       monitored: bool = None, ignoreEpisodesWithFiles: bool = None,
+                       ignoreEpisodesWithoutFiles: bool = None, searchForMissingEpisodes: bool = None) -> dict:
+    """Builds the request body for Sonarr.add_series_by_parameters"""
+    newSeriesObject = dict()
+    # check that we have EITHER fullPath or rootFolderPath
+    if fullPath is None and rootFolderPath is None:
+        raise Exception
+    elif fullPath is not None and rootFolderPath is not None:
+        raise Exception
+    elif fullPath is None and rootFolderPath is not None:
+        newSeriesObject["rootFolderPath"] = rootFolderPath
+    elif fullPath is not None and rootFolderPath is None:
+        newSeriesObject["path"] = fullPath
+    else:
+        pass
+
+    newSeriesObject.update({
+        "tvdbId": tvdbId,
+        "title": title,
+        "profileId": profileId,
+        "titleSlug": titleSlug,
+        "images": images,
+        "seasons": seasons,
+    })
+    if tvRageId is not None:
+        newSeriesObject["tvRageId"] = tvRageId
+    if seasonFolder is not None:
+        newSeriesObject["seasonFolder"] = seasonFolder
+    if monitored is not None:
+        newSeriesObject["monitored"] = monitored
+
+    # create the addOptions object, add it if applicable
+    addOptions = dict()
+    if ignoreEpisodesWithFiles is not None:
+        addOptions["ignoreEpisodesWithFiles"] = ignoreEpisodesWithFiles
+    if ignoreEpisodesWithoutFiles is not None:
+        addOptions["ignoreEpisodesWithoutFiles"] = ignoreEpisodesWithoutFiles
+    if searchForMissingEpisodes is not None:
+        addOptions["searchForMissingEpisodes"] = searchForMissingEpisodes
+    if len(addOptions) > 0:
+        newSeriesObject["addOptions"] = addOptions
+    return newSeriesObject
+
+
+def _with_query(url: str, params: dict) -> str:
+    return f'{url}?{urlencode(params)}' if params else url
+
+
+def _air_date(episode: dict) -> str:
+    return episode.get('airDateUtc') or ''
+
+
+# noinspection PyPep8Naming
+def _series_json_from_lookup(s_dict: dict, tvdbId, quality_profile, root: str) -> dict:
+    """Builds the Series object to add from a series/lookup result"""
+    series_json = {
+        'title': s_dict['title'],
+        'seasons': s_dict['seasons'],
+        'path': root + s_dict['title'],
+        'qualityProfileId': quality_profile,
+        'seasonFolder': True,
+        'monitored': True,
+        'tvdbId': tvdbId,
+        'images': s_dict['images'],
+        'titleSlug': s_dict['titleSlug'],
+        "addOptions": {
+            "ignoreEpisodesWithFiles": True,
+            "ignoreEpisodesWithoutFiles": True
+        }
+    }
+    return series_json
@@ -0,0 +1,75 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qsl, urlsplit
+
+
+class Request(object):
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _handle(self):
+        parts = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        request = Request(self.command, parts.path, dict(parse_qsl(parts.query)), self.headers, body)
+        self.server.requests.append(request)
+        route = self.server.routes.get((self.command, parts.path))
+        if route is None:
+            status, payload, headers = 404, {'message': 'NotFound'}, {}
+        else:
+            result = route(request) if callable(route) else route
+            if not isinstance(result, tuple):
+                result = (200, result)
+            status, payload = result[0], result[1]
+            headers = result[2] if len(result) > 2 else {}
+        data = b'' if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeServer(ThreadingMixIn, HTTPServer):
+    """Minimal threaded JSON server for tests.
+
+    routes maps (method, path) to either a payload or a callable(Request) returning a payload, a (status, payload)
+    or a (status, payload, headers) tuple. Every received Request is recorded in .requests.
+    """
+    daemon_threads = True
+
+    def __init__(self, routes: dict = None):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.routes = routes if routes is not None else dict()
+        self.requests = []
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def requests_to(self, path: str, method: str = 'GET') -> list:
+        return [r for r in self.requests if r.path == path and r.method == method]
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,48 @@
+import json
+from unittest import TestCase
+
+from hm_wrapper import _codec, _utils
+
+
+class _Response(object):
+    def __init__(self, content):
+        self.content = content
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class Test(TestCase):
+    def test_encode_body(self):
+        self.assertEqual(b'{"a":[1,"\xc3\xa9"]}', _codec.encode_body({'a': [1, 'é']}))
+        self.assertEqual(b'{"a": 1}', _codec.encode_body('{"a": 1}'))
+        self.assertEqual(b'[]', _codec.encode_body(b'[]'))
+
+    def test_decode(self):
+        self.assertEqual([{'id': 1}], _codec.decode(_Response(b'[{"id": 1}]')))
+        self.assertIsNone(_codec.decode(_Response(b'')))
+
+    def test_dict_to_json(self):
+        body = json.loads(_utils.dict_to_json({'name': 'Rename "x"', 'ids': [1, True, 'a']}))
+        self.assertEqual({'name': 'Rename "x"', 'ids': [1, True, 'a']}, body)
+        self.assertIsNone(_utils.dict_to_json({}))
+
+    def test_iter_array(self):
+        items = [{'id': i, 'title': f'S\u00e9rie {i}', 'ratings': {'value': 7.25}, 'n': 12345, 'ok': True}
+                 for i in range(50)]
+        data = json.dumps(items, ensure_ascii=False).encode('utf-8')
+        for size in (1, 3, 7, 4096):
+            self.assertEqual(items, list(_codec.iter_array(_chunks(data, size))))
+        self.assertEqual([{'id': 0, 'n': 12345}], list(_codec.iter_array([data], fields=['id', 'n']))[:1])
+        self.assertEqual([], list(_codec.iter_array([b' [ ] '])))
+        self.assertEqual([1, 22, 333], list(_codec.iter_array(_chunks(b'[1,22,333]', 2))))
+
+    def test_iter_array_under_key(self):
+        page = {'page': 1, 'sortKey': 'date', 'filters': [{'key': 'x'}], 'records': [{'id': 1}, {'id': 2}],
+                'totalRecords': 2}
+        data = json.dumps(page).encode('utf-8')
+        self.assertEqual([{'id': 1}, {'id': 2}], list(_codec.iter_array(_chunks(data, 5), key='records')))
+        self.assertEqual([], list(_codec.iter_array([b'{"page": 1}'], key='records')))
+        with self.assertRaises(ValueError):
+            list(_codec.iter_array([b'[{"id": 1}, {"id": 2]']))
@@ -0,0 +1,73 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest import TestCase
+
+from hm_wrapper._transport import Transport, host_key
+from hm_wrapper.sonarr import Sonarr
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.peers.add(self.client_address)
+        self.server.api_keys.add(self.headers.get('X-Api-Key'))
+        body = b'[]'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.server = _Server(('127.0.0.1', 0), _Handler)
+        self.server.peers = set()
+        self.server.api_keys = set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_host_key(self):
+        self.assertEqual('http://example.com:8989', host_key('HTTP://Example.com:8989/api/series?x=1'))
+
+    def test_connection_reused(self):
+        s = Sonarr(self.url, 'key')
+        for _ in range(5):
+            self.assertEqual([], s.get_series())
+        s.close()
+        self.assertEqual(1, len(self.server.peers))
+        self.assertEqual({'key'}, self.server.api_keys)
+
+    def test_threads_share_pool(self):
+        transport = Transport('key', pool_size=2)
+        errors = []
+
+        def work():
+            try:
+                for _ in range(10):
+                    transport.request('GET', self.url + '/api/series').raise_for_status()
+            except Exception as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        transport.close()
+        self.assertEqual([], errors)
+        self.assertLessEqual(len(self.server.peers), 2)
@@ -11,3 +11,30 @@ class Test(TestCase):
         self.assertEqual(c1, t1)
         self.assertEqual(c1, t2)
 
+    def test_parse_date_input_formats(self):
+        c1 = _datetime.datetime(2020, 1, 27, 0).isoformat()
+        for text in ('27/01/2020', '27-1-20', '2020-01-27', '2020/1/27'):
+            self.assertEqual(c1, _utils.parse_date_input(text))
+        self.assertEqual('2019-01-02T00:00:00', _utils.parse_date_input('1/2/19'))
+        self.assertEqual('1999-01-02T00:00:00', _utils.parse_date_input('1/2/99'))
+        for text in ('02/30/20', '2020-13-01', '1/2', '01/27-2020', 20200127):
+            with self.assertRaises(TypeError):
+                _utils.parse_date_input(text)
+
+    def test_parse_date_input_objects(self):
+        self.assertEqual('2020-01-27T10:11:12', _utils.parse_date_input(_datetime.datetime(2020, 1, 27, 10, 11, 12, 5)))
+        self.assertEqual('2020-01-27', _utils.parse_date_input(_datetime.date(2020, 1, 27)))
+
+    def test_parse_date_inputs(self):
+        # the order 13/01/20 was read in is kept for the ambiguous dates after it, a 4 digit year does not change it
+        self.assertEqual(['2020-01-13T00:00:00', '2020-05-06T00:00:00', '2020-02-01T00:00:00', '2020-01-01'],
+                         _utils.parse_date_inputs(['13/01/20', '2020-05-06', '01/02/20', _datetime.date(2020, 1, 1)]))
+        self.assertEqual(['2020-01-02T00:00:00'], _utils.parse_date_inputs(['01/02/20']))
+
+    def test_date_windows(self):
+        d = _datetime.date
+        self.assertEqual([(d(2020, 1, 1), d(2020, 1, 15)), (d(2020, 1, 15), d(2020, 1, 20))],
+                         _utils.date_windows('2020-01-01', d(2020, 1, 20), 14))
+        self.assertEqual([(d(2020, 1, 1), d(2020, 1, 1))], _utils.date_windows('2020-01-01', '2020-01-01'))
+        with self.assertRaises(ValueError):
+            _utils.date_windows('2020-01-02', '2020-01-01')
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest import TestCase, skipUnless
+
+from hm_wrapper import aio
+from hm_wrapper.resilience import CircuitBreaker
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.peak = max(self.server.peak, self.server.in_flight)
+        time.sleep(0.02)
+        body = json.dumps([{'id': 1, 'path': self.path}]).encode()
+        with self.server.lock:
+            self.server.in_flight -= 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@skipUnless(aio.aiohttp is not None, 'aiohttp is not installed')
+class Test(TestCase):
+    def setUp(self):
+        self.server = _Server(('127.0.0.1', 0), _Handler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = 0
+        self.server.peak = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_concurrency_is_bounded(self):
+        async def run():
+            async with aio.AsyncSonarr(self.url, 'key', concurrency=3) as sonarr:
+                return await asyncio.gather(*(sonarr.get_episodes_by_series_id(i) for i in range(12)))
+
+        results = asyncio.run(run())
+        self.assertEqual('/api/episode?seriesId=5', results[5][0]['path'])
+        self.assertLessEqual(self.server.peak, 3)
+
+    def test_cancelled_probe_is_released(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.failure(self.url)
+
+        async def run():
+            async with aio.AsyncTransport('key', retry=None, circuit_breaker=breaker) as transport:
+                await asyncio.sleep(0.06)
+                # the probe is cancelled while the server is still answering
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(transport.request('GET', self.url + '/api/series'), 0.005)
+                self.assertEqual('half-open', breaker.state(self.url))
+                return await transport.request('GET', self.url + '/api/series')
+
+        self.assertEqual(200, asyncio.run(run()).status_code)
+        self.assertEqual('closed', breaker.state(self.url))
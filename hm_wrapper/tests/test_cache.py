@@ -0,0 +1,118 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from hm_wrapper.cache import LookupCache, ResponseCache
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+def _profiles(request):
+    if request.headers.get('If-None-Match') == '"v1"':
+        return 304, None, {'ETag': '"v1"'}
+    return 200, [{'id': 1, 'name': 'HD'}], {'ETag': '"v1"'}
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.server = FakeServer({
+            ('GET', '/api/profile'): _profiles,
+            ('GET', '/api/series'): [{'id': 1}],
+            ('GET', '/api/rootfolder'): [{'path': '/tv/'}],
+            ('PUT', '/api/series'): {'id': 1},
+            ('GET', '/api/series/lookup'): lambda request: [{'title': request.query['term']}],
+        })
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.close()
+        self.tmp.cleanup()
+
+    def test_fresh_hit_and_copy(self):
+        sonarr = Sonarr(self.server.url, 'key', cache=ResponseCache())
+        first = sonarr.get_series()
+        first[0]['id'] = 99
+        self.assertEqual([{'id': 1}], sonarr.get_series())
+        self.assertEqual(1, len(self.server.requests_to('/api/series')))
+
+    def test_conditional_revalidation(self):
+        sonarr = Sonarr(self.server.url, 'key', cache=ResponseCache(ttls={'profile': 0.0001}))
+        self.assertEqual('HD', sonarr.get_quality_profiles()[0]['name'])
+        time.sleep(0.01)
+        self.assertEqual('HD', sonarr.get_quality_profiles()[0]['name'])
+        self.assertEqual(1, sonarr.cache.revalidations)
+        self.assertEqual('"v1"', self.server.requests_to('/api/profile')[1].headers['If-None-Match'])
+
+    def test_invalidate_after_update(self):
+        sonarr = Sonarr(self.server.url, 'key', cache=ResponseCache())
+        sonarr.get_series()
+        sonarr.get_root_folder()
+        sonarr.upd_series(json.dumps({'id': 1}))
+        sonarr.get_series()
+        sonarr.get_root_folder()
+        self.assertEqual(2, len(self.server.requests_to('/api/series')))
+        self.assertEqual(1, len(self.server.requests_to('/api/rootfolder')))
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        sonarr = Sonarr(self.server.url, 'key', cache=cache)
+        sonarr.get_series()
+        sonarr.get_root_folder()
+        sonarr.get_series()
+        sonarr.get_quality_profiles()
+        self.assertEqual(2, len(cache))
+        sonarr.get_series()
+        sonarr.get_root_folder()
+        self.assertEqual(1, len(self.server.requests_to('/api/series')))
+        self.assertEqual(2, len(self.server.requests_to('/api/rootfolder')))
+
+    def test_lookup_cache_persists(self):
+        path = os.path.join(self.tmp.name, 'lookups.sqlite3')
+        first = Sonarr(self.server.url, 'key', lookup_cache=LookupCache(path))
+        self.assertEqual('Brady Bunch', first.lookup_series('Brady Bunch')[0]['title'])
+        second = Sonarr(self.server.url, 'key', lookup_cache=LookupCache(path))
+        self.assertEqual('Brady Bunch', second.lookup_series('brady   bunch ')[0]['title'])
+        self.assertEqual(1, len(self.server.requests_to('/api/series/lookup')))
+        self.assertEqual({'hits': 1, 'misses': 0, 'entries': 1}, second.lookup_cache.stats())
+        self.assertEqual(1, first.lookup_cache.misses)
+
+    def test_lookup_cache_ttl_and_eviction(self):
+        cache = LookupCache(os.path.join(self.tmp.name, 'lookups.sqlite3'), ttl=60, max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+        cache.ttl = -1
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(1, cache.stats()['entries'])
+
+    def test_lookup_cache_batched_eviction(self):
+        cache = LookupCache(os.path.join(self.tmp.name, 'lookups.sqlite3'), max_entries=1000)
+        for i in range(1009):
+            cache.put(str(i), i)
+        # checked every 10th insert
+        self.assertEqual(1009, cache.stats()['entries'])
+        cache.put('1009', 1009)
+        self.assertEqual(1000, cache.stats()['entries'])
+        self.assertIsNone(cache.get('0'))
+        self.assertEqual(1009, cache.get('1009'))
+
+    def test_lookup_cache_close_all_threads(self):
+        cache = LookupCache(os.path.join(self.tmp.name, 'lookups.sqlite3'))
+        thread = threading.Thread(target=cache.put, args=('a', 1))
+        thread.start()
+        thread.join()
+        connections = list(cache._connections)
+        self.assertEqual(2, len(connections))
+        cache.close()
+        for conn in connections:
+            self.assertRaises(sqlite3.ProgrammingError, conn.execute, 'SELECT 1')
+        # still usable afterwards
+        self.assertEqual(1, cache.get('a'))
+        cache.close()
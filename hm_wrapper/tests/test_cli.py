@@ -0,0 +1,52 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+from hm_wrapper import cli
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.states = iter(('started', 'completed'))
+        self.server = FakeServer({
+            ('POST', '/api/command'): lambda request: (201, dict(request.json(), id=7, status='queued')),
+            ('GET', '/api/command/7'): lambda request: {'id': 7, 'status': next(self.states)},
+            ('GET', '/api/movie'): [{'id': 1, 'title': 'Movie 1'}],
+        })
+
+    def tearDown(self):
+        self.server.close()
+
+    def _main(self, *argv) -> tuple:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = cli.main(list(argv))
+        return status, json.loads(out.getvalue())
+
+    def test_get(self):
+        status, movies = self._main('radarr', '--url', self.server.url, '--api-key', 'key', 'get', 'movies')
+        self.assertEqual((0, [{'id': 1, 'title': 'Movie 1'}]), (status, movies))
+
+    def test_command_and_wait(self):
+        status, command = self._main('sonarr', '--url', self.server.url, '--api-key', 'key', 'command',
+                                     'downloaded-episodes-scan', '--path', '/downloads/Show.S01E01', '--wait', '5')
+        self.assertEqual((0, 'completed'), (status, command['status']))
+        body = self.server.requests_to('/api/command', 'POST')[0].json()
+        self.assertEqual({'name': 'DownloadedEpisodesScan', 'path': '/downloads/Show.S01E01'}, body)
+
+    def test_entry_point(self):
+        # the package alone does not import requests; the configuration comes from the environment
+        code = 'import sys, hm_wrapper; print("requests" in sys.modules, hm_wrapper.sonarr.__name__)'
+        out = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, universal_newlines=True, check=True)
+        self.assertEqual('False hm_wrapper.sonarr', out.stdout.strip())
+
+        env = dict(os.environ, SONARR_URL=self.server.url, SONARR_API_KEY='key')
+        out = subprocess.run([sys.executable, '-m', 'hm_wrapper', 'sonarr', '--compact', 'command', 'rss-sync'],
+                             stdout=subprocess.PIPE, universal_newlines=True, env=env)
+        self.assertEqual(0, out.returncode)
+        self.assertEqual({'name': 'RssSync', 'id': 7, 'status': 'queued'}, json.loads(out.stdout))
@@ -0,0 +1,92 @@
+import tempfile
+from unittest import TestCase, skipUnless
+
+from hm_wrapper import columnar
+from hm_wrapper.radarr import Radarr
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+def _episodes(request):
+    series_id = int(request.query['seriesId'])
+    # episode 3 has not aired yet, episode 2 is missing
+    return [{'id': series_id * 10 + n, 'seriesId': series_id, 'seasonNumber': 1, 'episodeNumber': n,
+             'monitored': True, 'hasFile': n == 1, 'episodeFileId': series_id * 10 + n if n == 1 else 0,
+             'airDateUtc': '2099-01-01T00:00:00Z' if n == 3 else f'2019-0{n}-01T02:00:00Z'} for n in range(1, 4)]
+
+
+def _episode_files(request):
+    series_id = int(request.query['seriesId'])
+    quality = 'Bluray-1080p' if series_id == 1 else 'HDTV-720p'
+    return [{'id': series_id * 10 + 1, 'size': 1000 * series_id, 'dateAdded': f'2019-0{series_id}-15T00:00:00Z',
+             'quality': {'quality': {'name': quality}}}]
+
+
+@skipUnless(columnar.np is not None, 'numpy is not installed')
+class Test(TestCase):
+    def setUp(self):
+        self.server = FakeServer({
+            ('GET', '/api/series'): [{'id': i, 'title': f'Series {i}', 'status': 'continuing', 'monitored': True,
+                                      'sizeOnDisk': 1000 * i, 'added': '2019-01-01T00:00:00Z'} for i in (1, 2)],
+            ('GET', '/api/episode'): _episodes,
+            ('GET', '/api/episodefile'): _episode_files,
+            ('GET', '/api/movie'): [
+                {'id': 1, 'title': 'Movie 1', 'sizeOnDisk': 500, 'added': '2019-01-02T00:00:00Z', 'hasFile': True,
+                 'movieFile': {'quality': {'quality': {'name': 'Bluray-1080p'}}}},
+                {'id': 2, 'title': 'Movie 2', 'sizeOnDisk': 0, 'added': '2019-03-02T00:00:00Z', 'hasFile': False}],
+        })
+        self.sonarr = Sonarr(self.server.url, 'key')
+        self.radarr = Radarr(self.server.url, 'key')
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        self.sonarr.close()
+        self.radarr.close()
+        self.server.close()
+
+    def test_export_and_reports(self):
+        columnar.export_library(self.directory.name, sonarr=self.sonarr, radarr=self.radarr, max_workers=2)
+        library = columnar.open_library(self.directory.name)
+        self.assertEqual(['episode_files', 'episodes', 'movies', 'series'], sorted(library))
+        self.assertEqual(6, len(library['episodes']))
+        self.assertEqual(['Series 1', 'Series 2'], sorted(library['series']['title'].tolist()))
+        self.assertIsInstance(library['episodes']['seriesId'], columnar.np.memmap)
+
+        self.assertEqual({'HDTV-720p': 2000, 'Bluray-1080p': 1000}, columnar.size_by_quality(library['episode_files']))
+        self.assertEqual({'Bluray-1080p': 500}, columnar.size_by_quality(library['movies'], 'sizeOnDisk'))
+        self.assertEqual([None, 'Bluray-1080p'], sorted(library['movies'].labels('quality').tolist(), key=bool))
+
+        # the unaired episodes are not missing
+        missing = columnar.missing_by_series(library['episodes'])
+        self.assertEqual([{'seriesId': 1, 'episodes': 2, 'missing': 1, 'percentMissing': 50.0},
+                          {'seriesId': 2, 'episodes': 2, 'missing': 1, 'percentMissing': 50.0}],
+                         missing.to_records())
+
+        growth = columnar.growth(library['movies'], 'added', 'sizeOnDisk')
+        self.assertEqual(['2019-01', '2019-03'], [str(p) for p in growth['period']])
+        self.assertEqual([1, 2], growth['cumulativeCount'].tolist())
+        self.assertEqual([500, 500], growth['cumulativeBytes'].tolist())
+
+    def test_episode_files_from_episodefile(self):
+        # episodes 1 and 2 are one double-episode file, file 19 belongs to no episode; series 2 fails
+        def episodes(request):
+            if request.query['seriesId'] == '2':
+                return 500, {'message': 'boom'}
+            return [{'id': n, 'seriesId': 1, 'hasFile': True, 'episodeFileId': 11} for n in (1, 2)]
+
+        self.server.routes[('GET', '/api/episode')] = episodes
+        self.server.routes[('GET', '/api/episodefile')] = lambda request: [
+            {'id': 11, 'size': 1000, 'quality': {'quality': {'name': 'Bluray-1080p'}}},
+            {'id': 19, 'size': 50, 'quality': {'quality': {'name': 'SDTV'}}}]
+        tables = columnar.export_library(self.directory.name, sonarr=self.sonarr, max_workers=2)
+        self.assertEqual([1, 2], sorted(tables['episodes']['id'].tolist()))
+        self.assertEqual([(11, 1), (19, 1)], [(r['id'], r['seriesId']) for r in tables['episode_files'].to_records()])
+        self.assertEqual({'Bluray-1080p': 1000, 'SDTV': 50}, columnar.size_by_quality(tables['episode_files']))
+
+    def test_missing_fields(self):
+        table = columnar.Table.from_records([{'id': 1}, {'id': 2, 'status': 'ended'}], columnar.SERIES_COLUMNS)
+        self.assertEqual([-1, 0], table['status'].tolist())
+        self.assertTrue(columnar.np.isnat(table['added']).all())
+        self.assertEqual([{'id': 2, 'status': 'ended'}],
+                         [{k: r[k] for k in ('id', 'status')} for r in table.filter(table['id'] > 1).to_records()])
@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+from hm_wrapper.commands import UNKNOWN_STATE, wait_all
+from hm_wrapper.exceptions import CommandTimeoutError
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.polls = 0
+
+        def listed(request):
+            self.polls += 1
+            state = 'completed' if self.polls >= 3 else 'started'
+            return [{'id': 1, 'name': 'RefreshSeries', 'status': state},
+                    {'id': 2, 'name': 'RssSync', 'status': 'started'}]
+
+        self.server = FakeServer({
+            ('GET', '/api/command'): listed,
+            ('GET', '/api/command/3'): {'id': 3, 'name': 'Backup', 'status': 'completed'},
+            ('GET', '/api/command/4'): {},
+        })
+        self.sonarr = Sonarr(self.server.url, 'key')
+
+    def tearDown(self):
+        self.sonarr.close()
+        self.server.close()
+
+    def test_wait_all_polls_list_once_per_tick(self):
+        finished = []
+        handles = [self.sonarr.track_command({'id': 1, 'status': 'queued'}), self.sonarr.track_command(3)]
+        wait_all(handles, timeout=5, min_interval=0.01, callback=lambda h: finished.append(h.id))
+        self.assertTrue(all(h.succeeded for h in handles))
+        self.assertEqual([3, 1], finished)
+        self.assertEqual(3, self.polls)
+        self.assertEqual(1, len(self.server.requests_to('/api/command/3')))
+
+    def test_timeout(self):
+        handle = self.sonarr.track_command(2)
+        with self.assertRaises(CommandTimeoutError) as ctx:
+            handle.wait(timeout=0.05, min_interval=0.01)
+        self.assertEqual([handle], ctx.exception.pending)
+        self.assertEqual('started', handle.state)
+
+    def test_purged_command_finishes(self):
+        # 5 is neither listed nor known (404), 4 comes back without its id
+        finished = []
+        handles = [self.sonarr.track_command({'id': 5, 'name': 'Backup', 'status': 'queued'}),
+                   self.sonarr.track_command(4)]
+        wait_all(handles, min_interval=0.01, callback=lambda h: finished.append(h.id))
+        self.assertEqual([UNKNOWN_STATE] * 2, [h.state for h in handles])
+        self.assertEqual([5, 4], finished)
+        self.assertEqual('Backup', handles[0].name)
+        self.assertFalse(any(h.succeeded for h in handles))
+        self.assertEqual(1, self.polls)
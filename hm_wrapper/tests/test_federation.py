@@ -0,0 +1,78 @@
+import time
+from unittest import TestCase
+
+from hm_wrapper._transport import Transport
+from hm_wrapper.exceptions import InstanceTimeoutError, NoRouteError
+from hm_wrapper.federation import Federation, Tagged
+from hm_wrapper.radarr import Radarr
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+def _slow(payload):
+    def route(request):
+        time.sleep(0.5)
+        return payload
+    return route
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.hd = FakeServer({
+            ('GET', '/api/queue'): [{'id': 1, 'title': 'HD download'}],
+            ('GET', '/api/calendar'): [{'id': 11, 'airDateUtc': '2020-01-03T02:00:00Z'}],
+            ('POST', '/api/series'): lambda request: (201, dict(request.json(), id=5)),
+        })
+        self.anime = FakeServer({
+            ('GET', '/api/queue'): [{'id': 1, 'title': 'Anime download'}, {'id': 2, 'title': 'Anime 2'}],
+            ('GET', '/api/calendar'): [{'id': 12, 'airDateUtc': '2020-01-02T02:00:00Z'}],
+            ('POST', '/api/series'): lambda request: (201, dict(request.json(), id=9)),
+        })
+        self.movies = FakeServer({
+            ('GET', '/api/queue'): _slow([{'id': 1, 'title': 'Movie download'}]),
+            ('GET', '/api/calendar'): [{'id': 21, 'inCinemas': '2020-01-01T00:00:00Z'}],
+        })
+        self.fed = Federation(
+            {name: client(server.url, 'key', transport=Transport('key', retry=None))
+             for name, client, server in (('hd', Sonarr, self.hd), ('anime', Sonarr, self.anime),
+                                          ('movies', Radarr, self.movies))},
+            timeout={'movies': 0.1}, rules=[({'seriesType': 'anime'}, 'anime')], default='hd')
+
+    def tearDown(self):
+        self.fed.close()
+        for server in (self.hd, self.anime, self.movies):
+            server.close()
+
+    def test_gather_with_timeout(self):
+        queue = self.fed.get_queue()
+        self.assertEqual([('hd', 'HD download'), ('anime', 'Anime download'), ('anime', 'Anime 2')],
+                         [(item.instance, item.value['title']) for item in queue])
+        self.assertFalse(queue.ok)
+        self.assertIsInstance(queue.errors['movies'], InstanceTimeoutError)
+        self.assertEqual(['hd', 'anime'], list(queue.by_instance()))
+
+        # later calls run on the same worker threads
+        pool = self.fed._pool
+        self.assertEqual(3, len(self.fed.get_calendar().values()))
+        self.assertIs(pool, self.fed._pool)
+
+    def test_calendar_in_date_order(self):
+        calendar = self.fed.get_calendar('2020-01-01', '2020-01-05')
+        self.assertTrue(calendar.ok)
+        self.assertEqual([21, 12, 11], [entry['id'] for entry in calendar.values()])
+
+    def test_call_skips_instances_without_the_method(self):
+        results = self.fed.call('get_series_by_series_id', 1)
+        self.assertEqual(['hd', 'anime'], [r.instance for r in results])
+
+    def test_write_routing(self):
+        self.assertEqual(9, self.fed.write('add_series_from_json', {'title': 'A', 'seriesType': 'anime'})['id'])
+        self.assertEqual(5, self.fed.write('add_series_from_json', {'title': 'B', 'seriesType': 'standard'})['id'])
+        self.assertEqual('anime', self.fed.route(Tagged('anime', {'seriesType': 'standard'})))
+        self.assertEqual(1, len(self.anime.requests_to('/api/series', 'POST')))
+
+        strict = Federation(self.fed.instances, rules=[(lambda s: s.get('year', 0) > 2000, 'hd')])
+        with self.assertRaises(NoRouteError):
+            strict.route({'year': 1990})
+        with self.assertRaises(ValueError):
+            Federation(self.fed.instances, default='missing')
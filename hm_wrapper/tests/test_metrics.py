@@ -0,0 +1,77 @@
+from unittest import TestCase
+
+import requests
+
+from hm_wrapper._transport import Transport
+from hm_wrapper.metrics import DecodeSample, Metrics, RequestSample, endpoint_template
+from hm_wrapper.resilience import RetryPolicy
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.statuses = []
+        self.server = FakeServer({
+            ('GET', '/api/series'): [{'id': 1, 'title': 'Show'}, {'id': 2, 'title': 'Other'}],
+            ('GET', '/api/series/1'): {'id': 1, 'title': 'Show'},
+            ('GET', '/api/series/2'): {'id': 2, 'title': 'Other'},
+            ('GET', '/api/system/status'): lambda request: (self.statuses.pop(0) if self.statuses else 200, {}),
+        })
+        self.metrics = Metrics()
+        self.sonarr = Sonarr(self.server.url, 'key', metrics=self.metrics,
+                             transport=Transport('key', retry=RetryPolicy(backoff=0.01), circuit_breaker=None))
+
+    def tearDown(self):
+        self.sonarr.close()
+        self.server.close()
+
+    def test_endpoint_template(self):
+        self.assertEqual('series/{id}', endpoint_template('http://h:8989/api/series/12?apikey=x'))
+        self.assertEqual('series', endpoint_template('http://h:8989/sonarr/api/series'))
+        self.assertEqual('movie/{id}', endpoint_template('http://h/api/v3/movie/7/'))
+        self.assertEqual('movie/lookup/imdb', endpoint_template('http://h/api/movie/lookup/imdb?imdbId=tt1'))
+
+    def test_records_requests(self):
+        samples = []
+        self.metrics.add_hook(samples.append)
+        self.sonarr.get_series()
+        self.sonarr.get_series_by_series_id(1)
+        self.sonarr.get_series_by_series_id(2)
+        self.statuses = [503]
+        self.sonarr.get_system_status()
+
+        rows = {(row['method'], row['endpoint']): row for row in self.metrics.summary()}
+        self.assertEqual({('GET', 'series'), ('GET', 'series/{id}'), ('GET', 'system/status')}, set(rows))
+        self.assertEqual(2, rows['GET', 'series/{id}']['count'])
+        self.assertEqual({200: 2}, rows['GET', 'series/{id}']['statuses'])
+        self.assertEqual(1, rows['GET', 'system/status']['retries'])
+        self.assertGreater(rows['GET', 'series']['bytes'], 0)
+        self.assertGreater(rows['GET', 'series']['decode_seconds'], 0)
+
+        requests_ = [s for s in samples if isinstance(s, RequestSample)]
+        self.assertEqual(4, len(requests_))
+        self.assertEqual(self.server.url.lower(), requests_[0].host)
+        self.assertEqual(4, len([s for s in samples if isinstance(s, DecodeSample)]))
+
+    def test_failing_hook_does_not_break_requests(self):
+        self.metrics.add_hook(lambda sample: 1 / 0)
+        with self.assertLogs('hm_wrapper.metrics', 'ERROR'):
+            self.assertEqual(2, len(self.sonarr.get_series()))
+
+    def test_prometheus_page(self):
+        self.sonarr.get_series_by_series_id(1)
+        server = self.metrics.start_http_server()
+        try:
+            host, port = server.server_address[:2]
+            page = requests.get(f'http://{host}:{port}/metrics', timeout=5).text
+        finally:
+            server.shutdown()
+            server.server_close()
+        labels = f'host="{self.server.url.lower()}",method="GET",endpoint="series/{{id}}"'
+        self.assertIn('# TYPE hm_wrapper_request_duration_seconds histogram', page)
+        self.assertIn(f'hm_wrapper_request_duration_seconds_count{{{labels}}} 1', page)
+        self.assertIn(f'hm_wrapper_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', page)
+        self.assertIn(f'hm_wrapper_decode_duration_seconds_count{{{labels}}} 1', page)
+        self.assertIn(f'hm_wrapper_requests_total{{{labels},status="200"}} 1', page)
+        self.assertIn(f'hm_wrapper_retries_total{{{labels}}} 0', page)
@@ -0,0 +1,62 @@
+import json
+from unittest import TestCase
+
+from hm_wrapper.mirror import SeriesMirror
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.library = {i: {'id': i, 'tvdbId': 100 + i, 'titleSlug': f'show-{i}', 'path': f'/tv/Show {i}/',
+                            'lastInfoSync': '2020-01-01T00:00:00Z'} for i in range(1, 4)}
+
+        def one(request):
+            series_id = int(request.path.rsplit('/', 1)[1])
+            if series_id not in self.library:
+                return 404, {'message': 'NotFound'}
+            return self.library[series_id]
+
+        def update(request):
+            series = request.json()
+            self.library[series['id']] = series
+            return 202, series
+
+        routes = {
+            ('GET', '/api/series'): lambda request: list(self.library.values()),
+            ('PUT', '/api/series'): update,
+        }
+        for i in range(1, 4):
+            routes[('GET', f'/api/series/{i}')] = one
+            routes[('DELETE', f'/api/series/{i}')] = lambda request: {}
+        self.server = FakeServer(routes)
+        self.sonarr = Sonarr(self.server.url, 'key')
+        self.mirror = SeriesMirror(self.sonarr)
+
+    def tearDown(self):
+        self.sonarr.close()
+        self.server.close()
+
+    def test_indexes(self):
+        self.assertEqual(3, len(self.mirror))
+        self.assertEqual(2, self.mirror.by_tvdb_id(102)['id'])
+        self.assertEqual(3, self.mirror.by_path('/tv/Show 3')['id'])
+        self.assertEqual(1, self.mirror.by_title_slug('SHOW-1')['id'])
+        self.assertIsNone(self.mirror.by_tvdb_id(999))
+
+    def test_mutations_refetch_single_records(self):
+        changed = dict(self.library[2], path='/tv/Moved/', lastInfoSync='2020-02-01T00:00:00Z')
+        self.sonarr.upd_series(json.dumps(changed))
+        self.library.pop(3)
+        self.sonarr.rem_series(3)
+        self.assertEqual(2, self.mirror.by_path('/tv/Moved')['id'])
+        self.assertIsNone(self.mirror.by_path('/tv/Show 2'))
+        self.assertNotIn(3, self.mirror)
+        self.assertEqual(1, len(self.server.requests_to('/api/series')))
+
+    def test_refresh_reindexes_changes(self):
+        self.library[4] = {'id': 4, 'tvdbId': 104, 'titleSlug': 'show-4', 'path': '/tv/Show 4'}
+        del self.library[1]
+        self.assertEqual(2, self.mirror.refresh())
+        self.assertEqual(4, self.mirror.by_tvdb_id(104)['id'])
+        self.assertIsNone(self.mirror.by_tvdb_id(101))
@@ -0,0 +1,61 @@
+import pickle
+from unittest import TestCase
+
+from hm_wrapper import _codec
+from hm_wrapper.models import Series, QueueItem
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+SERIES = {'id': 1, 'title': 'Show', 'tvdbId': 70001, 'monitored': True,
+          'seasons': [{'seasonNumber': 1, 'monitored': True}], 'ratings': {'votes': 3, 'value': 8.5},
+          'someNewField': 'kept'}
+
+
+class Test(TestCase):
+    def test_round_trip(self):
+        series = Series(SERIES)
+        self.assertEqual(SERIES, series.to_dict())
+        self.assertEqual(set(SERIES), set(series.keys()))
+        self.assertEqual(series, SERIES)
+        self.assertEqual(SERIES, pickle.loads(pickle.dumps(series)).to_dict())
+        self.assertEqual(SERIES, _codec.loads(_codec.encode_body(series)))
+
+    def test_nested_fields_decode_lazily(self):
+        series = Series(SERIES)
+        self.assertIsInstance(object.__getattribute__(series, '_lazy_seasons'), bytes)
+        self.assertEqual(1, series.seasons[0]['seasonNumber'])
+        series.seasons[0]['monitored'] = False
+        self.assertFalse(series['seasons'][0]['monitored'])
+        self.assertFalse(series.to_dict()['seasons'][0]['monitored'])
+
+    def test_attribute_access(self):
+        series = Series(SERIES)
+        self.assertEqual(70001, series.tvdbId)
+        self.assertIsNone(series.imdbId)
+        self.assertIsNone(series.images)
+        self.assertNotIn('imdbId', series)
+        self.assertEqual('kept', series.someNewField)
+        with self.assertRaises(KeyError):
+            series['imdbId']
+        with self.assertRaises(AttributeError):
+            series.unknown
+        series['monitored'] = False
+        series['other'] = 1
+        self.assertEqual({'monitored': False, 'other': 1}, {k: series[k] for k in ('monitored', 'other')})
+        self.assertFalse(hasattr(series, '__dict__'))
+
+    def test_typed_client_calls(self):
+        server = FakeServer({('GET', '/api/series'): [SERIES],
+                             ('GET', '/api/queue'): [{'id': 5, 'title': 'x', 'episode': {'id': 9}}]})
+        sonarr = Sonarr(server.url, 'key')
+        try:
+            self.assertEqual([SERIES], sonarr.get_series())
+            series = sonarr.get_series(typed=True)
+            self.assertIsInstance(series[0], Series)
+            self.assertEqual(SERIES, series[0].to_dict())
+            queue = sonarr.get_queue(typed=True)
+            self.assertIsInstance(queue[0], QueueItem)
+            self.assertEqual(9, queue[0].episode['id'])
+        finally:
+            sonarr.close()
+            server.close()
@@ -0,0 +1,100 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from unittest import TestCase, mock
+
+from hm_wrapper._transport import PROXY_ENV, Transport
+from hm_wrapper.proxy import CachingProxy, ProxyTransport
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+def _slow_queue(request):
+    time.sleep(0.2)
+    return [{'id': 1, 'status': 'Downloading'}]
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.series = [{'id': 1, 'title': 'Series 1'}]
+        self.server = FakeServer({
+            ('GET', '/api/series'): lambda request: self.series,
+            ('PUT', '/api/series'): lambda request: request.json(),
+            ('GET', '/api/queue'): _slow_queue,
+            ('GET', '/api/rootfolder'): (401, {'error': 'Unauthorized'}),
+        })
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.directory.name, 'hm.sock')
+        self.proxy = CachingProxy(self.socket_path).start()
+        # two processes' clients
+        self.clients = [Sonarr(self.server.url, 'key', transport=ProxyTransport(self.socket_path, 'key'))
+                        for _ in range(2)]
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        self.proxy.close()
+        self.server.close()
+        self.directory.cleanup()
+
+    def test_shared_cache(self):
+        first, second = self.clients
+        self.assertEqual(self.series, first.get_series())
+        self.assertEqual(self.series, second.get_series())
+        self.assertEqual(1, len(self.server.requests_to('/api/series')))
+        self.assertEqual('key', self.server.requests_to('/api/series')[0].headers['X-Api-Key'])
+
+        # a write goes through and drops the cached listing
+        first.upd_series({'id': 1, 'title': 'Renamed'})
+        self.series = [{'id': 1, 'title': 'Renamed'}]
+        self.assertEqual(self.series, second.get_series())
+        self.assertEqual(2, len(self.server.requests_to('/api/series', 'GET')))
+
+        # another API key does not see these responses
+        other = Sonarr(self.server.url, 'other', transport=ProxyTransport(self.socket_path, 'other'))
+        self.clients.append(other)
+        other.get_series()
+        self.assertEqual(3, len(self.server.requests_to('/api/series', 'GET')))
+
+    def test_hits_are_served_as_received(self):
+        transport = self.clients[0].transport
+        contents = [transport.request('GET', f'{self.server.url}/api/series').content for _ in range(2)]
+        self.assertEqual([json.dumps(self.series).encode()] * 2, contents)
+        self.assertEqual(1, self.proxy.stats['hits'])
+
+    def test_concurrent_requests_are_collapsed(self):
+        threads = [threading.Thread(target=self.clients[i % 2].get_queue) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(self.server.requests_to('/api/queue')))
+        self.assertEqual(5, self.proxy.stats['collapsed'])
+
+    def test_errors_are_passed_through(self):
+        res = self.clients[0].transport.request('GET', f'{self.server.url}/api/rootfolder')
+        self.assertEqual((401, {'error': 'Unauthorized'}), (res.status_code, res.json()))
+
+    def test_transport_from_environment(self):
+        with mock.patch.dict(os.environ, {PROXY_ENV: self.socket_path}):
+            self.clients.append(Sonarr(self.server.url, 'key'))
+        self.assertIsInstance(self.clients[-1].transport, ProxyTransport)
+        self.assertEqual(self.series, self.clients[-1].get_series())
+
+        # no daemon at the socket: connect directly
+        with mock.patch.dict(os.environ, {PROXY_ENV: os.path.join(self.directory.name, 'missing.sock')}):
+            self.clients.append(Sonarr(self.server.url, 'key'))
+        self.assertIs(Transport, type(self.clients[-1].transport))
+
+        # nor at a socket left behind by a daemon that was killed
+        stale_path = os.path.join(self.directory.name, 'stale.sock')
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(stale_path)
+        stale.close()
+        with mock.patch.dict(os.environ, {PROXY_ENV: stale_path}):
+            self.clients.append(Sonarr(self.server.url, 'key'))
+        self.assertIs(Transport, type(self.clients[-1].transport))
+        self.assertEqual(self.series, self.clients[-1].get_series())
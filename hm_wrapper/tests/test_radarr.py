@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+from hm_wrapper.radarr import Radarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+def _history(request):
+    # a record was added after the first page was fetched: the later pages have moved by one
+    page, page_size = int(request.query['page']), int(request.query['pageSize'])
+    records = [{'id': i} for i in range(11 if page == 1 else 12, 0, -1)][(page - 1) * page_size:page * page_size]
+    return {'page': page, 'pageSize': page_size, 'totalRecords': 11 if page == 1 else 12, 'records': records}
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.server = FakeServer({
+            ('GET', '/api/movie'): [{'id': i, 'title': f'Movie {i}', 'monitored': True} for i in range(1, 4)],
+            ('PUT', '/api/movie'): lambda request: request.json(),
+            ('DELETE', '/api/movie/editor'): lambda request: (200, None),
+            ('DELETE', '/api/queue/bulk'): (405, None),
+            ('DELETE', '/api/queue/7'): {},
+            ('DELETE', '/api/queue/8'): {},
+            ('GET', '/api/history'): _history,
+            ('GET', '/api/wanted/cutoff'): [],
+        })
+        self.radarr = Radarr(self.server.url, 'key')
+
+    def tearDown(self):
+        self.radarr.close()
+        self.server.close()
+
+    def test_update_movie(self):
+        movie = dict(self.radarr.get_movie()[0], monitored=False)
+        self.assertEqual(movie, self.radarr.update_movie(movie))
+
+    def test_update_movies_without_editor(self):
+        movies = self.radarr.get_movie()
+        results = self.radarr.update_movies(movies[:2], {'qualityProfileId': 4})
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual({4}, {r.json()['qualityProfileId'] for r in self.server.requests_to('/api/movie', 'PUT')})
+
+    def test_delete_movies(self):
+        results = self.radarr.delete_movies([1, 2, 3], delete_files=True, chunk_size=2)
+        self.assertEqual([1, 2, 3], [r.key for r in results if r.ok])
+        bodies = [r.json() for r in self.server.requests_to('/api/movie/editor', 'DELETE')]
+        self.assertEqual([[1, 2], [3]], sorted(b['movieIds'] for b in bodies))
+        self.assertTrue(bodies[0]['deleteFiles'])
+
+    def test_delete_queue_items(self):
+        results = self.radarr.delete_queue_items([7, 8, 9], blacklist=True)
+        self.assertEqual(['ok', 'ok', 'failed'], [r.status for r in results])
+        self.assertEqual('true', self.server.requests_to('/api/queue/7', 'DELETE')[0].query['blacklist'])
+
+    def test_iter_history(self):
+        self.assertEqual(list(range(11, 0, -1)), [r['id'] for r in self.radarr.iter_history(page_size=4)])
+        self.assertEqual(3, len(self.server.requests_to('/api/history')))
+
+    def test_unexpected_page(self):
+        with self.assertRaises(ValueError):
+            self.radarr.get_cutoff_unmet()
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+from unittest import TestCase
+
+from hm_wrapper.exceptions import RateLimitTimeoutError
+from hm_wrapper.ratelimit import BACKGROUND, URGENT, Limit, RateLimiter, TokenBucket
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+class Test(TestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=20, burst=3)
+        start = time.monotonic()
+        for _ in range(5):
+            self.assertTrue(bucket.acquire())
+        elapsed = time.monotonic() - start
+        # 3 at once, then one every 50ms
+        self.assertGreaterEqual(elapsed, 0.09)
+        self.assertLess(elapsed, 0.5)
+        self.assertFalse(bucket.acquire(timeout=0.01))
+
+    def test_priority(self):
+        bucket = TokenBucket(rate=10, burst=1)
+        bucket.acquire()
+        served = []
+
+        def waiter(name, priority):
+            bucket.acquire(priority)
+            served.append(name)
+
+        threads = [threading.Thread(target=waiter, args=('backlog', BACKGROUND))]
+        threads[0].start()
+        time.sleep(0.02)
+        threads.append(threading.Thread(target=waiter, args=('user', URGENT)))
+        threads[1].start()
+        for thread in threads:
+            thread.join(2)
+        self.assertEqual(['user', 'backlog'], served)
+
+    def test_async(self):
+        bucket = TokenBucket(rate=10, burst=1)
+        bucket.acquire()
+        served = []
+        ticks = []
+
+        async def waiter(name, priority):
+            await bucket.acquire_async(priority)
+            served.append(name)
+
+        async def ticker():
+            while len(served) < 2:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            backlog = asyncio.ensure_future(waiter('backlog', BACKGROUND))
+            await asyncio.sleep(0.02)
+            await asyncio.gather(backlog, waiter('user', URGENT), ticker())
+
+            # a cancelled waiter leaves the line
+            bucket.acquire()
+            cancelled = asyncio.ensure_future(bucket.acquire_async())
+            await asyncio.sleep(0.01)
+            cancelled.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await cancelled
+            self.assertEqual([], bucket._waiters)
+            self.assertFalse(await bucket.acquire_async(timeout=0.01))
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertEqual(['user', 'backlog'], served)
+        # the event loop kept running while the waiters waited
+        self.assertGreater(len(ticks), 5)
+
+    def test_limiter(self):
+        limiter = RateLimiter({'search': Limit(1, 60)})
+        self.assertIsNone(limiter.bucket('RefreshSeries'))
+        limiter.acquire('episodeSearch')
+        with self.assertRaises(RateLimitTimeoutError):
+            limiter.acquire('SeriesSearch', timeout=0.01)
+        limiter.acquire('RefreshSeries', timeout=0)
+
+    def test_client_commands(self):
+        server = FakeServer({('POST', '/api/command'): lambda request: (201, dict(request.json(), id=1))})
+        sonarr = Sonarr(server.url, 'key', rate_limiter=RateLimiter({'search': Limit(20, 1, burst=1)}))
+        try:
+            start = time.monotonic()
+            for episode_id in range(3):
+                sonarr.Commands.episode_search([episode_id], priority=URGENT)
+            sonarr.Commands.refresh_series(1)
+            self.assertGreaterEqual(time.monotonic() - start, 0.09)
+            self.assertEqual(['EpisodeSearch'] * 3 + ['RefreshSeries'],
+                             [r.json()['name'] for r in server.requests_to('/api/command', 'POST')])
+            self.assertNotIn('priority', server.requests_to('/api/command', 'POST')[0].json())
+        finally:
+            sonarr.close()
+            server.close()
@@ -0,0 +1,99 @@
+import time
+from unittest import TestCase
+
+import requests
+
+from hm_wrapper._transport import Transport
+from hm_wrapper.exceptions import CircuitOpenError
+from hm_wrapper.resilience import CircuitBreaker, RetryPolicy
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.statuses = []
+
+        def flaky(request):
+            return (self.statuses.pop(0) if self.statuses else 200), {'ok': True}
+
+        def slow(request):
+            time.sleep(0.3)
+            return []
+
+        self.server = FakeServer({('GET', '/api/flaky'): flaky, ('POST', '/api/flaky'): flaky,
+                                  ('GET', '/api/slow'): slow})
+        self.url = self.server.url + '/api/flaky'
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_delays(self):
+        policy = RetryPolicy(retries=3, backoff=0.5, max_backoff=1.5, jitter=False)
+        self.assertEqual([0.5, 1.0, 1.5], [policy.delay(a) for a in range(3)])
+        self.assertEqual(1.0, policy.delay(0, retry_after='1'))
+        self.assertEqual(1.5, policy.delay(0, retry_after='3600'))
+        self.assertTrue(policy.retryable('get', 2, 503))
+        self.assertFalse(policy.retryable('GET', 3, 503))
+        self.assertFalse(policy.retryable('GET', 0, 500))
+        self.assertFalse(policy.retryable('POST', 0))
+        jittered = RetryPolicy(backoff=1)
+        self.assertTrue(all(0 <= jittered.delay(1) <= 2 for _ in range(20)))
+
+    def test_retries_idempotent_requests(self):
+        transport = Transport('key', retry=RetryPolicy(retries=2, backoff=0.01), circuit_breaker=None)
+        self.statuses = [503, 502]
+        self.assertEqual(200, transport.request('GET', self.url).status_code)
+        self.assertEqual(3, len(self.server.requests_to('/api/flaky')))
+
+        self.statuses = [503]
+        self.assertEqual(503, transport.request('POST', self.url, json={}).status_code)
+        self.assertEqual(1, len(self.server.requests_to('/api/flaky', 'POST')))
+        transport.close()
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+        transport = Transport('key', retry=None, circuit_breaker=breaker)
+        self.statuses = [503, 503, 503]
+        for _ in range(2):
+            self.assertEqual(503, transport.request('GET', self.url).status_code)
+        self.assertEqual('open', breaker.state(self.server.url))
+        with self.assertRaises(CircuitOpenError) as ctx:
+            transport.request('GET', self.url)
+        self.assertEqual(self.server.url, ctx.exception.host)
+        self.assertEqual(2, len(self.server.requests_to('/api/flaky')))
+
+        # the probe after reset_timeout fails and opens the circuit again, the next probe closes it
+        time.sleep(0.25)
+        self.assertEqual('half-open', breaker.state(self.server.url))
+        self.assertEqual(503, transport.request('GET', self.url).status_code)
+        with self.assertRaises(CircuitOpenError):
+            transport.request('GET', self.url)
+        time.sleep(0.25)
+        self.assertEqual(200, transport.request('GET', self.url).status_code)
+        self.assertEqual('closed', breaker.state(self.server.url))
+        transport.close()
+
+    def test_client_errors_are_not_host_failures(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        transport = Transport('key', retry=None, circuit_breaker=breaker)
+        with self.assertRaises(requests.exceptions.InvalidHeader):
+            transport.request('GET', self.url, headers={'X-Bad': 'line\nbreak'})
+        self.assertEqual('closed', breaker.state(self.server.url))
+
+        # nor do they use up the half-open probe
+        breaker.failure(self.server.url)
+        time.sleep(0.06)
+        with self.assertRaises(requests.exceptions.InvalidHeader):
+            transport.request('GET', self.url, headers={'X-Bad': 'line\nbreak'})
+        self.assertEqual('half-open', breaker.state(self.server.url))
+        self.assertEqual(200, transport.request('GET', self.url).status_code)
+        self.assertEqual('closed', breaker.state(self.server.url))
+        transport.close()
+
+    def test_per_call_timeout(self):
+        sonarr = Sonarr(self.server.url, 'key', transport=Transport('key', retry=None))
+        with self.assertRaises(requests.Timeout):
+            sonarr.request_get(self.server.url + '/api/slow', timeout=0.05)
+        self.assertEqual([], sonarr.request_get(self.server.url + '/api/slow').json())
+        sonarr.close()
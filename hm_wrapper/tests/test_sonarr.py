@@ -0,0 +1,126 @@
+import datetime
+from unittest import TestCase
+
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+
+
+def _episodes(request):
+    series_id = int(request.query['seriesId'])
+    if series_id == 3:
+        return 500, {'message': 'boom'}
+    return [{'id': series_id * 10 + n, 'seriesId': series_id, 'episodeFileId': series_id * 10 + n if n else 0}
+            for n in range(3)]
+
+
+def _episode_files(request):
+    series_id = int(request.query['seriesId'])
+    return [{'id': series_id * 10 + n, 'size': 100} for n in range(1, 3)]
+
+
+def _lookup(request):
+    tvdb_id = int(request.query['term'].split(':')[1])
+    if tvdb_id == 404:
+        return []
+    return [{'title': f'Show {tvdb_id}', 'seasons': [], 'images': [], 'titleSlug': f'show-{tvdb_id}'}]
+
+
+def _calendar(request):
+    # one episode a day, both ends of the range included, returned newest first
+    start = datetime.datetime.strptime(request.query['start'][:10], '%Y-%m-%d').date()
+    end = datetime.datetime.strptime(request.query['end'][:10], '%Y-%m-%d').date()
+    days = [start + datetime.timedelta(days=n) for n in range((end - start).days + 1)]
+    return [{'id': day.toordinal(), 'airDateUtc': f'{day}T02:00:00Z'} for day in reversed(days)]
+
+
+def _wanted_missing(request):
+    page, page_size = int(request.query['page']), int(request.query['pageSize'])
+    records = [{'id': i, 'seriesId': 1} for i in range(1, 24)][(page - 1) * page_size:page * page_size]
+    return {'page': page, 'pageSize': page_size, 'totalRecords': 23, 'records': records}
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.server = FakeServer({
+            ('GET', '/api/series'): [{'id': i, 'title': f'Series {i}', 'tvdbId': 100 + i} for i in range(1, 6)],
+            ('GET', '/api/series/lookup'): _lookup,
+            ('POST', '/api/series'): lambda request: (201, dict(request.json(), id=42)),
+            ('GET', '/api/rootfolder'): [{'path': '/tv/'}],
+            ('GET', '/api/profile'): [{'id': 4, 'name': 'HD-1080p'}],
+            ('GET', '/api/episode'): _episodes,
+            ('GET', '/api/episodefile'): _episode_files,
+            ('GET', '/api/calendar'): _calendar,
+            ('GET', '/api/wanted/missing'): _wanted_missing,
+            ('PUT', '/api/series/editor'): lambda request: [s for s in request.json() if s['id'] != 4],
+            ('DELETE', '/api/series/1'): {},
+            ('DELETE', '/api/series/2'): (500, {'message': 'locked'}),
+        })
+        self.sonarr = Sonarr(self.server.url, 'key')
+
+    def tearDown(self):
+        self.sonarr.close()
+        self.server.close()
+
+    def test_snapshot_episodes(self):
+        progress = []
+        snapshots = list(self.sonarr.snapshot_episodes(max_workers=3,
+                                                       progress=lambda done, total, snap: progress.append(done)))
+        self.assertEqual([1, 2, 3, 4, 5], progress)
+        by_id = {snap.series['id']: snap for snap in snapshots}
+        self.assertEqual({1, 2, 3, 4, 5}, set(by_id))
+        self.assertIsNone(by_id[3].episodes)
+        self.assertIsNotNone(by_id[3].error)
+        episodes = by_id[2].episodes
+        self.assertNotIn('episodeFile', episodes[0])
+        self.assertEqual(21, episodes[1]['episodeFile']['id'])
+
+    def test_add_series_by_tvdbIds(self):
+        results = self.sonarr.add_series_by_tvdbIds([101, 500, 404, 501, 500], 'HD-1080p')
+        self.assertEqual([101, 500, 404, 501], [r.key for r in results])
+        self.assertEqual(['skipped', 'ok', 'failed', 'ok'], [r.status for r in results])
+        self.assertIsInstance(results[2].error, LookupError)
+        added = [r.json() for r in self.server.requests_to('/api/series', 'POST')]
+        self.assertEqual({'/tv/Show 500', '/tv/Show 501'}, {a['path'] for a in added})
+        self.assertEqual({4}, {a['qualityProfileId'] for a in added})
+        self.assertEqual(1, len(self.server.requests_to('/api/rootfolder')))
+
+    def test_stream_series(self):
+        streamed = list(self.sonarr.stream_series(fields=['id', 'tvdbId']))
+        self.assertEqual([{'id': i, 'tvdbId': 100 + i} for i in range(1, 6)], streamed)
+
+    def test_get_calendar_in_windows(self):
+        episodes = self.sonarr.get_calendar('2020-01-01', '2020-01-31', window_days=7, max_workers=3)
+        self.assertEqual(31, len(episodes))
+        self.assertEqual([datetime.date(2020, 1, 1).toordinal() + n for n in range(31)], [e['id'] for e in episodes])
+        self.assertEqual(5, len(self.server.requests_to('/api/calendar')))
+
+        windows = list(self.sonarr.iter_calendar(datetime.date(2020, 1, 1), '1/10/2020', window_days=7))
+        self.assertEqual([(datetime.date(2020, 1, 1), datetime.date(2020, 1, 8)),
+                          (datetime.date(2020, 1, 8), datetime.date(2020, 1, 10))], [w[:2] for w in windows])
+        self.assertEqual([8, 2], [len(w.items) for w in windows])
+
+        self.assertEqual(3, len(self.sonarr.get_calendar('2020-01-01', '2020-01-03')))
+        self.assertEqual(8, len(self.server.requests_to('/api/calendar')))
+
+    def test_upd_series_bulk(self):
+        results = self.sonarr.upd_series_bulk([1, 2, 3, 4, 5, 9], {'monitored': False}, chunk_size=2)
+        self.assertEqual([1, 2, 3, 4, 5, 9], [r.key for r in results])
+        self.assertEqual(['ok', 'ok', 'ok', 'ok', 'ok', 'failed'], [r.status for r in results])
+        self.assertEqual({'id': 1, 'title': 'Series 1', 'tvdbId': 101, 'monitored': False}, results[0].value)
+        self.assertIsInstance(results[5].error, LookupError)
+        self.assertEqual(3, len(self.server.requests_to('/api/series/editor', 'PUT')))
+        self.assertEqual(1, len(self.server.requests_to('/api/series')))
+
+    def test_rem_series_bulk_falls_back_to_single_deletes(self):
+        results = self.sonarr.rem_series_bulk([1, 2], rem_files=True)
+        self.assertEqual(['ok', 'failed'], [r.status for r in results])
+        self.assertEqual('true', self.server.requests_to('/api/series/1', 'DELETE')[0].query['deleteFiles'])
+        self.assertEqual(1, len(self.server.requests_to('/api/series/editor', 'DELETE')))
+
+    def test_get_wanted_missing_pages(self):
+        missing = self.sonarr.get_wanted_missing(page_size=5, max_workers=3)
+        self.assertEqual(list(range(1, 24)), [e['id'] for e in missing])
+        queries = [r.query for r in self.server.requests_to('/api/wanted/missing')]
+        self.assertEqual(['1', '2', '3', '4', '5'], sorted(q['page'] for q in queries))
+        self.assertEqual({('5', 'airDateUtc', 'monitored', 'true')},
+                         {(q['pageSize'], q['sortKey'], q['filterKey'], q['filterValue']) for q in queries})
@@ -0,0 +1,58 @@
+from unittest import TestCase
+
+from hm_wrapper.radarr import Radarr
+from hm_wrapper.tests._fake_server import FakeServer
+from hm_wrapper.watch import diff_queue
+
+
+def _item(item_id, sizeleft, status='Downloading'):
+    return {'id': item_id, 'title': f'Release {item_id}', 'size': 100, 'sizeleft': sizeleft, 'status': status,
+            'timeleft': f'00:00:{sizeleft:02d}'}
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.queue = [_item(1, 80), _item(2, 100, 'Paused')]
+        self.server = FakeServer({('GET', '/api/queue'): lambda request: self.queue})
+        self.radarr = Radarr(self.server.url, 'key')
+
+    def tearDown(self):
+        self.radarr.close()
+        self.server.close()
+
+    def test_diff_queue(self):
+        events, state = diff_queue({}, self.queue)
+        self.assertEqual(['added', 'added'], [e.kind for e in events])
+        self.assertAlmostEqual(0.2, events[0].progress)
+
+        # a new timeleft alone is not progress
+        events, state = diff_queue(state, [dict(_item(1, 80), timeleft='00:00:01'), _item(2, 100, 'Paused')])
+        self.assertEqual([], events)
+
+        events, state = diff_queue(state, [_item(1, 40), _item(3, 100)])
+        self.assertEqual([('progressed', 1), ('added', 3), ('removed', 2)], [(e.kind, e.id) for e in events])
+        self.assertEqual(80, events[0].previous['sizeleft'])
+
+    def test_shared_watcher(self):
+        watcher = self.radarr.watch_queue(min_interval=0.02, max_interval=0.05)
+        self.assertIs(watcher, self.radarr.watch_queue())
+        first = watcher.events(timeout=2)
+        second = []
+        watcher.subscribe(second.append)
+
+        self.assertEqual({('added', 1), ('added', 2)}, {(e.kind, e.id) for e in (next(first), next(first))})
+        self.queue = [_item(1, 0, 'Completed')]
+        changes = {(e.kind, e.id) for e in (next(first), next(first))}
+        self.assertEqual({('progressed', 1), ('removed', 2)}, changes)
+        first.close()
+
+        # nothing active: the interval backs off to max_interval
+        self.queue = []
+        while watcher.interval < 0.05:
+            watcher._wake.wait(0.01)
+        self.assertEqual(['added', 'added', 'progressed', 'removed', 'removed'], [e.kind for e in second])
+
+        self.radarr.close()
+        self.assertIsNone(watcher._thread)
+        # one poller served both consumers
+        self.assertLess(len(self.server.requests_to('/api/queue')), 40)
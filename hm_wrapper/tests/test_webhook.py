@@ -0,0 +1,76 @@
+import threading
+from unittest import TestCase
+
+import requests
+
+from hm_wrapper.cache import ResponseCache
+from hm_wrapper.mirror import SeriesMirror
+from hm_wrapper.sonarr import Sonarr
+from hm_wrapper.tests._fake_server import FakeServer
+from hm_wrapper.webhook import WebhookReceiver, parse_event
+
+DOWNLOAD = {
+    'eventType': 'Download',
+    'series': {'id': 1, 'title': 'Show', 'path': '/tv/Show', 'tvdbId': 101},
+    'episodes': [{'id': 11, 'episodeNumber': 1, 'seasonNumber': 1, 'title': 'Pilot'}],
+    'episodeFile': {'id': 7, 'relativePath': 'Season 1/S01E01.mkv', 'quality': 'HDTV-720p'},
+    'isUpgrade': False,
+    'downloadId': 'ABC',
+}
+
+
+class Test(TestCase):
+    def setUp(self):
+        self.library = {1: {'id': 1, 'title': 'Show', 'tvdbId': 101, 'episodeFileCount': 0}}
+        self.server = FakeServer({
+            ('GET', '/api/series'): lambda request: list(self.library.values()),
+            ('GET', '/api/series/1'): lambda request: self.library[1],
+        })
+        self.sonarr = Sonarr(self.server.url, 'key', cache=ResponseCache())
+        self.receiver = WebhookReceiver(username='hook', password='secret').start()
+
+    def tearDown(self):
+        self.receiver.close()
+        self.sonarr.close()
+        self.server.close()
+
+    def _post(self, payload, auth=('hook', 'secret'), path='/sonarr'):
+        return requests.post(self.receiver.url + path, json=payload, auth=auth, timeout=5)
+
+    def test_parse_event(self):
+        event = parse_event(DOWNLOAD)
+        self.assertEqual(('Download', 'sonarr', 1), (event.event_type, event.source, event.record_id))
+        self.assertEqual(7, event.file['id'])
+        self.assertEqual('ABC', event.download_id)
+        self.assertIsNone(parse_event({'eventType': 'Test'}).source)
+        with self.assertRaises(ValueError):
+            parse_event({'series': {}})
+
+    def test_dispatch_and_bind(self):
+        mirror = SeriesMirror(self.sonarr)
+        self.sonarr.get_series()
+        # callbacks run in registration order, so the client is current by the time on_download runs
+        self.receiver.bind(self.sonarr, path='/sonarr')
+        received = []
+        done = threading.Event()
+
+        @self.receiver.on('download')
+        def on_download(event):
+            received.append(event)
+            done.set()
+
+        self.receiver.on('Grab', lambda event: self.fail('not a grab'))
+        self.library[1] = dict(self.library[1], episodeFileCount=1)
+
+        self.assertEqual(401, self._post(DOWNLOAD, auth=None).status_code)
+        self.assertEqual(400, self._post({'no': 'event'}).status_code)
+        self.assertEqual(200, self._post(DOWNLOAD).status_code)
+        self.assertTrue(done.wait(5))
+        self.assertEqual('/sonarr', received[0].path)
+        self.assertEqual('Pilot', received[0].episodes[0]['title'])
+
+        # the cached series list was dropped and the mirror re-fetches only the changed series
+        self.assertEqual(1, self.sonarr.get_series()[0]['episodeFileCount'])
+        self.assertEqual(2, len(self.server.requests_to('/api/series')))
+        self.assertEqual(1, mirror.by_tvdb_id(101)['episodeFileCount'])
+        self.assertEqual(1, len(self.server.requests_to('/api/series/1')))
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Diff-based watching of the download queue.
+
+A QueueWatcher polls a client's queue on one background thread, compares each response with the previous one and
+hands out only what changed, as QueueEvents, to any number of consumers:
+
+    watcher = sonarr.watch_queue()         # the client's shared watcher
+    for event in watcher.events():
+        print(event.kind, event.item['title'], f'{event.progress:.0%}')
+"""
+import logging
+import queue
+import threading
+from typing import NamedTuple
+
+from hm_wrapper.commands import DEFAULT_BACKOFF
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_INTERVAL = 2.0
+DEFAULT_MAX_INTERVAL = 30.0
+# fields whose change makes a queue item 'progressed'; timeleft and estimatedCompletionTime change on every poll
+PROGRESS_FIELDS = ('sizeleft', 'status', 'trackedDownloadStatus', 'trackedDownloadState', 'errorMessage')
+ACTIVE_STATUSES = frozenset(('downloading', 'queued', 'delay', 'downloadclientunavailable'))
+
+
+class QueueEvent(NamedTuple):
+    # 'added', 'removed' or 'progressed'
+    kind: str
+    # the item as last seen
+    item: dict
+    # the item's previous state, for 'progressed'
+    previous: dict = None
+
+    @property
+    def id(self):
+        return self.item.get('id')
+
+    @property
+    def progress(self) -> float:
+        """Downloaded share of the item, 0.0 to 1.0"""
+        size = self.item.get('size') or 0
+        if size <= 0:
+            return 0.0
+        return min(max(1.0 - (self.item.get('sizeleft') or 0) / size, 0.0), 1.0)
+
+
+def diff_queue(previous: dict, current: list) -> tuple:
+    """
+    Compares a queue response with the previous state and returns (events, state), where state maps item id to item
+    and is passed as previous to the next call.
+    :param previous: state returned by the previous call, {} at first
+    :param current: the queue items just fetched
+    """
+    state = {item.get('id'): item for item in current}
+    events = []
+    for item_id, item in state.items():
+        before = previous.get(item_id)
+        if before is None:
+            events.append(QueueEvent('added', item))
+        elif any(item.get(f) != before.get(f) for f in PROGRESS_FIELDS):
+            events.append(QueueEvent('progressed', item, before))
+    events.extend(QueueEvent('removed', item) for item_id, item in previous.items() if item_id not in state)
+    return events, state
+
+
+def _active(state: dict) -> bool:
+    return any(str(item.get('status', '')).lower() in ACTIVE_STATUSES for item in state.values())
+
+
+class QueueWatcher(object):
+    """
+    Polls client.get_queue() on a background thread while anyone is subscribed and passes the added, removed and
+    progressed items on to the subscribers. The interval is min_interval while downloads are active or the queue
+    changes, and otherwise grows by backoff up to max_interval; a failed poll is logged and backed off the same way.
+    """
+
+    def __init__(self, client, min_interval: float = DEFAULT_MIN_INTERVAL, max_interval: float = DEFAULT_MAX_INTERVAL,
+                 backoff: float = DEFAULT_BACKOFF):
+        """
+        :param client: the Sonarr or Radarr client whose queue is watched
+        """
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self._state = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def items(self) -> list:
+        """The queue as of the last poll"""
+        return list((self._state or {}).values())
+
+    def poll(self) -> list:
+        """Fetches the queue once, hands the events to the subscribers and returns them; the first poll reports every
+        item as added"""
+        current = self.client.get_queue()
+        if not isinstance(current, list):
+            raise ValueError(f'unexpected queue response: {current!r:.80}')
+        with self._lock:
+            events, self._state = diff_queue(self._state or {}, current)
+            subscribers = list(self._subscribers)
+            active = _active(self._state)
+        if events or active:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        for callback in subscribers:
+            for event in events:
+                try:
+                    callback(event)
+                except Exception:
+                    logger.exception('queue watcher callback %r failed', callback)
+        return events
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                self.poll()
+            except Exception:
+                logger.exception('polling the queue failed')
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def subscribe(self, callback, initial: bool = True):
+        """
+        Registers callback(event), called on the watcher's thread for every change, and starts polling if it is the
+        first subscriber.
+        :param initial: first call it with an 'added' event for every item already known
+        """
+        with self._lock:
+            if initial:
+                for item in (self._state or {}).values():
+                    callback(QueueEvent('added', item))
+            self._subscribers.append(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='hm_wrapper-queue-watcher', daemon=True)
+                self._thread.start()
+        return callback
+
+    def unsubscribe(self, callback):
+        """Removes a subscriber; polling stops after the last one"""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+        self._wake.set()
+
+    def events(self, timeout: float = None, initial: bool = True):
+        """
+        Yields QueueEvents as they happen; several consumers can iterate at once, sharing the one poller.
+        :param timeout: stop after this many seconds without an event
+        :param initial: start with an 'added' event for every item already known
+        """
+        received = queue.Queue()
+        self.subscribe(received.put, initial=initial)
+        try:
+            while True:
+                try:
+                    yield received.get(timeout=timeout)
+                except queue.Empty:
+                    return
+        finally:
+            self.unsubscribe(received.put)
+
+    def stop(self):
+        """Removes every subscriber and stops polling"""
+        with self._lock:
+            self._subscribers.clear()
+            thread = self._thread
+        self._wake.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""Embeddable receiver for the webhook notifications of Sonarr and Radarr.
+
+In Sonarr/Radarr add a Webhook connection (Settings > Connect) pointing at the receiver, e.g.
+http://<this host>:8788/sonarr, then react to events instead of polling:
+
+    receiver = WebhookReceiver(port=8788)
+    receiver.bind(sonarr, path='/sonarr')     # keeps sonarr's response cache and mirrors current
+    receiver.on('Download', lambda event: print(event.series['title'], 'imported'))
+    receiver.start()
+"""
+import base64
+import hmac
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import NamedTuple
+
+from hm_wrapper import _codec
+from hm_wrapper.sonarr import Sonarr
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookEvent(NamedTuple):
+    """A parsed webhook notification; fields the event does not carry are None"""
+    event_type: str
+    series: dict = None
+    episodes: list = None
+    movie: dict = None
+    release: dict = None
+    # the episodeFile / movieFile of Download, Rename and file delete events
+    file: dict = None
+    is_upgrade: bool = False
+    download_client: str = None
+    download_id: str = None
+    # the path the event was posted to
+    path: str = None
+    payload: dict = None
+
+    @property
+    def source(self) -> str:
+        """'sonarr', 'radarr' or None for events about neither (Test, Health)"""
+        if self.series is not None:
+            return 'sonarr'
+        if self.movie is not None:
+            return 'radarr'
+        return None
+
+    @property
+    def record_id(self):
+        """id of the series or movie the event is about"""
+        record = self.series if self.series is not None else self.movie
+        return None if record is None else record.get('id')
+
+
+def parse_event(payload: dict, path: str = None) -> WebhookEvent:
+    """Builds a WebhookEvent from the JSON body of a Sonarr or Radarr webhook"""
+    if not isinstance(payload, dict) or 'eventType' not in payload:
+        raise ValueError('not a webhook payload: eventType is missing')
+    return WebhookEvent(
+        event_type=payload['eventType'],
+        series=payload.get('series'),
+        episodes=payload.get('episodes'),
+        movie=payload.get('movie') or payload.get('remoteMovie'),
+        release=payload.get('release'),
+        file=payload.get('episodeFile') or payload.get('movieFile'),
+        is_upgrade=bool(payload.get('isUpgrade', False)),
+        download_client=payload.get('downloadClient'),
+        download_id=payload.get('downloadId'),
+        path=path,
+        payload=payload,
+    )
+
+
+def _changes(event: WebhookEvent) -> list:
+    """Returns the (endpoint, record ids) an event reports changes of"""
+    kind = event.event_type.lower()
+    if kind in ('test', 'health'):
+        return []
+    changes = [('queue', ()), ('history', ())]
+    if kind == 'grab':
+        return changes
+    if event.source == 'sonarr':
+        changes.append(('series', (event.record_id,)))
+        if kind != 'seriesdelete':
+            changes.append(('episode', tuple(e.get('id') for e in event.episodes or ())))
+            changes.append(('episodefile', ()))
+    elif event.source == 'radarr':
+        changes.append(('movie', (event.record_id,)))
+        if kind != 'moviedelete':
+            changes.append(('moviefile', ()))
+    return changes
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status: int):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        receiver = self.server.receiver
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not receiver.authorized(self.headers.get('Authorization')):
+            self._reply(401)
+            return
+        try:
+            event = parse_event(_codec.loads(body), path=self.path.split('?', 1)[0])
+        except ValueError:
+            self._reply(400)
+            return
+        self._reply(200)
+        receiver.dispatch(event)
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt, *args)
+
+
+class WebhookReceiver(object):
+    """Lightweight threaded HTTP listener that parses webhook notifications into WebhookEvents and hands them to
+    callbacks. Callbacks run on the request's thread, after the response was sent, so slow callbacks do not make the
+    server retry; an exception in one callback is logged and does not stop the others."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, username: str = None, password: str = None):
+        """
+        :param host: interface to listen on; use '0.0.0.0' when Sonarr/Radarr run on another machine
+        :param port: port to listen on, 0 picks a free one (see .url)
+        :param username: if set, requests must carry these basic auth credentials (the Username/Password fields of the
+        webhook connection)
+        """
+        self._server = _Server((host, port), _Handler)
+        self._server.receiver = self
+        self._credentials = None
+        if username is not None:
+            self._credentials = 'Basic ' + base64.b64encode(f'{username}:{password or ""}'.encode()).decode()
+        self._callbacks = dict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._serving = False
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def authorized(self, authorization: str) -> bool:
+        if self._credentials is None:
+            return True
+        return authorization is not None and hmac.compare_digest(authorization, self._credentials)
+
+    def on(self, event_type: str = '*', callback=None):
+        """Registers callback(event) for an event type ('Grab', 'Download', 'Rename', 'SeriesDelete', 'MovieDelete',
+        'EpisodeFileDelete', 'MovieFileDelete', 'Health', 'Test', matched case-insensitively) or '*' for every event.
+        Without a callback, returns a decorator."""
+        if callback is None:
+            return lambda fn: self.on(event_type, fn)
+        with self._lock:
+            self._callbacks.setdefault(event_type.lower(), []).append(callback)
+        return callback
+
+    def off(self, event_type: str, callback):
+        with self._lock:
+            self._callbacks.get(event_type.lower(), []).remove(callback)
+
+    def bind(self, client, path: str = None):
+        """
+        Keeps a Sonarr or Radarr client current: every event reporting a change drops the affected responses from the
+        client's cache and notifies its change listeners, so bound LibraryMirrors re-fetch just the changed records.
+        :param path: only apply events posted to this path, for several instances posting to one receiver
+        """
+        source = 'sonarr' if isinstance(client, Sonarr) else 'radarr'
+
+        def apply(event: WebhookEvent):
+            if path is not None and event.path != path:
+                return
+            if event.source is not None and event.source != source:
+                return
+            for endpoint, record_ids in _changes(event):
+                client._invalidate(endpoint, *record_ids)
+
+        return self.on('*', apply)
+
+    def dispatch(self, event: WebhookEvent):
+        """Calls the callbacks registered for the event"""
+        with self._lock:
+            callbacks = self._callbacks.get('*', []) + self._callbacks.get(event.event_type.lower(), [])
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception('webhook callback %r failed for %s event', callback, event.event_type)
+
+    def start(self):
+        """Serves on a background daemon thread and returns self"""
+        if self._thread is None:
+            self._serving = True
+            self._thread = threading.Thread(target=self._server.serve_forever, args=(0.1,), daemon=True)
+            self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serves on the calling thread until close() is called from another one"""
+        self._serving = True
+        self._server.serve_forever(0.1)
+
+    def close(self):
+        if self._serving:
+            self._server.shutdown()
+            self._serving = False
+        self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -3,8 +3,16 @@ import setuptools
 setuptools.setup(
     name='hm_wrapper',
     version='0.12.4',
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=['benchmarks', 'benchmarks.*']),
     install_requires=['requests'],
+    extras_require={
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+        'columnar': ['numpy'],
+    },
+    entry_points={
+        'console_scripts': ['hm = hm_wrapper.cli:main'],
+    },
     python_requires='>=3.6',
     url='https://github.com/np-at/hm_wrapper',
     license='GPLv3',